@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from .endpoints import resumes
+from .endpoints import resumes, system
 
 api_router = APIRouter()
 api_router.include_router(resumes.router, prefix="/resumes", tags=["resumes"])
+api_router.include_router(system.router, prefix="/system", tags=["system"])
 
 # Add other routers here if you have more endpoint modules
 # e.g., api_router.include_router(users.router, prefix="/users", tags=["users"]) 
\ No newline at end of file
@@ -1,141 +1,201 @@
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Query
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Literal
+from datetime import datetime, timezone
 
+from app.db import database
 from app.db.database import get_db
 from app.api.v1 import schemas
-from app.crud import crud_resume
-from app.utils import file_helpers
-from app.services import llm_service
+from app.crud import crud_resume, crud_resume_search, crud_job, crud_stats
+from app.utils import file_helpers, http_cache, pagination
+from app.services import llm_service, resume_batch, resume_export, resume_pipeline, upload_jobs, vector_index
 from app.core.config import settings
 import logging
-import os
+import zlib
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/upload", response_model=schemas.ResumeUploadResponse)
-def upload_resume(
+def _ensure_llm_configured():
+    configuration_error = llm_service.configuration_error() # Missing API key, or a routed model that failed to initialize
+    if configuration_error:
+        raise HTTPException(status_code=500, detail=configuration_error)
+
+def _enqueue_background_upload(ingested: file_helpers.IngestedUpload, on_duplicate: str) -> JSONResponse:
+    # Background jobs must survive a restart, so their input is persisted to the uploads folder.
+    # Called from the async upload endpoint via run_in_threadpool; the job queue uses a sync session.
+    if database.SessionLocal is None:
+        raise HTTPException(status_code=500, detail="Database not configured.")
+    try:
+        saved_file_path = file_helpers.persist_ingested_upload(ingested)
+    except Exception as e:
+        logger.error(f"Error saving file {ingested.file_name}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    db = database.SessionLocal()
+    try:
+        db_job = upload_jobs.enqueue_upload(
+            db, file_name=ingested.file_name, file_path=saved_file_path,
+            content_hash=ingested.content_hash, on_duplicate=on_duplicate,
+        )
+        job_status = schemas.UploadJobStatus.model_validate(db_job)
+    except upload_jobs.JobQueueFullError as e:
+        file_helpers.remove_saved_file(saved_file_path)
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error queueing upload job for {ingested.file_name}: {e}", exc_info=True)
+        file_helpers.remove_saved_file(saved_file_path)
+        raise HTTPException(status_code=500, detail="Database error: Could not create upload job.")
+    finally:
+        db.close()
+    return JSONResponse(
+        status_code=202,
+        content=job_status.model_dump(mode="json"),
+        headers={"Location": f"{settings.API_V1_STR}/resumes/jobs/{job_status.id}"},
+    )
+
+@router.post(
+    "/upload",
+    response_model=schemas.ResumeUploadResponse,
+    responses={202: {"model": schemas.UploadJobStatus, "description": "Upload accepted as a background job"}},
+)
+async def upload_resume(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    background: bool = Query(False, description="Accept the upload as a background job. Returns 202 with a job id to poll at /resumes/jobs/{job_id}."),
+    on_duplicate: Literal["reuse", "existing", "reprocess"] = Query(
+        "reuse",
+        description="For a file identical to an already processed one: 'reuse' stores a new entry with the stored results, "
+                    "'existing' returns the stored entry, 'reprocess' runs the full pipeline again.",
+    ),
 ):
     """
     Uploads a resume file, extracts its content, performs LLM analysis,
     and stores the information in the database.
+    The upload is parsed from the buffer it was received into, in memory unless larger than UPLOAD_SPOOL_THRESHOLD_BYTES;
+    files larger than MAX_UPLOAD_BYTES are rejected with 413, before the body is received when its Content-Length shows it.
+    With `background=true` the file is only saved and queued, and processing happens in the upload worker pool.
+    Files whose content was already processed skip parsing and the LLM calls (see `on_duplicate`).
+    Runs on the event loop: the LLM calls and DB statements are awaited, so a waiting upload holds no thread.
+    No database connection is held while the file is parsed or the LLM is called: each DB step opens its own short session.
     """
-    if not settings.GOOGLE_API_KEY:
-        raise HTTPException(status_code=500, detail="LLM service not configured: GOOGLE_API_KEY missing.")
-    if not llm_service.llm: # Check if LLM was initialized successfully
-        raise HTTPException(status_code=500, detail="LLM client could not be initialized. Check API key and service status.")
+    _ensure_llm_configured()
+    if database.AsyncSessionLocal is None:
+        raise HTTPException(status_code=500, detail="Async database not configured: check DATABASE_URL and that its async driver (asyncpg or aiosqlite) is installed.")
 
     logger.info(f"Starting resume upload process for file: {file.filename}")
 
-    # 1. Save uploaded file and extract text
+    # 1. Hash and measure the received upload (in one pass, without copying it)
+    timings = resume_pipeline.StageTimings()
     try:
-        saved_file_path = file_helpers.save_upload_file(file)
-        logger.info(f"File saved to: {saved_file_path}")
-        raw_text = file_helpers.get_text_from_file(saved_file_path)
-        if not raw_text:
-            logger.warning(f"Could not extract text from file: {file.filename}")
-            raise HTTPException(status_code=400, detail=f"Could not extract text from file: {file.filename}. Ensure it's a supported format (PDF, DOCX, TXT) and not empty/corrupted.")
-        logger.info(f"Text extracted successfully from {file.filename} (length: {len(raw_text)} chars)")
+        with timings.stage(resume_pipeline.STAGE_INGESTING):
+            ingested = await run_in_threadpool(file_helpers.ingest_upload, file)
+        logger.info(f"File ingested: {file.filename} ({ingested.size_bytes} bytes, sha256: {ingested.content_hash})")
+    except file_helpers.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        logger.error(f"Error during file processing for {file.filename}: {e}", exc_info=True)
-        # Attempt to clean up saved file if it exists
-        if 'saved_file_path' in locals() and os.path.exists(saved_file_path):
-            try:
-                os.remove(saved_file_path)
-                logger.info(f"Cleaned up saved file: {saved_file_path}")
-            except Exception as cleanup_e:
-                logger.error(f"Error cleaning up file {saved_file_path}: {cleanup_e}")
+        logger.error(f"Error reading uploaded file {file.filename}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
-    # 2. Create initial resume entry in DB
     try:
-        db_resume_entry = crud_resume.create_resume_entry(db, file_name=file.filename, raw_text=raw_text)
-        logger.info(f"Initial resume entry created with ID: {db_resume_entry.id}")
-    except Exception as e:
-        logger.error(f"Error creating initial DB entry for {file.filename}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Database error: Could not create initial resume entry.")
+        if background:
+            return await run_in_threadpool(_enqueue_background_upload, ingested, on_duplicate)
 
-    # 3. LLM Extraction
-    extracted_data_dict: Dict[str, Any] = {}
-    try:
-        logger.info(f"Sending text to LLM for extraction (resume ID: {db_resume_entry.id})")
-        extracted_data_dict = llm_service.extract_resume_data_from_text(raw_text)
-        if "error" in extracted_data_dict:
-            logger.error(f"LLM extraction failed for resume ID {db_resume_entry.id}: {extracted_data_dict.get('details', extracted_data_dict['error'])}")
-            # Update DB entry with error? Or just fail request? For now, fail.
-            # Potentially, we could save the raw text and mark it for later processing.
-            raise HTTPException(status_code=500, detail=f"LLM data extraction failed: {extracted_data_dict.get('details', extracted_data_dict['error'])}")
-        logger.info(f"LLM extraction successful for resume ID: {db_resume_entry.id}")
-    except Exception as e:
-        logger.error(f"Exception during LLM extraction for resume ID {db_resume_entry.id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"LLM data extraction process encountered an error: {str(e)}")
+        # 2-6. Extract text, run the LLM stages and store the results
+        try:
+            result = await resume_pipeline.aprocess_resume_file(
+                database.AsyncSessionLocal, ingested.buffer, file.filename,
+                content_hash=ingested.content_hash, on_duplicate=on_duplicate, timings=timings,
+            )
+        except resume_pipeline.PipelineError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        ingested.buffer.close()
 
-    # 4. LLM Analysis
-    llm_analysis_dict: Dict[str, Any] = {}
-    try:
-        logger.info(f"Sending extracted data to LLM for analysis (resume ID: {db_resume_entry.id})")
-        llm_analysis_dict = llm_service.analyze_resume_content(extracted_data_dict, raw_resume_text=raw_text)
-        if "error" in llm_analysis_dict:
-            logger.error(f"LLM analysis failed for resume ID {db_resume_entry.id}: {llm_analysis_dict.get('details', llm_analysis_dict['error'])}")
-            # As above, consider how to handle. For now, fail.
-            raise HTTPException(status_code=500, detail=f"LLM analysis failed: {llm_analysis_dict.get('details', llm_analysis_dict['error'])}")
-        logger.info(f"LLM analysis successful for resume ID: {db_resume_entry.id}")
-    except Exception as e:
-        logger.error(f"Exception during LLM analysis for resume ID {db_resume_entry.id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"LLM analysis process encountered an error: {str(e)}")
+    message = "Resume uploaded and processed successfully!"
+    if result.duplicate_of is not None:
+        message = f"Resume already processed (resume ID {result.duplicate_of}); stored results were reused."
+    return schemas.ResumeUploadResponse(
+        message=message, 
+        resume_id=result.resume.id, 
+        duplicate_of=result.duplicate_of,
+        data=schemas.ResumeDetail.model_validate(result.resume) # Use model_validate for Pydantic v2
+    )
 
-    # 5. Prepare data for DB update (using Pydantic models for validation and structure)
-    try:
-        # Create LLMAnalysis Pydantic model from dictionary
-        # Assuming llm_analysis_dict matches the structure of schemas.LLMAnalysis
-        llm_analysis_pydantic = schemas.LLMAnalysis(**llm_analysis_dict)
-        
-        # Create ResumeUpdate Pydantic model
-        valid_resume_fields = schemas.ResumeUpdate.model_fields.keys()
-        filtered_extracted_data = {k: v for k, v in extracted_data_dict.items() if k in valid_resume_fields}
-
-        resume_update_data = schemas.ResumeUpdate(
-            file_name=file.filename,
-            raw_text=raw_text,
-            llm_analysis=llm_analysis_pydantic,
-            **filtered_extracted_data
-        )
-        logger.info(f"Prepared data for DB update (resume ID: {db_resume_entry.id})")
-    except Exception as e: # Catch Pydantic validation errors or other issues
-        logger.error(f"Error preparing data for DB update (resume ID: {db_resume_entry.id}): {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error preparing data for database update: {str(e)}")
+@router.post("/batch", response_model=schemas.BatchUploadResponse)
+def upload_resume_batch(
+    files: List[UploadFile] = File(...),
+    on_duplicate: Literal["reuse", "existing", "reprocess"] = Query("reuse", description="Duplicate handling, as for /resumes/upload."),
+):
+    """
+    Uploads many resumes at once, as individual files and/or ZIP archives of PDF, DOCX and TXT files.
+    Files are processed with bounded concurrency (BATCH_CONCURRENCY) and stored with a single bulk insert.
+    Returns a status per file; one failing file does not fail the batch.
+    """
+    _ensure_llm_configured()
+    if database.SessionLocal is None:
+        raise HTTPException(status_code=500, detail="Database not configured.")
+    logger.info(f"Starting batch upload of {len(files)} file(s)")
 
-    # 6. Update resume entry in DB with extracted data and analysis
+    items: List[file_helpers.IngestedUpload] = []
+    ingest_failures: List[schemas.BatchItemResult] = []
     try:
-        updated_resume = crud_resume.update_resume_with_extracted_data(
-            db, resume_id=db_resume_entry.id, update_data=resume_update_data
-        )
-        if not updated_resume:
-            logger.error(f"Failed to update resume in DB (ID: {db_resume_entry.id})")
-            raise HTTPException(status_code=404, detail="Resume not found after update attempt.")
-        logger.info(f"Resume entry updated successfully in DB (ID: {updated_resume.id})")
-    except Exception as e:
-        logger.error(f"Error updating DB with extracted data for resume ID {db_resume_entry.id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Database error: Could not update resume with extracted data.")
+        for file in files:
+            try:
+                ingested = file_helpers.ingest_upload(file)
+            except Exception as e:
+                logger.error(f"Error reading batch file {file.filename}: {e}")
+                ingest_failures.append(schemas.BatchItemResult(file_name=file.filename, status=resume_batch.BATCH_STATUS_FAILED, error=str(e)))
+                continue
+            if not file.filename.lower().endswith(".zip"):
+                items.append(ingested)
+                continue
+            try:
+                items.extend(file_helpers.expand_zip_upload(ingested, max_entries=settings.BATCH_MAX_FILES))
+            except Exception as e:
+                logger.error(f"Error expanding ZIP {file.filename}: {e}")
+                ingest_failures.append(schemas.BatchItemResult(file_name=file.filename, status=resume_batch.BATCH_STATUS_FAILED, error=f"Could not read archive: {str(e)}"))
+            finally:
+                ingested.buffer.close()
+            if len(items) > settings.BATCH_MAX_FILES:
+                break
 
-    # Clean up the saved file after processing
-    try:
-        os.remove(saved_file_path)
-        logger.info(f"Successfully cleaned up uploaded file: {saved_file_path}")
-    except Exception as e:
-        logger.error(f"Error cleaning up uploaded file {saved_file_path}: {e}")
-        # Non-critical, so don't raise HTTP Exception, just log
+        if len(items) > settings.BATCH_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"Batch contains more than {settings.BATCH_MAX_FILES} documents.")
 
-    return schemas.ResumeUploadResponse(
-        message="Resume uploaded and processed successfully!", 
-        resume_id=updated_resume.id, 
-        data=schemas.ResumeDetail.model_validate(updated_resume) # Use model_validate for Pydantic v2
+        results = ingest_failures + resume_batch.process_batch(database.SessionLocal, items, on_duplicate)
+    finally:
+        for item in items:
+            item.buffer.close()
+
+    logger.info(f"Batch upload finished: {len(results)} file(s)")
+    return schemas.BatchUploadResponse(
+        total=len(results),
+        processed=sum(1 for result in results if result.status == resume_batch.BATCH_STATUS_PROCESSED),
+        duplicates=sum(1 for result in results if result.status == resume_batch.BATCH_STATUS_DUPLICATE),
+        failed=sum(1 for result in results if result.status == resume_batch.BATCH_STATUS_FAILED),
+        results=results,
     )
 
+@router.get("/jobs/{job_id}", response_model=schemas.UploadJobStatus)
+def read_upload_job(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Reports the current stage of a background upload job and, once completed, the processed resume.
+    """
+    db_job = crud_job.get_upload_job(db, job_id=job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    job_status = schemas.UploadJobStatus.model_validate(db_job)
+    if db_job.stage == resume_pipeline.STAGE_COMPLETED and db_job.resume_id is not None:
+        db_resume = crud_resume.get_resume_by_id(db, resume_id=db_job.resume_id)
+        if db_resume is not None:
+            job_status.result = schemas.ResumeDetail.model_validate(db_resume)
+    return job_status
+
 @router.get("/", response_model=List[schemas.ResumeListInfo])
 def read_resumes(
     skip: int = Query(0, ge=0), 
@@ -150,35 +210,270 @@ def read_resumes(
     logger.info(f"Retrieved {len(resumes)} resumes from DB.")
     return [schemas.ResumeListInfo.model_validate(resume) for resume in resumes]
 
-@router.get("/{resume_id}", response_model=schemas.ResumeDetail)
+@router.get("/page", response_model=schemas.ResumePage)
+def read_resume_page(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    order: Literal["desc", "asc"] = Query("desc", description="Sort by upload time (then id)"),
+    email: Optional[str] = Query(None, description="Exact email match"),
+    name: Optional[str] = Query(None, description="Name prefix"),
+    file_name: Optional[str] = Query(None, description="File name prefix"),
+    uploaded_after: Optional[datetime] = Query(None),
+    uploaded_before: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Lists resumes page by page using keyset pagination on (uploaded_at, id), selecting only
+    the summary columns. Unlike `GET /resumes/`, the cost of a page does not grow with its position.
+    Filters must stay the same while following `next_cursor`.
+    """
+    descending = order == "desc"
+    try:
+        after = pagination.decode_cursor(cursor, descending) if cursor else None
+    except pagination.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = crud_resume.get_resume_page(
+        db, limit=limit + 1, after=after, descending=descending,
+        email=email, name_prefix=name, file_name_prefix=file_name,
+        uploaded_after=uploaded_after, uploaded_before=uploaded_before,
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor(rows[-1].cursor_uploaded_at, rows[-1].id, descending)
+    return schemas.ResumePage(items=[schemas.ResumeListInfo.model_validate(row) for row in rows], next_cursor=next_cursor)
+
+@router.get("/search", response_model=schemas.ResumeSearchResults)
+def search_resumes(
+    q: Optional[str] = Query(None, description="Keywords, matched against the summary and full resume text"),
+    technical_skills: List[str] = Query([], description="Exact technical skill names"),
+    soft_skills: List[str] = Query([], description="Exact soft skill names"),
+    certifications: List[str] = Query([], description="Exact certification names"),
+    match: Literal["any", "all"] = Query("any", description="Whether a resume needs any or all of the values of each list"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Searches stored resumes by keywords and/or skills, best matches first.
+    Uses the full-text and JSONB GIN indexes on PostgreSQL, and an FTS5 table on SQLite.
+    """
+    if not (q and q.strip()) and not (technical_skills or soft_skills or certifications):
+        raise HTTPException(status_code=400, detail="Provide keywords (q) and/or at least one skill or certification.")
+    logger.info(f"Searching resumes: q={q!r}, technical_skills={technical_skills}, soft_skills={soft_skills}, certifications={certifications}, match={match}")
+    rows = crud_resume_search.search_resumes(
+        db, keywords=q, technical_skills=technical_skills, soft_skills=soft_skills, certifications=certifications,
+        match_all=match == "all", limit=limit + 1, offset=offset,
+    )
+    next_offset = offset + limit if len(rows) > limit else None
+    return schemas.ResumeSearchResults(items=[schemas.ResumeSearchHit.model_validate(row) for row in rows[:limit]], next_offset=next_offset)
+
+@router.post("/match", response_model=schemas.ResumeMatchResponse)
+def match_resumes(
+    request: schemas.ResumeMatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Returns the stored resumes most similar to a job description, using the local vector index
+    (no LLM calls). Scores are cosine similarities of hashed word/bigram features.
+    """
+    if not settings.VECTOR_INDEX_ENABLED:
+        raise HTTPException(status_code=503, detail="Resume matching is disabled (VECTOR_INDEX_ENABLED).")
+    matches = vector_index.match([request.job_description], request.top_k)[0]
+    summaries = crud_resume.get_resume_summaries(db, [resume_id for resume_id, _ in matches])
+    items = [
+        schemas.ResumeMatch(**schemas.ResumeListInfo.model_validate(summaries[resume_id]).model_dump(), score=score)
+        for resume_id, score in matches
+        if resume_id in summaries # Skip entries for resumes deleted outside the API
+    ]
+    logger.info(f"Matched job description against {len(vector_index.get_index())} indexed resumes, returning {len(items)}")
+    return schemas.ResumeMatchResponse(items=items, indexed_resumes=len(vector_index.get_index()))
+
+@router.get("/export")
+def export_resumes(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="NDJSON keeps the JSON sections as-is; CSV flattens them"),
+    uploaded_after: Optional[datetime] = Query(None, description="Only resumes uploaded at or after this time"),
+    uploaded_before: Optional[datetime] = Query(None, description="Only resumes uploaded before this time"),
+    processed_only: bool = Query(True, description="Skip resumes without an LLM analysis"),
+    include_raw_text: bool = Query(False, description="Also export the full extracted text"),
+):
+    """
+    Streams every matching resume in ID order. Rows are read from a server-side cursor and
+    written as they arrive, so memory use doesn't grow with the number of resumes.
+    """
+    if database.SessionLocal is None:
+        raise HTTPException(status_code=500, detail="Database not configured.")
+    def as_utc(value: datetime) -> datetime:
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value # Naive bounds are UTC, like the stored times
+    if uploaded_after and uploaded_before and as_utc(uploaded_after) >= as_utc(uploaded_before):
+        raise HTTPException(status_code=400, detail="uploaded_after must be earlier than uploaded_before.")
+    logger.info(f"Exporting resumes as {format}: uploaded_after={uploaded_after}, uploaded_before={uploaded_before}, processed_only={processed_only}")
+    file_name = f"resumes-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.{format}"
+    return StreamingResponse(
+        resume_export.stream_export(
+            format, uploaded_after=uploaded_after, uploaded_before=uploaded_before,
+            processed_only=processed_only, include_raw_text=include_raw_text,
+        ),
+        media_type=resume_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+@router.get("/stats", response_model=schemas.ResumeStats)
+def read_resume_stats(
+    top: int = Query(20, ge=1, le=200, description="Number of skills and suggestions returned per list"),
+    db: Session = Depends(get_db)
+):
+    """
+    Aggregate statistics over all processed resumes: score histogram and the most frequent skills
+    and upskill suggestions. Reads precomputed counters, so the cost doesn't grow with the number of resumes.
+    """
+    processed = crud_stats.get_counter(db, crud_stats.KIND_RESUMES, "processed")
+    score = crud_stats.get_counter(db, crud_stats.KIND_SCORE, "overall")
+    buckets = {int(counter.key): counter.count for counter in crud_stats.get_counters(db, crud_stats.KIND_SCORE_BUCKET)}
+
+    def top_counts(kind: str) -> List[schemas.StatCount]:
+        return [schemas.StatCount(name=counter.key, count=counter.count) for counter in crud_stats.get_counters(db, kind, limit=top)]
+
+    scored = score.count if score else 0
+    return schemas.ResumeStats(
+        processed_resumes=processed.count if processed else 0,
+        scored_resumes=scored,
+        average_score=round(score.total / scored, 2) if scored > 0 else None,
+        score_histogram=[schemas.ScoreBucket(score=bucket, count=buckets.get(bucket, 0)) for bucket in range(crud_stats.MAX_SCORE + 1)],
+        technical_skills=top_counts(crud_stats.SKILL_KINDS["technical_skills"]),
+        soft_skills=top_counts(crud_stats.SKILL_KINDS["soft_skills"]),
+        other_skills=top_counts(crud_stats.SKILL_KINDS["other_skills"]),
+        upskill_suggestions=top_counts(crud_stats.KIND_UPSKILL),
+    )
+
+PayloadGroup = Literal["raw_text", "llm_analysis", "sections"]
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    requested = sorted({field.strip() for field in fields.split(",") if field.strip()})
+    unknown = [field for field in requested if field not in schemas.ResumeDetail.model_fields]
+    if unknown or not requested:
+        raise HTTPException(status_code=400, detail=f"Unknown or missing fields: {', '.join(unknown) or fields!r}. Valid fields: {', '.join(schemas.ResumeDetail.model_fields)}.")
+    return requested
+
+def _excluded_groups(exclude: List[str], fields: Optional[List[str]]) -> List[str]:
+    # Payload groups that are neither loaded nor returned: the excluded ones, plus those `fields` doesn't ask for
+    excluded = set(exclude)
+    if fields is not None:
+        excluded.update(group for group in crud_resume.RESUME_PAYLOAD_GROUPS if not set(crud_resume.payload_column_names([group])) & set(fields))
+    return sorted(excluded)
+
+def _resume_detail_json(db_resume, excluded_groups: List[str], fields: Optional[List[str]] = None) -> bytes:
+    """
+    ResumeDetail JSON for `db_resume`. Fields of the excluded payload groups are neither loaded nor returned;
+    with `fields`, only those fields are returned.
+    """
+    excluded_fields = set(crud_resume.payload_column_names(excluded_groups))
+    data = {field: getattr(db_resume, field) for field in schemas.ResumeDetail.model_fields if field not in excluded_fields}
+    detail = schemas.ResumeDetail.model_validate(data)
+    return detail.model_dump_json(include=set(fields) if fields is not None else None, exclude=excluded_fields).encode()
+
+def _resume_detail_response(db_resume, exclude: List[str]):
+    if not exclude:
+        return schemas.ResumeDetail.model_validate(db_resume)
+    return Response(content=_resume_detail_json(db_resume, exclude), media_type="application/json")
+
+@router.get(
+    "/{resume_id}",
+    response_model=schemas.ResumeDetail,
+    responses={304: {"description": "Not modified since the ETag (If-None-Match) or date (If-Modified-Since) given"}},
+)
 def read_resume_details(
     resume_id: int,
+    request: Request,
+    exclude: List[PayloadGroup] = Query([], description="Payload groups to leave out of the response (and not load): raw_text, llm_analysis, sections"),
+    fields: Optional[str] = Query(None, description="Comma-separated ResumeDetail fields to return, e.g. `id,name,llm_analysis`; payload groups not needed are not loaded"),
     db: Session = Depends(get_db)
 ):
     """
     Retrieves detailed information for a specific resume by its ID.
+    Responses carry an ETag and Last-Modified and answer conditional requests with 304. Serialized
+    (and compressed) bodies are cached per resume version, so repeated reads only query the version.
     """
-    logger.info(f"Fetching details for resume ID: {resume_id}")
-    db_resume = crud_resume.get_resume_by_id(db, resume_id=resume_id)
-    if db_resume is None:
+    requested_fields = _parse_fields(fields)
+    excluded_groups = _excluded_groups(exclude, requested_fields)
+    variant = format(zlib.crc32(f"{','.join(excluded_groups)}|{','.join(requested_fields or [])}".encode()), "08x")
+
+    current = crud_resume.get_resume_version(db, resume_id)
+    if current is None:
         logger.warning(f"Resume with ID {resume_id} not found.")
         raise HTTPException(status_code=404, detail="Resume not found")
-    logger.info(f"Successfully retrieved details for resume ID: {resume_id}")
-    return schemas.ResumeDetail.model_validate(db_resume)
+    version, last_modified = current.version or 0, current.updated_at or current.uploaded_at
+    headers = http_cache.validator_headers(http_cache.make_etag(resume_id, version, variant), last_modified)
+    if http_cache.is_not_modified(request.headers, headers["ETag"], last_modified):
+        return Response(status_code=304, headers=headers)
+
+    cached = http_cache.get(resume_id, variant, version)
+    if cached is None:
+        logger.info(f"Fetching details for resume ID: {resume_id}")
+        load_groups = [group for group in crud_resume.RESUME_PAYLOAD_GROUPS if group not in excluded_groups]
+        db_resume = crud_resume.get_resume_by_id(db, resume_id=resume_id, load_groups=load_groups)
+        if db_resume is None:
+            raise HTTPException(status_code=404, detail="Resume not found")
+        # Tag the body with the version it was actually built from (it may have changed since the check above)
+        version, last_modified = db_resume.version or 0, db_resume.updated_at or db_resume.uploaded_at
+        headers = http_cache.validator_headers(http_cache.make_etag(resume_id, version, variant), last_modified)
+        cached = http_cache.put(resume_id, variant, version, _resume_detail_json(db_resume, excluded_groups, requested_fields))
+
+    encoding = http_cache.negotiate_encoding(request.headers.get("accept-encoding"), cached.bodies)
+    if encoding != http_cache.ENCODING_IDENTITY:
+        headers["Content-Encoding"] = encoding
+    return Response(content=cached.bodies[encoding], media_type="application/json", headers=headers)
 
 @router.delete("/{resume_id}", response_model=schemas.ResumeDetail) # Or a simple message
 def delete_resume_entry(
     resume_id: int,
+    exclude: List[PayloadGroup] = Query([], description="Payload groups to leave out of the returned resume (and not load)"),
     db: Session = Depends(get_db)
 ):
     """
     Deletes a resume entry from the database.
     """
     logger.info(f"Attempting to delete resume ID: {resume_id}")
-    deleted_resume = crud_resume.delete_resume(db, resume_id=resume_id)
+    load_groups = [group for group in crud_resume.RESUME_PAYLOAD_GROUPS if group not in exclude]
+    deleted_resume = crud_resume.delete_resume(db, resume_id=resume_id, load_groups=load_groups)
     if deleted_resume is None:
         logger.warning(f"Resume with ID {resume_id} not found for deletion.")
         raise HTTPException(status_code=404, detail="Resume not found for deletion")
+    vector_index.remove_resume(resume_id)
     logger.info(f"Successfully deleted resume ID: {resume_id}")
     # The object is detached but contains the data before deletion.
-    return schemas.ResumeDetail.model_validate(deleted_resume) 
\ No newline at end of file
+    return _resume_detail_response(deleted_resume, exclude)
+
+@router.post("/{resume_id}/reprocess", response_model=schemas.ResumeUploadResponse)
+def reprocess_resume(
+    resume_id: int,
+    from_stage: Optional[Literal["llm_extraction", "llm_analysis"]] = Query(
+        None,
+        description="Stage to restart from; outputs of earlier stages are reused. "
+                    "Defaults to the first stage that has not completed (see `failed_stage` on the resume).",
+    ),
+):
+    """
+    Resumes processing of a stored resume, e.g. after a failed LLM analysis, without uploading it again.
+    Completed stages are not repeated: reprocessing from llm_analysis reuses the stored extraction.
+    """
+    _ensure_llm_configured()
+    if database.SessionLocal is None:
+        raise HTTPException(status_code=500, detail="Database not configured.")
+    try:
+        result = resume_pipeline.reprocess_resume(database.SessionLocal, resume_id, from_stage=from_stage)
+    except resume_pipeline.PipelineError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    if result.from_stage is None:
+        message = "Resume is already fully processed; nothing was reprocessed."
+    else:
+        message = f"Resume reprocessed from stage '{result.from_stage}'."
+    return schemas.ResumeUploadResponse(
+        message=message,
+        resume_id=resume_id,
+        data=schemas.ResumeDetail.model_validate(result.resume),
+    )
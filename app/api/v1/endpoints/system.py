@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+
+from app.api.v1 import schemas
+from app.core.config import settings
+from app.db import database
+from app.db.pool import pool_metrics
+from app.services import llm_cache, rate_limiter
+from app.utils import http_cache
+
+router = APIRouter()
+
+@router.get("/llm-cache", response_model=schemas.LLMCacheStats)
+def read_llm_cache_stats():
+    """
+    Hit/miss counters of the LLM result cache, including the LLM time saved by hits.
+    """
+    return schemas.LLMCacheStats(**llm_cache.stats())
+
+@router.get("/response-cache", response_model=schemas.ResponseCacheStats)
+def read_response_cache_stats():
+    """
+    Counters of the GET /resumes/{id} response cache.
+    """
+    return schemas.ResponseCacheStats(enabled=settings.RESPONSE_CACHE_ENABLED, **http_cache.stats())
+
+@router.get("/llm-rate-limit", response_model=schemas.LLMRateLimitStats)
+def read_llm_rate_limit_stats():
+    """
+    State of the shared LLM rate limiter: current adaptive rate factor, throttling and wait counters.
+    """
+    return schemas.LLMRateLimitStats(enabled=settings.LLM_RATE_LIMIT_ENABLED, **rate_limiter.limiter.stats())
+
+@router.get("/db-pool", response_model=schemas.DBPoolStats)
+def read_db_pool_stats():
+    """
+    Connection pool usage of the sync and async engines: connections in use, checkouts waiting and time spent waiting.
+    """
+    async_engine = database.async_engine.sync_engine if database.async_engine is not None else None
+    return schemas.DBPoolStats(sync_pool=pool_metrics(database.engine), async_pool=pool_metrics(async_engine))
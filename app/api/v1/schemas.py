@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, HttpUrl
+from pydantic import BaseModel, EmailStr, Field, HttpUrl
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -133,6 +133,12 @@ class ResumeUpdate(ResumeBase): # All fields are optional for update after LLM p
 class ResumeInDBBase(ResumeBase):
     id: int
     uploaded_at: datetime
+    updated_at: Optional[datetime] = None
+    version: Optional[int] = None # Incremented on every update
+    processing_status: Optional[str] = None # processing, completed or failed
+    failed_stage: Optional[str] = None # Pipeline stage of the last failure; see POST /resumes/{id}/reprocess
+    processing_error: Optional[str] = None
+    stage_timings: Optional[Dict[str, float]] = None # Seconds per pipeline stage of the last processing run, and pdf_page_max/pdf_page_mean
     raw_text: Optional[str] = None
     llm_analysis: Optional[LLMAnalysis] = None
 
@@ -155,7 +161,129 @@ class ResumeListInfo(BaseModel):
     class Config:
         from_attributes = True
 
+class ResumePage(BaseModel):
+    items: List[ResumeListInfo]
+    next_cursor: Optional[str] = None # Pass as `cursor` to fetch the next page; None on the last page
+
+class ResumeSearchHit(ResumeListInfo):
+    rank: float # Relevance to the keywords; 0 when searching by skills only
+
+class ResumeSearchResults(BaseModel):
+    items: List[ResumeSearchHit]
+    next_offset: Optional[int] = None # Pass as `offset` for the next page; None on the last page
+
+class ResumeMatchRequest(BaseModel):
+    job_description: str = Field(..., min_length=1)
+    top_k: int = Field(10, ge=1, le=100)
+
+class ResumeMatch(ResumeListInfo):
+    score: float # Cosine similarity between the job description and the resume, in [-1, 1]
+
+class ResumeMatchResponse(BaseModel):
+    items: List[ResumeMatch]
+    indexed_resumes: int # Size of the index searched
+
+class StatCount(BaseModel):
+    name: str # Normalized (lowercase) skill or suggestion
+    count: int # Number of resumes mentioning it
+
+class ScoreBucket(BaseModel):
+    score: int # Overall scores in [score, score + 1); 10 holds perfect scores
+    count: int
+
+class ResumeStats(BaseModel):
+    processed_resumes: int # Resumes with an LLM analysis
+    scored_resumes: int
+    average_score: Optional[float] = None
+    score_histogram: List[ScoreBucket]
+    technical_skills: List[StatCount]
+    soft_skills: List[StatCount]
+    other_skills: List[StatCount]
+    upskill_suggestions: List[StatCount]
+
 class ResumeUploadResponse(BaseModel):
     message: str
     resume_id: int
-    data: ResumeDetail 
\ No newline at end of file
+    duplicate_of: Optional[int] = None # Set when the results of an identical earlier upload were reused
+    data: ResumeDetail 
+
+# Background upload job schemas
+class UploadJobStatus(BaseModel):
+    id: str
+    file_name: str
+    stage: str # queued, extracting_text, llm_extraction, llm_analysis (or llm_extract_analyze), saving, completed, failed
+    attempts: int = 0
+    error: Optional[str] = None
+    resume_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    result: Optional[ResumeDetail] = None # Populated once the job has completed
+
+    class Config:
+        from_attributes = True
+
+# Batch upload schemas
+class BatchItemResult(BaseModel):
+    file_name: str
+    status: str # processed, duplicate or failed
+    resume_id: Optional[int] = None
+    duplicate_of: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    total: int
+    processed: int
+    duplicates: int
+    failed: int
+    results: List[BatchItemResult]
+
+# Operational schemas
+class LLMCacheStats(BaseModel):
+    enabled: bool
+    memory_hits: int
+    db_hits: int
+    misses: int
+    stores: int
+    evictions: int
+    memory_entries: int
+    hit_ratio: float
+    saved_llm_calls: int
+    saved_llm_seconds: float # Sum of the original LLM latency for every cache hit
+
+class ResponseCacheStats(BaseModel):
+    enabled: bool
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int # Cached variants dropped because their resume was updated or deleted
+    entries: int
+    bytes: int # Including every stored encoding
+
+class LLMRateLimitStats(BaseModel):
+    enabled: bool
+    acquired: int # LLM calls admitted by the limiter
+    throttled: int # Calls that came back with a rate limit response
+    waits: int
+    wait_seconds: float # Total time callers spent waiting for budget
+    in_flight: int
+    rate_factor: float # Current AIMD factor applied to the configured budgets
+    paused_for_seconds: float
+    requests_per_minute: float
+    tokens_per_minute: float
+    max_concurrency: int
+
+class DBPoolMetrics(BaseModel):
+    pool_size: int
+    checked_out: int # Connections currently in use
+    checked_in: int # Idle connections in the pool
+    overflow: int # Connections open beyond pool_size
+    waiting: int # Checkouts currently waiting for a connection
+    checkouts: int
+    timeouts: int # Checkouts that gave up after DB_POOL_TIMEOUT
+    wait_seconds: float # Total time spent in checkouts
+    max_wait_seconds: float
+    avg_wait_ms: float
+
+class DBPoolStats(BaseModel):
+    sync_pool: Optional[DBPoolMetrics] = None # None when the engine is unavailable or uses an uninstrumented pool
+    async_pool: Optional[DBPoolMetrics] = None
@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Offline benchmark of the upload pipeline, run as `python -m app.benchmark`.
+# Drives the real FastAPI app in-process (httpx ASGI transport, lifespan included) against a
+# temporary SQLite database, with llm_service.llm replaced by the deterministic FakeChatModel
+# (app/services/fake_llm.py), so no API key or network is needed and runs are repeatable.
+# Writes a JSON report (throughput, request and per-stage latency percentiles, memory high-water
+# marks) that can be diffed between releases, or compared with --compare.
+
+REPORT_FORMAT_VERSION = 1
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "docs" / "sample_resumes"
+
+class Profile(NamedTuple):
+    documents: str # "samples" (docs/sample_resumes) or "large" (synthetic multi-page PDF and DOCX files)
+    concurrency: int # Uploads in flight
+    requests: int
+    throttle_rate: float = 0.0 # Fake LLM calls answered with HTTP 429
+    malformed_rate: float = 0.0 # Fake LLM answers that are truncated JSON
+
+PROFILES = {
+    "smoke": Profile("samples", concurrency=2, requests=10),
+    "steady": Profile("samples", concurrency=8, requests=100),
+    "burst": Profile("samples", concurrency=32, requests=200),
+    "faults": Profile("samples", concurrency=8, requests=60, throttle_rate=0.1, malformed_rate=0.05),
+    "large_docs": Profile("large", concurrency=4, requests=20),
+}
+
+_CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+def _configure_environment(work_dir: str, args: argparse.Namespace) -> None:
+    # Must run before app.core.config is imported: settings are read once, at import
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'benchmark.db')}"
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(work_dir, "vector_index")
+    os.environ["LLM_PROVIDER"] = "stub" # Replaced per profile by a configured FakeChatModel
+    for route_setting in ("LLM_EXTRACTION_MODEL", "LLM_ANALYSIS_MODEL", "LLM_COMBINED_MODEL", "LLM_FALLBACK_MODEL"):
+        os.environ[route_setting] = "" # Every operation uses the default (fake) model
+    os.environ["LLM_CACHE_ENABLED"] = "false" # Every upload reaches the (fake) LLM
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.llm_requests_per_minute)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_max_concurrency)
+    if args.pipeline_mode:
+        os.environ["LLM_PIPELINE_MODE"] = args.pipeline_mode
+
+# --- Documents ---
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def synthetic_pdf(pages: int, lines_per_page: int = 45) -> bytes:
+    """A text PDF of `pages` pages of resume-like lines, written directly (no PDF library needed)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"Senior Engineer {page + 1}.{line + 1}: led Python, SQL and AWS projects, improving throughput by {line + 10}%." for line in range(lines_per_page)]
+        if page == 0:
+            lines = ["Jordan Example", "jordan.example@example.com | +1 555 010 0000", "Summary"] + lines
+        stream = "BT /F1 10 Tf 50 780 Td 14 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {pages} >>"
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref_offset = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+    for offset in offsets:
+        output.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+    output.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1"))
+    return output.getvalue()
+
+def synthetic_docx(paragraphs: int) -> bytes:
+    """A DOCX with a contact header and `paragraphs` experience paragraphs."""
+    import docx
+
+    document = docx.Document()
+    document.add_heading("Jordan Example", level=1)
+    document.add_paragraph("jordan.example@example.com | +1 555 010 0000")
+    document.add_heading("Work Experience", level=2)
+    for number in range(paragraphs):
+        document.add_paragraph(f"Project lead {number + 1}: delivered Python and SQL services with an Agile team, cutting costs by {number % 40 + 5}%.")
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+def load_documents(kind: str, large_pdf_pages: int, large_docx_paragraphs: int) -> List[Tuple[str, bytes]]:
+    if kind == "large":
+        return [
+            (f"synthetic-{large_pdf_pages}-pages.pdf", synthetic_pdf(large_pdf_pages)),
+            (f"synthetic-{large_docx_paragraphs}-paragraphs.docx", synthetic_docx(large_docx_paragraphs)),
+        ]
+    documents = [(path.name, path.read_bytes()) for path in sorted(SAMPLE_DIR.iterdir()) if path.suffix.lower() in _CONTENT_TYPES]
+    if not documents:
+        raise SystemExit(f"No sample resumes found in {SAMPLE_DIR}")
+    return documents
+
+# --- Measurements ---
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (0 <= q <= 100) of an ascending list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def _summary(values: List[float]) -> Dict[str, Any]:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(values[-1], 4),
+    }
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0 # Not Linux; the ru_maxrss figures in the report still apply
+
+def _max_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(who).ru_maxrss
+    return round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class _RssSampler:
+    """High-water mark of this process's resident memory while a profile runs."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_bytes = self.peak_bytes = _rss_bytes()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        while True:
+            self.peak_bytes = max(self.peak_bytes, _rss_bytes())
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "_RssSampler":
+        self._task = asyncio.get_running_loop().create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._task.cancel()
+        self.peak_bytes = max(self.peak_bytes, _rss_bytes())
+
+# --- Runs ---
+
+async def _upload(client: Any, name: str, content: bytes) -> Dict[str, Any]:
+    started = time.perf_counter()
+    files = {"file": (name, content, _CONTENT_TYPES[Path(name).suffix.lower()])}
+    response = await client.post("/api/v1/resumes/upload", files=files, params={"on_duplicate": "reprocess"})
+    seconds = time.perf_counter() - started
+    stage_timings = {}
+    if response.status_code == 200:
+        stage_timings = (response.json().get("data") or {}).get("stage_timings") or {}
+    return {"status": response.status_code, "seconds": seconds, "stage_timings": stage_timings}
+
+async def run_profile(client: Any, name: str, profile: Profile, documents: List[Tuple[str, bytes]], args: argparse.Namespace) -> Dict[str, Any]:
+    from app.services import fake_llm, llm_service, rate_limiter
+
+    fake = fake_llm.FakeChatModel(
+        latency_median_seconds=args.latency_median, latency_sigma=args.latency_sigma,
+        throttle_rate=profile.throttle_rate, malformed_rate=profile.malformed_rate, seed=args.seed,
+    )
+    llm_service.llm = fake
+    rate_limiter.limiter = rate_limiter.build_limiter() # No adaptive slowdown carried over from the previous profile
+
+    semaphore = asyncio.Semaphore(profile.concurrency)
+
+    async def one(number: int) -> Dict[str, Any]:
+        file_name, content = documents[number % len(documents)]
+        async with semaphore:
+            return await _upload(client, file_name, content)
+
+    logger.info(f"Profile '{name}': {profile.requests} uploads at concurrency {profile.concurrency}.")
+    with _RssSampler() as sampler:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(number) for number in range(profile.requests)))
+        duration = time.perf_counter() - started
+
+    status_counts: Dict[str, int] = {}
+    for result in results:
+        status_counts[str(result["status"])] = status_counts.get(str(result["status"]), 0) + 1
+    stage_seconds: Dict[str, List[float]] = {}
+    for result in results:
+        for stage, seconds in result["stage_timings"].items():
+            stage_seconds.setdefault(stage, []).append(seconds)
+    succeeded = status_counts.get("200", 0)
+    return {
+        "profile": profile._asdict(),
+        "duration_seconds": round(duration, 3),
+        "throughput_per_second": round(succeeded / duration, 3) if duration else None,
+        "status_counts": status_counts,
+        "request_seconds": _summary([result["seconds"] for result in results]),
+        "stage_seconds": {stage: _summary(values) for stage, values in sorted(stage_seconds.items())},
+        "fake_llm": fake.stats(),
+        "memory": {
+            "rss_start_mb": round(sampler.start_bytes / (1024 * 1024), 1),
+            "rss_peak_mb": round(sampler.peak_bytes / (1024 * 1024), 1),
+        },
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SAMPLE_DIR.parent.parent, capture_output=True, text=True, check=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+async def run_benchmark(profile_names: List[str], args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from app.core.config import settings
+    from app.main import app
+
+    profiles = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name in profile_names:
+                profile = PROFILES[name]
+                overrides = {key: getattr(args, key) for key in ("concurrency", "requests") if getattr(args, key) is not None}
+                if args.throttle_rate is not None:
+                    overrides["throttle_rate"] = args.throttle_rate
+                if args.malformed_rate is not None:
+                    overrides["malformed_rate"] = args.malformed_rate
+                profile = profile._replace(**overrides)
+                documents = load_documents(profile.documents, args.large_pdf_pages, args.large_docx_paragraphs)
+                profiles[name] = await run_profile(client, name, profile, documents, args)
+
+    return {
+        "format_version": REPORT_FORMAT_VERSION,
+        "metadata": {
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {
+                "GEMINI_MODEL_NAME": settings.GEMINI_MODEL_NAME,
+                "LLM_PIPELINE_MODE": settings.LLM_PIPELINE_MODE,
+                "LLM_REQUESTS_PER_MINUTE": settings.LLM_REQUESTS_PER_MINUTE,
+                "LLM_MAX_CONCURRENCY": settings.LLM_MAX_CONCURRENCY,
+                "PARSE_SANDBOX_ENABLED": settings.PARSE_SANDBOX_ENABLED,
+                "PARSE_WORKERS": settings.PARSE_WORKERS,
+            },
+            "fake_llm": {"latency_median_seconds": args.latency_median, "latency_sigma": args.latency_sigma, "seed": args.seed},
+        },
+        "profiles": profiles,
+        "memory": {
+            "max_rss_mb": _max_rss_mb(resource.RUSAGE_SELF),
+            "max_rss_children_mb": _max_rss_mb(resource.RUSAGE_CHILDREN), # Parse sandbox and PDF workers
+        },
+    }
+
+def _change(current: Optional[float], baseline: Optional[float]) -> str:
+    if current is None or baseline is None:
+        return "n/a"
+    if not baseline:
+        return f"{current} (was {baseline})"
+    return f"{current} ({(current - baseline) / baseline * 100:+.1f}%)"
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Lines comparing throughput, latency percentiles and peak memory per profile with a baseline report."""
+    lines = [f"Compared with {baseline['metadata'].get('git_commit') or 'baseline'}:"]
+    for name, current in report["profiles"].items():
+        previous = baseline["profiles"].get(name)
+        if previous is None:
+            lines.append(f"  {name}: not in the baseline")
+            continue
+        lines.append(f"  {name}: throughput/s {_change(current['throughput_per_second'], previous['throughput_per_second'])}, "
+                     f"peak RSS MB {_change(current['memory']['rss_peak_mb'], previous['memory']['rss_peak_mb'])}")
+        lines.append(f"    request p50 {_change(current['request_seconds'].get('p50'), previous['request_seconds'].get('p50'))}, "
+                     f"p95 {_change(current['request_seconds'].get('p95'), previous['request_seconds'].get('p95'))}, "
+                     f"p99 {_change(current['request_seconds'].get('p99'), previous['request_seconds'].get('p99'))}")
+        for stage, summary in current["stage_seconds"].items():
+            previous_summary = previous["stage_seconds"].get(stage, {})
+            lines.append(f"    {stage} p95 {_change(summary.get('p95'), previous_summary.get('p95'))}")
+    return lines
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.benchmark", description="Offline benchmark of the resume upload pipeline with a fake LLM.")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES), help="Load profile to run (repeatable). Default: smoke.")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout).")
+    parser.add_argument("--compare", help="Baseline JSON report to compare the results with.")
+    parser.add_argument("--concurrency", type=int, help="Override the profiles' concurrency.")
+    parser.add_argument("--requests", type=int, help="Override the profiles' number of uploads.")
+    parser.add_argument("--throttle-rate", type=float, help="Override the profiles' share of fake LLM calls rejected with 429.")
+    parser.add_argument("--malformed-rate", type=float, help="Override the profiles' share of malformed fake LLM answers.")
+    parser.add_argument("--latency-median", type=float, default=0.5, help="Median fake LLM latency in seconds.")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Spread of the lognormal fake LLM latency.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the fake LLM's latencies and fault injection.")
+    parser.add_argument("--pipeline-mode", choices=["two_step", "combined", "split"], help="LLM_PIPELINE_MODE for the run.")
+    parser.add_argument("--llm-requests-per-minute", type=float, default=100_000, help="Rate limiter budget (high by default, so the fake LLM latency dominates).")
+    parser.add_argument("--llm-max-concurrency", type=int, default=64)
+    parser.add_argument("--large-pdf-pages", type=int, default=40)
+    parser.add_argument("--large-docx-paragraphs", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger.setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory(prefix="tunecv-benchmark-") as work_dir:
+        _configure_environment(work_dir, args)
+        report = asyncio.run(run_benchmark(args.profile or ["smoke"], args))
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(output)
+    if args.compare:
+        print("\n".join(compare(report, json.loads(Path(args.compare).read_text()))))
+
+if __name__ == "__main__":
+    main()
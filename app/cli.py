@@ -0,0 +1,142 @@
+import argparse
+import logging
+import time
+
+from app.core.config import settings
+from app.db import database
+
+logger = logging.getLogger(__name__)
+
+# Maintenance commands, run as `python -m app.cli <command>`.
+
+def rebuild_vector_index(args) -> None:
+    """Re-embeds every processed resume into an empty vector index."""
+    from app.crud import crud_resume
+    from app.services import vector_index
+
+    index = vector_index.get_index()
+    index.reset()
+    db = database.SessionLocal()
+    try:
+        batch, total = [], 0
+        for db_resume in crud_resume.iter_processed_resumes(db, batch_size=args.batch_size):
+            batch.append((db_resume.id, vector_index.embed_resume(vector_index.embedded_columns(db_resume))))
+            if len(batch) >= args.batch_size:
+                index.upsert(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            index.upsert(batch)
+            total += len(batch)
+    finally:
+        db.close()
+    logger.info(f"Vector index rebuilt with {total} resumes.")
+
+def rebuild_stats(args) -> None:
+    """Recomputes the resume statistics counters from the stored resumes."""
+    from app.crud import crud_stats
+
+    db = database.SessionLocal()
+    try:
+        expected = crud_stats.compute_all(crud_stats.iter_stat_columns(db, batch_size=args.batch_size))
+        stored = crud_stats.get_all_counters(db)
+        differences = {
+            key: delta for key, delta in crud_stats.diff(stored, expected).items()
+            if delta[0] != 0 or abs(delta[1]) > 1e-6 # Score sums may differ by float rounding
+        }
+        for kind, key in sorted(differences)[:args.show]:
+            count, total = stored.get((kind, key), (0, 0.0))
+            expected_count, expected_total = expected.get((kind, key), (0, 0.0))
+            logger.info(f"  {kind}/{key}: stored count={count} total={total}, expected count={expected_count} total={expected_total}")
+        logger.info(f"{len(differences)} of {len(expected)} counters differ from the stored resumes.")
+        if args.check:
+            if differences:
+                raise SystemExit(1)
+            return
+        crud_stats.replace_all(db, expected)
+        logger.info(f"Resume statistics rebuilt: {len(expected)} counters.")
+    finally:
+        db.close()
+
+def backfill(args) -> None:
+    """Re-runs the LLM stages for stored resumes whose results come from an older prompt or model."""
+    import signal
+    import threading
+    from app.crud import crud_backfill
+    from app.services import backfill as backfill_service, rate_limiter
+
+    options = backfill_service.BackfillOptions(stage=args.stage, sample=args.sample, limit=args.limit, force=args.force)
+    if args.dry_run:
+        estimate = backfill_service.estimate(database.SessionLocal, options)
+        requests_per_minute = settings.LLM_REQUESTS_PER_MINUTE * args.rate_share
+        logger.info(
+            f"Dry run: {estimate['resumes']} of {estimate['candidates']} candidate resumes would be processed "
+            f"with up to {estimate['llm_calls']} LLM calls, about {estimate['llm_calls'] / requests_per_minute:.0f} min "
+            f"at {requests_per_minute:g} requests per minute."
+        )
+        return
+
+    # This process gets its own share of the LLM budget, leaving the rest to the API server
+    rate_limiter.limiter = rate_limiter.build_limiter(args.rate_share)
+    stop = threading.Event()
+    def request_stop(signum, frame):
+        logger.info("Stopping after the current batch; run the same command again to continue.")
+        stop.set()
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    run_name = args.run_name or f"{args.stage}-{time.strftime('%Y%m%d-%H%M%S')}"
+    report = backfill_service.run(database.SessionLocal, run_name, options, concurrency=args.concurrency, batch_size=args.batch_size, stop=stop)
+    if report.status != crud_backfill.RUN_STATUS_COMPLETED:
+        raise SystemExit(1)
+
+def list_backfills(args) -> None:
+    """Lists recent backfill runs and their progress."""
+    from app.crud import crud_backfill
+
+    with database.session_scope() as db:
+        for db_run in crud_backfill.get_runs(db, limit=args.limit):
+            logger.info(
+                f"{db_run.name}: {db_run.status}, stage {db_run.stage}, up to resume ID {db_run.last_resume_id}, "
+                f"{db_run.succeeded} updated, {db_run.failed} failed, started {db_run.started_at}, options {db_run.options}"
+            )
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="TuneCV maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild-vector-index", help=rebuild_vector_index.__doc__)
+    rebuild_parser.add_argument("--batch-size", type=int, default=500)
+    rebuild_parser.set_defaults(handler=rebuild_vector_index)
+
+    stats_parser = subparsers.add_parser("rebuild-stats", help=rebuild_stats.__doc__)
+    stats_parser.add_argument("--check", action="store_true", help="Only report counters that differ; exit with status 1 if any do")
+    stats_parser.add_argument("--batch-size", type=int, default=1000)
+    stats_parser.add_argument("--show", type=int, default=20, help="Number of differing counters to print")
+    stats_parser.set_defaults(handler=rebuild_stats)
+
+    backfill_parser = subparsers.add_parser("backfill", help=backfill.__doc__)
+    backfill_parser.add_argument("--stage", choices=["llm_extraction", "llm_analysis"], default="llm_analysis",
+                                 help="llm_extraction re-runs extraction and analysis; llm_analysis reuses the stored extraction")
+    backfill_parser.add_argument("--run-name", help="Name of the run; an existing run continues where it stopped, with its original options")
+    backfill_parser.add_argument("--sample", type=float, default=1.0, help="Fraction of the stale resumes to process (stable by resume ID)")
+    backfill_parser.add_argument("--limit", type=int, help="Maximum number of resumes to process")
+    backfill_parser.add_argument("--force", action="store_true", help="Also process resumes whose results are current")
+    backfill_parser.add_argument("--dry-run", action="store_true", help="Only report how many resumes and LLM calls the run would take")
+    backfill_parser.add_argument("--concurrency", type=int, default=settings.BACKFILL_CONCURRENCY)
+    backfill_parser.add_argument("--batch-size", type=int, default=settings.BACKFILL_BATCH_SIZE, help="Resumes per commit and progress checkpoint")
+    backfill_parser.add_argument("--rate-share", type=float, default=settings.BACKFILL_RATE_SHARE, help="Share of the LLM rate budget to use")
+    backfill_parser.set_defaults(handler=backfill)
+
+    runs_parser = subparsers.add_parser("backfill-runs", help=list_backfills.__doc__)
+    runs_parser.add_argument("--limit", type=int, default=20)
+    runs_parser.set_defaults(handler=list_backfills)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if database.SessionLocal is None:
+        parser.error("DATABASE_URL is not configured.")
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,111 @@ class Settings(BaseSettings):
     # DATABASE_URL: str | None = DATABASE_URL
     GOOGLE_API_KEY: str | None = os.getenv("GOOGLE_API_KEY")
 
-    # Optional: Add more settings as needed, e.g., for LLM model name
-    # GEMINI_MODEL_NAME: str = "gemini-pro" 
+    # Database connection pools (each of the sync and async engines has its own)
+    DB_POOL_SIZE: int = 10 # Connections kept open
+    DB_MAX_OVERFLOW: int = 10 # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT: float = 10.0 # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800 # Connections older than this (seconds) are replaced on checkout
+
+    GEMINI_MODEL_NAME: str = "gemini-2.0-flash"
+    # "two_step" (extraction, then analysis), "combined" (one round trip for both),
+    # or "split" to A/B the two, sending LLM_COMBINED_SPLIT_PERCENT of resumes to combined mode
+    LLM_PIPELINE_MODE: str = "two_step"
+    LLM_COMBINED_SPLIT_PERCENT: int = 50
+    # Local section and contact detection before the LLM stages (app/services/pre_extractor.py): the extraction call
+    # gets the text without the contact details and list sections read locally, which fill the fields it leaves empty.
+    # The analysis (and the combined call) still gets the full text
+    LLM_PRE_EXTRACTION_ENABLED: bool = True
+
+    # LLM providers and routing (app/services/llm_providers.py). Models are named "provider:model_name"
+    # ("gemini:gemini-1.5-pro"; a bare name is a Gemini model; "stub" is the local fake model).
+    # An empty route uses the default model, GEMINI_MODEL_NAME from LLM_PROVIDER
+    LLM_PROVIDER: str = "gemini" # "stub" runs the app without an API key, for development and tests
+    LLM_EXTRACTION_MODEL: str = ""
+    LLM_ANALYSIS_MODEL: str = ""
+    LLM_COMBINED_MODEL: str = ""
+    LLM_STUB_LATENCY_SECONDS: float = 0.2 # Median latency of the stub model
+
+    # Hedged requests: a request still running after the LLM_HEDGE_PERCENTILE of recent latencies is also
+    # sent to LLM_FALLBACK_MODEL, and the first answer wins. A failed request fails over to it immediately.
+    LLM_FALLBACK_MODEL: str = "" # Empty disables hedging and failover
+    LLM_HEDGE_PERCENTILE: float = 95
+    LLM_HEDGE_MIN_SAMPLES: int = 20 # Successful requests observed before the percentile is used
+    LLM_HEDGE_INITIAL_DELAY_SECONDS: float = 20.0 # Deadline until then
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2.0 # Lower bound of the deadline
+
+    # Process-wide LLM rate limiting (app/services/rate_limiter.py)
+    LLM_RATE_LIMIT_ENABLED: bool = True
+    LLM_REQUESTS_PER_MINUTE: float = 15
+    LLM_TOKENS_PER_MINUTE: float = 1_000_000 # Input tokens, estimated from prompt length
+    LLM_MAX_CONCURRENCY: int = 8 # LLM calls in flight across the whole process
+    LLM_RATE_LIMIT_MIN_FACTOR: float = 0.1 # Floor for the adaptive rate factor after repeated throttling
+    LLM_RATE_LIMIT_RECOVERY_STEP: float = 0.05 # Rate factor regained per successful call
+    LLM_MAX_ATTEMPTS: int = 5 # Attempts per LLM call; only transient errors are retried
+    LLM_OUTPUT_FOLLOWUP_ENABLED: bool = True # Request missing or invalid output sections again (once), instead of failing
+
+    # Upload ingestion
+    # Requests above the size limits get 413 before their body is received (see app/utils/request_limits.py)
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024 # Per file; POST /resumes/upload bodies may add 64 KiB of multipart framing
+    MAX_BATCH_UPLOAD_BYTES: int = 200 * 1024 * 1024 # Whole POST /resumes/batch body
+    UPLOAD_SPOOL_THRESHOLD_BYTES: int = 2 * 1024 * 1024 # Uploaded files up to this size are received and processed without touching disk
+
+    # PDF text extraction: documents with at least this many pages are split into page ranges extracted
+    # in parallel. Without the parse sandbox they run in a process pool of PDF_PARALLEL_WORKERS; with it,
+    # on up to PDF_PARALLEL_WORKERS sandbox workers, so PARSE_WORKERS bounds the split (2 by default), and
+    # a long PDF occupies those workers while other uploads wait for them
+    PDF_PARALLEL_PAGE_THRESHOLD: int = 16
+    PDF_PARALLEL_WORKERS: int = 4
+
+    # Sandboxed PDF/DOCX parsing (app/utils/parse_sandbox.py)
+    PARSE_SANDBOX_ENABLED: bool = True
+    PARSE_WORKERS: int = 2
+    PARSE_TIMEOUT_SECONDS: float = 30.0 # Wall-clock limit per document; the worker is killed when exceeded
+    PARSE_MAX_MEMORY_MB: int = 512 # Address-space limit of each worker
+    PARSE_WORKER_MAX_JOBS: int = 50 # Documents parsed before a worker is replaced
+
+    # Batch uploads (POST /resumes/batch)
+    BATCH_MAX_FILES: int = 500 # Documents per request, counting the contents of ZIP archives
+    BATCH_CONCURRENCY: int = 4 # Files processed (and LLM calls in flight) at the same time
+
+    # Background upload jobs (POST /resumes/upload?background=true)
+    UPLOAD_JOB_WORKERS: int = 4 # Size of the in-process worker pool
+    UPLOAD_JOB_MAX_PENDING: int = 100 # Queued + running jobs before new ones are rejected with 503
+    UPLOAD_JOB_MAX_ATTEMPTS: int = 3 # A job interrupted more often than this (e.g. by restarts) is marked failed
+    # Jobs are leased to the process whose pool holds them, which renews the lease every third of this;
+    # another process takes a job over (e.g. after a crash) once its lease has expired
+    UPLOAD_JOB_LEASE_SECONDS: float = 60.0
+
+    # Backfills of stored resumes after prompt or model changes (`python -m app.cli backfill`)
+    BACKFILL_CONCURRENCY: int = 4 # Resumes processed at once
+    BACKFILL_BATCH_SIZE: int = 50 # Resumes per commit and progress checkpoint
+    BACKFILL_RATE_SHARE: float = 0.5 # Share of the LLM rate budget used, leaving the rest to the API
+
+    # Prometheus metrics at GET /metrics (app/utils/metrics.py)
+    METRICS_ENABLED: bool = True
+
+    # Streaming export (GET /resumes/export)
+    EXPORT_BATCH_SIZE: int = 1000 # Rows fetched per round trip from the server-side cursor
+    EXPORT_CHUNK_BYTES: int = 64 * 1024 # Output is sent in chunks of about this size
+
+    # Caching and compression of GET /resumes/{id} (app/utils/http_cache.py)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024 # Counting every stored encoding
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024 # Smaller responses are sent uncompressed
+
+    # Local vector index for POST /resumes/match (app/services/vector_index.py)
+    VECTOR_INDEX_ENABLED: bool = True
+    VECTOR_INDEX_DIR: str = "vector_index"
+    VECTOR_INDEX_DIM: int = 512 # Hashed feature dimensions; changing it requires a rebuild
+
+    # LLM result cache (app/services/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PERSISTENT: bool = True # Also keep results in the llm_cache_entries table
+    LLM_CACHE_MEMORY_ENTRIES: int = 512
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    LLM_CACHE_MAX_DB_BYTES: int = 256 * 1024 * 1024
+    LLM_CACHE_EVICTION_INTERVAL: int = 100 # Persistent writes between eviction passes
 
     class Config:
         case_sensitive = True
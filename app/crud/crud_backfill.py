@@ -0,0 +1,82 @@
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.db import models
+
+# Backfill runs (app/services/backfill.py): progress rows, and the selection of resumes a run processes.
+
+RUN_STATUS_RUNNING = "running"
+RUN_STATUS_COMPLETED = "completed"
+RUN_STATUS_STOPPED = "stopped" # Interrupted, or stopped because a whole batch failed; running it again continues
+
+MAX_RECORDED_FAILURES = 1000 # failed_resume_ids kept per run
+
+def get_run(db: Session, name: str) -> Optional[models.BackfillRun]:
+    return db.get(models.BackfillRun, name)
+
+def get_runs(db: Session, limit: int = 20) -> List[models.BackfillRun]:
+    return db.query(models.BackfillRun).order_by(models.BackfillRun.started_at.desc()).limit(limit).all()
+
+def create_run(db: Session, name: str, stage: str, options: Dict[str, Any]) -> models.BackfillRun:
+    db_run = models.BackfillRun(
+        name=name, stage=stage, status=RUN_STATUS_RUNNING, options=options,
+        last_resume_id=0, succeeded=0, failed=0, failed_resume_ids=[], llm_seconds=0.0,
+    )
+    db.add(db_run)
+    db.commit()
+    db.refresh(db_run)
+    return db_run
+
+def record_progress(
+    db: Session,
+    db_run: models.BackfillRun,
+    last_resume_id: int,
+    succeeded: int,
+    failed_resume_ids: Iterable[int],
+    llm_seconds: float,
+) -> None:
+    """
+    Advances the run past `last_resume_id`. Not committed: the caller commits it together with the
+    batch's results, so the stored position never gets ahead of (or behind) the stored results.
+    """
+    failed_resume_ids = list(failed_resume_ids)
+    db_run.last_resume_id = last_resume_id
+    db_run.succeeded += succeeded
+    db_run.failed += len(failed_resume_ids)
+    db_run.failed_resume_ids = (list(db_run.failed_resume_ids or []) + failed_resume_ids)[:MAX_RECORDED_FAILURES]
+    db_run.llm_seconds += llm_seconds
+
+def set_status(db: Session, db_run: models.BackfillRun, status: str) -> None:
+    db_run.status = status
+    db_run.finished_at = func.now() if status == RUN_STATUS_COMPLETED else None
+    db.commit()
+    db.refresh(db_run)
+
+def backfill_filter(version_column_name: str, current_versions: Iterable[str], reuse_extraction: bool, force: bool):
+    """
+    WHERE clause for the resumes a backfill stage applies to: completed (or pre-status) resumes with
+    raw text and, for analysis-only runs, an extraction to reuse. Unless `force`, only resumes whose
+    `version_column_name` isn't one of `current_versions` (results from an older prompt or model).
+    """
+    clauses = [
+        models.Resume.raw_text.isnot(None),
+        or_(models.Resume.processing_status.is_(None), models.Resume.processing_status == models.PROCESSING_STATUS_COMPLETED),
+    ]
+    if reuse_extraction:
+        clauses.append(or_(models.Resume.extracted_data.isnot(None), models.Resume.llm_analysis.isnot(None)))
+    if not force:
+        column = getattr(models.Resume, version_column_name)
+        clauses.append(or_(column.is_(None), column.notin_(list(current_versions))))
+    return clauses
+
+def get_candidate_ids(db: Session, clauses: List[Any], after_id: int, limit: int) -> List[int]:
+    """
+    The next `limit` matching resume IDs after `after_id`, in ID order (one keyset page).
+    """
+    query = select(models.Resume.id).where(models.Resume.id > after_id, *clauses).order_by(models.Resume.id).limit(limit)
+    return list(db.execute(query).scalars())
+
+def count_candidates(db: Session, clauses: List[Any], after_id: int = 0) -> int:
+    query = select(func.count()).select_from(models.Resume).where(models.Resume.id > after_id, *clauses)
+    return db.execute(query).scalar_one()
@@ -0,0 +1,94 @@
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+import uuid
+
+from app.db import models
+
+def create_upload_job(db: Session, file_name: str, file_path: str, content_hash: Optional[str] = None, on_duplicate: Optional[str] = None,
+                      locked_by: Optional[str] = None, locked_until: Optional[datetime] = None) -> models.UploadJob:
+    """
+    Creates a queued upload job for a file that has already been saved to disk,
+    optionally leased to the process that will run it.
+    """
+    db_job = models.UploadJob(
+        id=uuid.uuid4().hex, file_name=file_name, file_path=file_path,
+        content_hash=content_hash, on_duplicate=on_duplicate, stage="queued", attempts=0,
+        locked_by=locked_by, locked_until=locked_until,
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_upload_job(db: Session, job_id: str) -> Optional[models.UploadJob]:
+    """
+    Retrieves a single upload job by its ID.
+    """
+    return db.query(models.UploadJob).filter(models.UploadJob.id == job_id).first()
+
+def get_unfinished_jobs(db: Session, terminal_stages: tuple, lease_expired_at: Optional[datetime] = None) -> List[models.UploadJob]:
+    """
+    Retrieves all jobs that have not reached one of the given terminal stages, oldest first.
+    With `lease_expired_at`, only those without a lease or whose lease ended before that time.
+    """
+    query = db.query(models.UploadJob).filter(models.UploadJob.stage.notin_(terminal_stages))
+    if lease_expired_at is not None:
+        query = query.filter(or_(models.UploadJob.locked_until.is_(None), models.UploadJob.locked_until < lease_expired_at))
+    return query.order_by(models.UploadJob.created_at).all()
+
+def claim_job(db: Session, job_id: str, owner: str, now: datetime, locked_until: datetime, terminal_stages: tuple) -> bool:
+    """
+    Leases an unfinished job to `owner` until `locked_until`, if it is free: not leased, leased to
+    `owner` already, or with an expired lease. A single conditional UPDATE, so of several processes
+    claiming the same job exactly one succeeds. Returns whether the claim did.
+    """
+    result = db.execute(
+        update(models.UploadJob)
+        .where(
+            models.UploadJob.id == job_id,
+            models.UploadJob.stage.notin_(terminal_stages),
+            or_(models.UploadJob.locked_by == owner, models.UploadJob.locked_until.is_(None), models.UploadJob.locked_until < now),
+        )
+        .values(locked_by=owner, locked_until=locked_until)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def renew_leases(db: Session, owner: str, locked_until: datetime, terminal_stages: tuple) -> int:
+    """
+    Extends the leases `owner` holds on unfinished jobs. Returns the number of jobs renewed.
+    """
+    result = db.execute(
+        update(models.UploadJob)
+        .where(models.UploadJob.locked_by == owner, models.UploadJob.stage.notin_(terminal_stages))
+        .values(locked_until=locked_until)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+def release_leases(db: Session, owner: str, terminal_stages: tuple) -> int:
+    """
+    Gives up the leases `owner` holds on unfinished jobs, so another process can take them over at once.
+    """
+    result = db.execute(
+        update(models.UploadJob)
+        .where(models.UploadJob.locked_by == owner, models.UploadJob.stage.notin_(terminal_stages))
+        .values(locked_by=None, locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+def update_job(db: Session, db_job: models.UploadJob, **fields) -> models.UploadJob:
+    """
+    Sets the given fields on a job and commits.
+    """
+    for key, value in fields.items():
+        setattr(db_job, key, value)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
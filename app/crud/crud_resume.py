@@ -1,82 +1,357 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional, Type
-from pydantic import HttpUrl
+from sqlalchemy import String, func, select, tuple_, type_coerce, update
+from sqlalchemy.orm import Session, undefer_group
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
 
 from app.db import models # Corrected: Direct import of models module
 from app.api.v1 import schemas # Corrected: Direct import of schemas module
+from app.crud import crud_stats
+from app.utils import http_cache
 
-# Helper to convert Pydantic schema to dictionary, excluding unset values for updates
+# Helper to convert Pydantic schema to dictionary, excluding unset values for updates.
+# JSON mode turns nested models into dicts and URLs into strings, ready for the JSONB columns.
 def schema_to_dict(schema_instance):
-    return schema_instance.model_dump(exclude_unset=True)
+    return schema_instance.model_dump(exclude_unset=True, mode="json")
 
-def create_resume_entry(db: Session, file_name: str, raw_text: Optional[str] = None) -> models.Resume:
+# The deferred payload column groups of models.Resume; by default single-resume reads load all of them
+RESUME_PAYLOAD_GROUPS = (models.PAYLOAD_RAW_TEXT, models.PAYLOAD_LLM_ANALYSIS, models.PAYLOAD_SECTIONS)
+
+def payload_options(load_groups: Iterable[str] = RESUME_PAYLOAD_GROUPS) -> List[Any]:
+    """
+    Query options that load the given payload groups together with the row, instead of one lazy query per group.
     """
-    Creates an initial resume entry with file name and optional raw text.
+    return [undefer_group(group) for group in load_groups]
+
+def payload_column_names(groups: Iterable[str]) -> List[str]:
     """
-    db_resume = models.Resume(file_name=file_name, raw_text=raw_text)
+    Names of the Resume columns in the given payload groups.
+    """
+    groups = set(groups)
+    return [prop.key for prop in models.Resume.__mapper__.column_attrs if prop.group in groups]
+
+def next_version():
+    # Computed in the UPDATE statement, so concurrent updates can't both write the same version
+    return func.coalesce(models.Resume.version, 0) + 1
+
+def resume_update_to_columns(update_data: schemas.ResumeUpdate) -> Dict[str, Any]:
+    """
+    Maps a ResumeUpdate onto Resume column values, skipping fields the model doesn't have.
+    """
+    return {key: value for key, value in schema_to_dict(update_data).items() if hasattr(models.Resume, key)}
+
+def create_resume_entry(db: Session, file_name: str, raw_text: Optional[str] = None, content_hash: Optional[str] = None) -> models.Resume:
+    """
+    Creates an initial resume entry with file name, optional raw text and content hash.
+    """
+    db_resume = models.Resume(
+        file_name=file_name, raw_text=raw_text, content_hash=content_hash,
+        processing_status=models.PROCESSING_STATUS_PROCESSING,
+    )
     db.add(db_resume)
     db.commit()
     db.refresh(db_resume)
     return db_resume
 
-def get_resume_by_id(db: Session, resume_id: int) -> Optional[models.Resume]:
+def get_resume_version(db: Session, resume_id: int) -> Optional[Any]:
+    """
+    The (version, updated_at, uploaded_at) of a resume, without loading the resume itself. None if it doesn't exist.
+    """
+    return (
+        db.query(models.Resume.version, models.Resume.updated_at, models.Resume.uploaded_at)
+        .filter(models.Resume.id == resume_id)
+        .first()
+    )
+
+def get_resume_by_id(db: Session, resume_id: int, load_groups: Iterable[str] = RESUME_PAYLOAD_GROUPS) -> Optional[models.Resume]:
+    """
+    Retrieves a single resume by its ID, loading the payload groups in `load_groups` in the same query.
+    """
+    return db.query(models.Resume).options(*payload_options(load_groups)).filter(models.Resume.id == resume_id).first()
+
+def _reload_resume(db: Session, resume_id: int) -> Optional[models.Resume]:
+    # refresh() leaves deferred columns unloaded; reload the whole row in one query instead
+    return db.query(models.Resume).options(*payload_options()).populate_existing().filter(models.Resume.id == resume_id).first()
+
+def get_processed_resume_by_hash(db: Session, content_hash: str) -> Optional[models.Resume]:
+    """
+    Retrieves the most recent fully processed resume (LLM analysis present) with the given content hash.
+    """
+    return (
+        db.query(models.Resume)
+        .options(*payload_options())
+        .filter(models.Resume.content_hash == content_hash, models.Resume.llm_analysis.isnot(None))
+        .order_by(models.Resume.id.desc())
+        .first()
+    )
+
+# Columns that describe the upload, the row's revision and its processing rather than its extracted content
+_UPLOAD_COLUMNS = (
+    "id", "uploaded_at", "file_name", "content_hash", "updated_at", "version",
+    "processing_status", "failed_stage", "processing_error", "extracted_data", "stage_timings",
+)
+
+def get_processed_resumes_by_hashes(db: Session, content_hashes: Iterable[str]) -> Dict[str, models.Resume]:
+    """
+    Bulk version of get_processed_resume_by_hash: maps each known content hash to its most recent processed resume.
+    """
+    content_hashes = list(set(content_hashes))
+    if not content_hashes:
+        return {}
+    matches = (
+        db.query(models.Resume)
+        .options(*payload_options())
+        .filter(models.Resume.content_hash.in_(content_hashes), models.Resume.llm_analysis.isnot(None))
+        .order_by(models.Resume.id)
+        .all()
+    )
+    return {resume.content_hash: resume for resume in matches} # Later (newer) rows win
+
+def resume_content_columns(source: models.Resume) -> Dict[str, Any]:
+    """
+    The raw text, extracted data and LLM analysis of a resume, as column values.
+    """
+    return {
+        column.name: getattr(source, column.name)
+        for column in models.Resume.__table__.columns
+        if column.name not in _UPLOAD_COLUMNS
+    }
+
+def copy_resume_entry(db: Session, source: models.Resume, file_name: str, content_hash: Optional[str] = None) -> models.Resume:
+    """
+    Creates a new resume entry for a re-upload, reusing the raw text, extracted data and
+    LLM analysis stored on `source`.
+    """
+    content = resume_content_columns(source)
+    db_resume = models.Resume(file_name=file_name, content_hash=content_hash, processing_status=models.PROCESSING_STATUS_COMPLETED, **content)
+    db.add(db_resume)
+    crud_stats.apply_deltas(db, crud_stats.contributions(content))
+    db.commit()
+    return _reload_resume(db, db_resume.id)
+
+# Columns needed for ResumeListInfo; listings select only these instead of whole rows
+RESUME_LIST_COLUMNS = (
+    models.Resume.id, models.Resume.file_name, models.Resume.uploaded_at,
+    models.Resume.name, models.Resume.email, models.Resume.phone,
+)
+
+def get_all_resumes(db: Session, skip: int = 0, limit: int = 100) -> List[Any]:
     """
-    Retrieves a single resume by its ID.
+    Retrieves a list of resumes (summary columns only), with pagination.
     """
-    return db.query(models.Resume).filter(models.Resume.id == resume_id).first()
+    return db.query(*RESUME_LIST_COLUMNS).order_by(models.Resume.id).offset(skip).limit(limit).all()
 
-def get_all_resumes(db: Session, skip: int = 0, limit: int = 100) -> List[Type[models.Resume]]:
+def get_resume_summaries(db: Session, resume_ids: Iterable[int]) -> Dict[int, Any]:
     """
-    Retrieves a list of resumes, with pagination.
+    Summary columns of the given resumes, keyed by ID. Unknown IDs are left out.
     """
-    return db.query(models.Resume).offset(skip).limit(limit).all()
+    resume_ids = list(resume_ids)
+    if not resume_ids:
+        return {}
+    return {row.id: row for row in db.query(*RESUME_LIST_COLUMNS).filter(models.Resume.id.in_(resume_ids)).all()}
 
-def update_resume_with_extracted_data(db: Session, resume_id: int, update_data: schemas.ResumeUpdate) -> Optional[models.Resume]:
+def iter_processed_resumes(db: Session, load_groups: Iterable[str] = (models.PAYLOAD_SECTIONS,), batch_size: int = 500) -> Iterable[models.Resume]:
+    """
+    Streams all fully processed resumes in ID order, `batch_size` rows at a time.
+    """
+    query = (
+        db.query(models.Resume)
+        .options(*payload_options(load_groups))
+        .filter(models.Resume.llm_analysis.isnot(None))
+        .order_by(models.Resume.id)
+    )
+    return query.yield_per(batch_size)
+
+def get_resumes_by_ids(db: Session, resume_ids: Iterable[int], load_groups: Iterable[str] = RESUME_PAYLOAD_GROUPS) -> List[models.Resume]:
+    """
+    Retrieves the given resumes, in ID order, with the payload groups in `load_groups`.
+    """
+    return (
+        db.query(models.Resume)
+        .options(*payload_options(load_groups))
+        .filter(models.Resume.id.in_(list(resume_ids)))
+        .order_by(models.Resume.id)
+        .all()
+    )
+
+def iter_resume_rows(
+    db: Session,
+    column_names: Iterable[str],
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+    processed_only: bool = True,
+    batch_size: int = 1000,
+) -> Iterable[Any]:
+    """
+    Streams rows of the given Resume columns in ID order. Rows are fetched `batch_size` at a time
+    from a server-side cursor (on PostgreSQL) and are not kept in the session, so memory stays flat.
+    """
+    query = select(*[getattr(models.Resume, name) for name in column_names])
+    if processed_only:
+        query = query.where(models.Resume.llm_analysis.isnot(None))
+    query = query.where(*uploaded_at_filters(db, uploaded_after, uploaded_before))
+    query = query.order_by(models.Resume.id).execution_options(yield_per=batch_size)
+    return db.execute(query)
+
+def uploaded_at_key(db: Session) -> Any:
+    """
+    uploaded_at as compared by keyset pagination. SQLite stores it as text whose format depends on how
+    it was written ('YYYY-MM-DD HH:MM:SS' from the server default), so there the raw text is read and
+    compared; a re-formatted datetime parameter would not sort the same way.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(models.Resume.uploaded_at, String)
+    return models.Resume.uploaded_at
+
+def uploaded_at_filters(db: Session, uploaded_after: Optional[datetime], uploaded_before: Optional[datetime]) -> List[Any]:
+    """
+    Conditions for uploaded_at in [uploaded_after, uploaded_before), compared like uploaded_at_key(db).
+    On SQLite the bounds are written as UTC text in the stored format, with seconds and only as many
+    fractional digits as they have, so a bound equal to a stored time compares equal to it.
+    """
+    key_column = uploaded_at_key(db)
+    def bound(value: datetime) -> Any:
+        if key_column is models.Resume.uploaded_at:
+            return value
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(sep=" ", timespec="microseconds" if value.microsecond else "seconds")
+    conditions = []
+    if uploaded_after:
+        conditions.append(key_column >= bound(uploaded_after))
+    if uploaded_before:
+        conditions.append(key_column < bound(uploaded_before))
+    return conditions
+
+def _prefix_pattern(prefix: str) -> str:
+    # One LIKE pattern parameter, rather than startswith()'s `:prefix || '%'`, so PostgreSQL sees a
+    # constant prefix it can match against the pattern-ops index
+    return prefix.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+
+def get_resume_page(
+    db: Session,
+    limit: int,
+    after: Optional[Tuple[str, int]] = None,
+    descending: bool = True,
+    email: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    file_name_prefix: Optional[str] = None,
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+) -> List[Any]:
+    """
+    Keyset pagination over (uploaded_at, id): returns up to `limit` rows of summary columns
+    that sort after the `after` key, newest first unless `descending` is False. Each row also has
+    `cursor_uploaded_at`, the upload time to put in the cursor (see uploaded_at_key).
+    Filters use the indexes on email, name and file_name (the pattern-ops ones for the prefixes on
+    PostgreSQL); the date range uses ix_resumes_uploaded_at_id.
+    """
+    key_column = uploaded_at_key(db)
+    query = db.query(*RESUME_LIST_COLUMNS, key_column.label("cursor_uploaded_at"))
+    if email:
+        query = query.filter(models.Resume.email == email)
+    if name_prefix:
+        query = query.filter(models.Resume.name.like(_prefix_pattern(name_prefix), escape="/"))
+    if file_name_prefix:
+        query = query.filter(models.Resume.file_name.like(_prefix_pattern(file_name_prefix), escape="/"))
+    query = query.filter(*uploaded_at_filters(db, uploaded_after, uploaded_before))
+
+    sort_key = tuple_(key_column, models.Resume.id)
+    if after is not None:
+        after_uploaded_at, after_id = after
+        if key_column is models.Resume.uploaded_at:
+            after_uploaded_at = datetime.fromisoformat(after_uploaded_at)
+        after_key = tuple_(after_uploaded_at, after_id)
+        query = query.filter(sort_key < after_key if descending else sort_key > after_key)
+    if descending:
+        query = query.order_by(models.Resume.uploaded_at.desc(), models.Resume.id.desc())
+    else:
+        query = query.order_by(models.Resume.uploaded_at, models.Resume.id)
+    return query.limit(limit).all()
+
+def create_resumes_bulk(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Inserts fully processed resumes in a single transaction. Each row is a dict of column values.
+    Returns the new IDs in the same order.
+    """
+    db_resumes = [models.Resume(**{"processing_status": models.PROCESSING_STATUS_COMPLETED, **row}) for row in rows]
+    db.add_all(db_resumes)
+    db.flush()
+    new_ids = [db_resume.id for db_resume in db_resumes]
+    crud_stats.apply_deltas(db, crud_stats.merge(*[crud_stats.contributions(row) for row in rows]))
+    db.commit()
+    return new_ids
+
+def update_processing_state(db: Session, resume_id: int, **values) -> bool:
+    """
+    Sets processing columns (status, error, stage checkpoints) of a resume without loading it, and commits.
+    Returns False if the resume doesn't exist.
+    """
+    result = db.execute(
+        update(models.Resume).where(models.Resume.id == resume_id).values(version=next_version(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    http_cache.invalidate_resume(resume_id)
+    return result.rowcount > 0
+
+def update_resume_with_extracted_data(db: Session, resume_id: int, update_data: schemas.ResumeUpdate, extra_columns: Optional[Dict[str, Any]] = None) -> Optional[models.Resume]:
     """
     Updates a resume entry with extracted data and LLM analysis.
-    The update_data should be a Pydantic schema (ResumeUpdate).
+    The update_data should be a Pydantic schema (ResumeUpdate); `extra_columns` are other column
+    values (e.g. processing status) written in the same transaction.
     """
-    db_resume = get_resume_by_id(db, resume_id)
+    db_resume = get_resume_by_id(db, resume_id, load_groups=())
     if db_resume:
-        update_data_dict = schema_to_dict(update_data)
-        
-        for key, value in update_data_dict.items():
-            if hasattr(db_resume, key):
-                if isinstance(value, HttpUrl):
-                    setattr(db_resume, key, str(value))
-                else:
-                    setattr(db_resume, key, value)
-            # else: # Optional: handle cases where key in update_data is not in model
-                # print(f"Warning: Key {key} not found in Resume model.")
-
-        # Special handling for llm_analysis if it's a Pydantic model itself
-        if update_data.llm_analysis is not None:
-            # Assuming llm_analysis in the model is JSONB and can store the dict directly
-            db_resume.llm_analysis = schema_to_dict(update_data.llm_analysis)
-        
-        # Similarly for other complex JSONB fields if they are passed as Pydantic models
-        # For example, if education_history in update_data is a list of EducationBase Pydantic models:
-        if update_data.education_history:
-            db_resume.education_history = [schema_to_dict(edu) for edu in update_data.education_history]
-        if update_data.work_experience:
-            db_resume.work_experience = [schema_to_dict(work) for work in update_data.work_experience]
-        if update_data.projects:
-            db_resume.projects = [schema_to_dict(proj) for proj in update_data.projects]
-        if update_data.languages:
-            db_resume.languages = [schema_to_dict(lang) for lang in update_data.languages]
-        if update_data.certifications:
-            db_resume.certifications = [schema_to_dict(cert) for cert in update_data.certifications]
-
+        # Nested models (llm_analysis, education_history, ...) arrive as plain dicts for the JSONB columns
+        _set_resume_columns(db, db_resume, {**resume_update_to_columns(update_data), **(extra_columns or {})})
         db.commit()
-        db.refresh(db_resume)
+        http_cache.invalidate_resume(resume_id)
+        db_resume = _reload_resume(db, resume_id)
     return db_resume
 
-def delete_resume(db: Session, resume_id: int) -> Optional[models.Resume]:
+def _set_resume_columns(db: Session, db_resume: models.Resume, columns: Dict[str, Any]) -> None:
+    # Sets the columns, bumps the version and applies the statistics changes; the caller commits
+    old_stats = crud_stats.stat_columns(db, db_resume.id)
+    new_stats = {**old_stats, **{key: value for key, value in columns.items() if key in crud_stats.STAT_COLUMNS}}
+    for key, value in columns.items():
+        setattr(db_resume, key, value)
+    db_resume.version = next_version()
+    crud_stats.apply_deltas(db, crud_stats.diff(crud_stats.contributions(old_stats), crud_stats.contributions(new_stats)))
+
+def stage_resume_updates(db: Session, updates: Dict[int, Dict[str, Any]], expected_versions: Optional[Dict[int, Any]] = None) -> List[int]:
+    """
+    Applies column updates to several resumes in the current transaction, without committing.
+    With `expected_versions`, a resume whose version has changed since it was read (edited or
+    reprocessed meanwhile) is left alone. Returns the IDs that were updated; the caller commits
+    and then invalidates their cached responses (http_cache.invalidate_resume).
+    """
+    if not updates:
+        return []
+    db_resumes = (
+        db.query(models.Resume)
+        .filter(models.Resume.id.in_(list(updates)))
+        .order_by(models.Resume.id) # Consistent lock order with concurrent writers
+        .with_for_update()
+        .all()
+    )
+    updated_ids = []
+    for db_resume in db_resumes:
+        if expected_versions is not None and db_resume.version != expected_versions.get(db_resume.id):
+            continue
+        _set_resume_columns(db, db_resume, updates[db_resume.id])
+        updated_ids.append(db_resume.id)
+    return updated_ids
+
+def delete_resume(db: Session, resume_id: int, load_groups: Iterable[str] = RESUME_PAYLOAD_GROUPS) -> Optional[models.Resume]:
     """
-    Deletes a resume entry by its ID.
+    Deletes a resume entry by its ID. Only the payload groups in `load_groups` are loaded
+    (and so available on the returned, detached object).
     """
-    db_resume = get_resume_by_id(db, resume_id)
+    db_resume = get_resume_by_id(db, resume_id, load_groups=load_groups)
     if db_resume:
+        old_stats = crud_stats.stat_columns(db, resume_id)
         db.delete(db_resume)
+        crud_stats.apply_deltas(db, crud_stats.negate(crud_stats.contributions(old_stats)))
         db.commit()
+        http_cache.invalidate_resume(resume_id)
     return db_resume # Returns the deleted object (now detached from session) or None 
\ No newline at end of file
@@ -0,0 +1,104 @@
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
+
+from app.db import models
+from app.api.v1 import schemas
+from app.crud import crud_stats
+from app.crud.crud_resume import next_version, payload_options, resume_content_columns, resume_update_to_columns
+from app.utils import http_cache
+
+# AsyncSession counterparts of the crud_resume functions used by the async upload path.
+# Lazy loads are not possible on an AsyncSession, so every Resume returned here has all its
+# deferred payload groups loaded.
+
+async def _reload_resume(db: AsyncSession, resume_id: int) -> Optional[models.Resume]:
+    result = await db.execute(
+        select(models.Resume)
+        .options(*payload_options())
+        .where(models.Resume.id == resume_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def _apply_stat_deltas(db: AsyncSession, deltas: crud_stats.Deltas) -> None:
+    statement = crud_stats.upsert_statement(db.get_bind().dialect.name, deltas)
+    if statement is not None:
+        await db.execute(statement)
+
+async def create_resume_entry(db: AsyncSession, file_name: str, raw_text: Optional[str] = None, content_hash: Optional[str] = None) -> models.Resume:
+    """
+    Creates an initial resume entry with file name, optional raw text and content hash.
+    """
+    db_resume = models.Resume(
+        file_name=file_name, raw_text=raw_text, content_hash=content_hash,
+        processing_status=models.PROCESSING_STATUS_PROCESSING,
+    )
+    db.add(db_resume)
+    await db.commit()
+    await db.refresh(db_resume)
+    return db_resume
+
+async def get_resume_by_id(db: AsyncSession, resume_id: int) -> Optional[models.Resume]:
+    """
+    Retrieves a single resume by its ID.
+    """
+    # populate_existing, so an instance already in the session gets its deferred groups loaded too
+    return await db.get(models.Resume, resume_id, options=payload_options(), populate_existing=True)
+
+async def get_processed_resume_by_hash(db: AsyncSession, content_hash: str) -> Optional[models.Resume]:
+    """
+    Retrieves the most recent fully processed resume (LLM analysis present) with the given content hash.
+    """
+    result = await db.execute(
+        select(models.Resume)
+        .options(*payload_options())
+        .where(models.Resume.content_hash == content_hash, models.Resume.llm_analysis.isnot(None))
+        .order_by(models.Resume.id.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+async def copy_resume_entry(db: AsyncSession, source: models.Resume, file_name: str, content_hash: Optional[str] = None) -> models.Resume:
+    """
+    Creates a new resume entry for a re-upload, reusing the raw text, extracted data and
+    LLM analysis stored on `source`.
+    """
+    content = resume_content_columns(source)
+    db_resume = models.Resume(file_name=file_name, content_hash=content_hash, processing_status=models.PROCESSING_STATUS_COMPLETED, **content)
+    db.add(db_resume)
+    await _apply_stat_deltas(db, crud_stats.contributions(content))
+    await db.commit()
+    return await _reload_resume(db, db_resume.id)
+
+async def update_processing_state(db: AsyncSession, resume_id: int, **values) -> bool:
+    """
+    Sets processing columns (status, error, stage checkpoints) of a resume without loading it, and commits.
+    """
+    result = await db.execute(
+        update(models.Resume).where(models.Resume.id == resume_id).values(version=next_version(), **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    http_cache.invalidate_resume(resume_id)
+    return result.rowcount > 0
+
+async def update_resume_with_extracted_data(db: AsyncSession, resume_id: int, update_data: schemas.ResumeUpdate, extra_columns: Optional[Dict[str, Any]] = None) -> Optional[models.Resume]:
+    """
+    Updates a resume entry with extracted data and LLM analysis, plus any `extra_columns`.
+    """
+    db_resume = await db.get(models.Resume, resume_id)
+    if db_resume:
+        columns = {**resume_update_to_columns(update_data), **(extra_columns or {})}
+        row = (await db.execute(crud_stats.stat_columns_query(resume_id))).first()
+        old_stats = dict(row._mapping) if row is not None else {}
+        new_stats = {**old_stats, **{key: value for key, value in columns.items() if key in crud_stats.STAT_COLUMNS}}
+        for key, value in columns.items():
+            setattr(db_resume, key, value)
+        db_resume.version = next_version()
+        await _apply_stat_deltas(db, crud_stats.diff(crud_stats.contributions(old_stats), crud_stats.contributions(new_stats)))
+
+        await db.commit()
+        http_cache.invalidate_resume(resume_id)
+        db_resume = await _reload_resume(db, resume_id)
+    return db_resume
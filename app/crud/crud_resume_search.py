@@ -0,0 +1,91 @@
+from sqlalchemy import Text, and_, distinct, exists, func, literal, literal_column, or_, select, table, text, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.orm import Session
+from typing import Any, List, Optional, Sequence
+
+from app.crud.crud_resume import RESUME_LIST_COLUMNS
+from app.db import models
+from app.db.migrations import SQLITE_FTS_TABLE
+
+# Search over stored resumes (GET /resumes/search).
+# PostgreSQL: websearch_to_tsquery against the GIN-indexed tsvector of summary + raw_text, and JSONB
+# containment (?| / @>) against the GIN-indexed skill columns. SQLite: the FTS5 table from
+# migrations.py and json_each(), so the same queries work without PostgreSQL.
+
+def _pg_skill_filter(column, values: Sequence[str], match_all: bool):
+    column = type_coerce(column, JSONB)
+    if match_all:
+        return column.contains(list(values))
+    return column.has_any(array(list(values), type_=Text))
+
+def _pg_certification_filter(values: Sequence[str], match_all: bool):
+    column = type_coerce(models.Resume.certifications, JSONB)
+    if match_all:
+        return column.contains([{"name": value} for value in values])
+    return or_(*[column.contains([{"name": value}]) for value in values])
+
+def _sqlite_array_filter(column, values: Sequence[str], match_all: bool, path: Optional[str] = None):
+    elements = func.json_each(column).table_valued("value")
+    element = elements.c.value if path is None else func.json_extract(elements.c.value, path)
+    if match_all:
+        matched = select(func.count(distinct(element))).select_from(elements).where(element.in_(values)).scalar_subquery()
+        return matched == len(set(values))
+    return exists(select(literal(1)).select_from(elements).where(element.in_(values)))
+
+def _fts5_query(keywords: str) -> str:
+    # Quote every term so user input can't be parsed as FTS5 syntax; terms are ANDed
+    return " ".join('"' + term.replace('"', '""') + '"' for term in keywords.split())
+
+def search_resumes(
+    db: Session,
+    keywords: Optional[str] = None,
+    technical_skills: Sequence[str] = (),
+    soft_skills: Sequence[str] = (),
+    certifications: Sequence[str] = (),
+    match_all: bool = False,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Any]:
+    """
+    Returns rows of the summary columns plus a `rank` (higher is better; 0 without keywords),
+    best matches first. Skill and certification values match exactly; with `match_all` a resume
+    must have every given value of a list, otherwise any one of them.
+    """
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    filters = []
+    rank = literal(0.0)
+    query_from = None
+
+    if keywords and keywords.strip():
+        if is_postgres:
+            tsquery = func.websearch_to_tsquery(models.SEARCH_TS_CONFIG, keywords)
+            document = models.search_document_tsvector(models.Resume.summary, models.Resume.raw_text)
+            filters.append(document.op("@@")(tsquery))
+            rank = func.ts_rank_cd(document, tsquery)
+        else:
+            fts = table(SQLITE_FTS_TABLE, literal_column("rowid"))
+            matches = (
+                select(literal_column("rowid").label("resume_id"), literal_column(f"bm25({SQLITE_FTS_TABLE})").label("score"))
+                .select_from(fts)
+                .where(text(f"{SQLITE_FTS_TABLE} MATCH :fts_query").bindparams(fts_query=_fts5_query(keywords)))
+                .subquery()
+            )
+            query_from = matches
+            rank = -matches.c.score # bm25() is lower for better matches
+
+    for column, values in ((models.Resume.technical_skills, technical_skills), (models.Resume.soft_skills, soft_skills)):
+        if values:
+            filters.append(_pg_skill_filter(column, values, match_all) if is_postgres else _sqlite_array_filter(column, values, match_all))
+    if certifications:
+        if is_postgres:
+            filters.append(_pg_certification_filter(certifications, match_all))
+        else:
+            filters.append(_sqlite_array_filter(models.Resume.certifications, certifications, match_all, path="$.name"))
+
+    query = select(*RESUME_LIST_COLUMNS, rank.label("rank"))
+    if query_from is not None:
+        query = query.join(query_from, query_from.c.resume_id == models.Resume.id)
+    if filters:
+        query = query.where(and_(*filters))
+    query = query.order_by(literal_column("rank").desc(), models.Resume.id.desc()).offset(offset).limit(limit)
+    return db.execute(query).all()
@@ -0,0 +1,180 @@
+from collections import Counter
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import math
+
+from app.db import models
+
+# Incrementally maintained aggregates over processed resumes (resume_stat_counters).
+# Each processed resume contributes +1 to a set of (kind, key) counters; writers apply the
+# difference between a row's old and new contributions in the same transaction as the row.
+
+KIND_RESUMES = "resumes" # key "processed": number of resumes with an LLM analysis
+KIND_SCORE = "score" # key "overall": count and sum of overall scores
+KIND_SCORE_BUCKET = "score_bucket" # key "0".."10": overall score histogram
+KIND_UPSKILL = "upskill" # key: normalized upskill suggestion
+SKILL_KINDS = {
+    "technical_skills": "technical_skill",
+    "soft_skills": "soft_skill",
+    "other_skills": "other_skill",
+}
+
+# Resume columns the aggregates are computed from
+STAT_COLUMNS = ("technical_skills", "soft_skills", "other_skills", "llm_analysis")
+
+MAX_SCORE = 10
+
+CounterKey = Tuple[str, str]
+Deltas = Dict[CounterKey, Tuple[int, float]]
+
+def _normalize(value: Any) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    value = " ".join(value.split()).lower()
+    return value or None
+
+def contributions(columns: Mapping[str, Any]) -> Deltas:
+    """
+    The counters a resume with these column values contributes to. Unprocessed resumes contribute nothing.
+    """
+    llm_analysis = columns.get("llm_analysis")
+    if not isinstance(llm_analysis, dict):
+        return {}
+    result: Dict[CounterKey, Tuple[int, float]] = {(KIND_RESUMES, "processed"): (1, 0.0)}
+
+    score = (llm_analysis.get("resume_rating") or {}).get("overall_score")
+    if isinstance(score, (int, float)) and not isinstance(score, bool) and math.isfinite(score):
+        result[(KIND_SCORE, "overall")] = (1, float(score))
+        result[(KIND_SCORE_BUCKET, str(min(max(int(score), 0), MAX_SCORE)))] = (1, 0.0)
+
+    for column, kind in SKILL_KINDS.items():
+        skills = columns.get(column)
+        for skill in skills if isinstance(skills, list) else []:
+            skill = _normalize(skill)
+            if skill:
+                result[(kind, skill)] = (1, 0.0)
+
+    suggestions = llm_analysis.get("upskill_suggestions")
+    for suggestion in suggestions if isinstance(suggestions, list) else []:
+        skill = _normalize(suggestion.get("skill_name")) if isinstance(suggestion, dict) else None
+        if skill:
+            result[(KIND_UPSKILL, skill)] = (1, 0.0)
+    return result
+
+def diff(old: Deltas, new: Deltas) -> Deltas:
+    """New minus old contributions, skipping counters that don't change."""
+    deltas: Deltas = {}
+    for key in old.keys() | new.keys():
+        old_count, old_total = old.get(key, (0, 0.0))
+        new_count, new_total = new.get(key, (0, 0.0))
+        if new_count != old_count or new_total != old_total:
+            deltas[key] = (new_count - old_count, new_total - old_total)
+    return deltas
+
+def merge(*delta_sets: Deltas) -> Deltas:
+    merged: Dict[CounterKey, List[float]] = {}
+    for deltas in delta_sets:
+        for key, (count, total) in deltas.items():
+            entry = merged.setdefault(key, [0, 0.0])
+            entry[0] += count
+            entry[1] += total
+    return {key: (int(count), total) for key, (count, total) in merged.items()}
+
+def negate(deltas: Deltas) -> Deltas:
+    return {key: (-count, -total) for key, (count, total) in deltas.items()}
+
+def upsert_statement(dialect_name: str, deltas: Deltas):
+    """
+    INSERT ... ON CONFLICT DO UPDATE adding the deltas to the counters, or None if there is nothing to apply.
+    Increments happen in the database, so concurrent writers don't lose updates.
+    """
+    if not deltas:
+        return None
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    table = models.ResumeStatCounter.__table__
+    statement = insert(table).values([
+        {"kind": kind, "key": key, "count": count, "total": total}
+        for (kind, key), (count, total) in sorted(deltas.items()) # Sorted, so concurrent upserts lock rows in the same order
+    ])
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.kind, table.c.key],
+        set_={"count": table.c.count + statement.excluded.count, "total": table.c.total + statement.excluded.total},
+    )
+
+_UPSERT_CHUNK = 1000 # Counters per statement, well within bind parameter limits
+
+def apply_deltas(db: Session, deltas: Deltas) -> None:
+    """
+    Adds the deltas to the counters as part of the caller's transaction (the caller commits).
+    """
+    items = sorted(deltas.items())
+    for start in range(0, len(items), _UPSERT_CHUNK):
+        db.execute(upsert_statement(db.get_bind().dialect.name, dict(items[start:start + _UPSERT_CHUNK])))
+
+def stat_columns_query(resume_id: int):
+    """
+    Selects the stored values of STAT_COLUMNS for one resume, locking the row (on PostgreSQL) so
+    concurrent updates of the same resume apply their deltas one after the other.
+    """
+    return (
+        select(*[getattr(models.Resume, column) for column in STAT_COLUMNS])
+        .where(models.Resume.id == resume_id)
+        .with_for_update()
+    )
+
+def stat_columns(db: Session, resume_id: int) -> Dict[str, Any]:
+    row = db.execute(stat_columns_query(resume_id)).first()
+    return dict(row._mapping) if row is not None else {}
+
+def get_counters(db: Session, kind: str, limit: Optional[int] = None) -> List[models.ResumeStatCounter]:
+    """
+    Non-zero counters of one kind, largest first (served by ix_resume_stat_counters_kind_count).
+    """
+    query = (
+        db.query(models.ResumeStatCounter)
+        .filter(models.ResumeStatCounter.kind == kind, models.ResumeStatCounter.count > 0)
+        .order_by(models.ResumeStatCounter.count.desc(), models.ResumeStatCounter.key)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def get_counter(db: Session, kind: str, key: str) -> Optional[models.ResumeStatCounter]:
+    return db.get(models.ResumeStatCounter, (kind, key))
+
+def get_all_counters(db: Session) -> Deltas:
+    return {(counter.kind, counter.key): (counter.count, counter.total) for counter in db.query(models.ResumeStatCounter).all()}
+
+def iter_stat_columns(db: Session, batch_size: int = 1000) -> Iterable[Dict[str, Any]]:
+    """
+    Streams the STAT_COLUMNS of every processed resume.
+    """
+    query = (
+        select(*[getattr(models.Resume, column) for column in STAT_COLUMNS])
+        .where(models.Resume.llm_analysis.isnot(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for row in db.execute(query):
+        yield dict(row._mapping)
+
+def compute_all(resumes: Iterable[Mapping[str, Any]]) -> Deltas:
+    """
+    Aggregates computed from scratch, for the rebuild command.
+    """
+    totals: Counter = Counter()
+    sums: Counter = Counter()
+    for columns in resumes:
+        for key, (count, total) in contributions(columns).items():
+            totals[key] += count
+            sums[key] += total
+    return {key: (totals[key], sums[key]) for key in totals}
+
+def replace_all(db: Session, deltas: Deltas) -> None:
+    """
+    Replaces every counter with the given values and commits.
+    """
+    db.execute(delete(models.ResumeStatCounter))
+    apply_deltas(db, deltas)
+    db.commit()
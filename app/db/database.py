@@ -1,9 +1,27 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from contextlib import contextmanager
+from typing import Iterator
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
+def _pool_options(database_url, pool_class) -> dict:
+    # In-memory SQLite needs a single shared connection, so it keeps SQLAlchemy's default pool
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": pool_class,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
 
 if settings.DATABASE_URL:
-    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, **_pool_options(settings.DATABASE_URL, InstrumentedQueuePool))
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 else:
     # This case should ideally not happen if DATABASE_URL is mandatory
@@ -12,6 +30,41 @@ else:
     engine = None
     SessionLocal = None 
 
+# Async drivers for the async engine, by backend
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def _async_database_url(database_url: str):
+    url = make_url(database_url)
+    return url.set(drivername=_ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+# Async engine for the async request path (see app/crud/crud_resume_async.py).
+# It is optional: without an async driver installed only the sync engine is available.
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_URL:
+    try:
+        async_engine = create_async_engine(
+            _async_database_url(settings.DATABASE_URL), pool_pre_ping=True,
+            **_pool_options(settings.DATABASE_URL, InstrumentedAsyncQueuePool),
+        )
+        AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    except Exception as e:
+        print(f"WARNING: Async database engine unavailable ({e}). Async endpoints will not work.")
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    A session for one short unit of work, closed (and its connection returned to the pool) on exit.
+    Long-running work such as parsing or LLM calls should happen between scopes, not inside one.
+    """
+    if SessionLocal is None:
+        raise Exception("Database not configured. SessionLocal is None.")
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 # Dependency to get DB session
 def get_db():
     if SessionLocal is None:
@@ -22,10 +75,22 @@ def get_db():
     finally:
         db.close()
 
-# # Optional: Function to create tables (useful for initial setup or tests)
-# from app.db.base_class import Base
-# def init_db():
-#     if engine is None:
-#        print("Cannot initialize database, engine is not configured.")
-#        return
-#     Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+# Dependency to get an async DB session
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise Exception("Async database not configured. AsyncSessionLocal is None.")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Function to create tables (useful for initial setup or tests).
+# Creates missing tables, then applies column/index upgrades to existing ones (see app/db/migrations.py).
+def init_db():
+    from app.db.base_class import Base
+    from app.db import models # noqa: F401 - registers the models on Base.metadata
+    from app.db.migrations import run_migrations
+    if engine is None:
+        print("Cannot initialize database, engine is not configured.")
+        return
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+ 
\ No newline at end of file
@@ -0,0 +1,71 @@
+from sqlalchemy import inspect, text
+import logging
+
+from app.db.base_class import Base
+
+logger = logging.getLogger(__name__)
+
+# Lightweight schema upgrades for existing databases.
+# Base.metadata.create_all() only creates missing tables, so columns and indexes added to
+# existing models are applied here. Every step is idempotent and runs on startup via init_db().
+
+def add_missing_columns(engine) -> None:
+    """
+    Adds model columns that are missing from existing tables. New columns are always
+    added as nullable; defaults are applied by the ORM on insert.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                logger.info(f"Migrating: adding column {table.name}.{column.name} ({column_type})")
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+def create_missing_indexes(engine) -> None:
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            logger.info(f"Migrating: creating index {index.name} on {table.name}")
+            index.create(bind=engine, checkfirst=True)
+
+# SQLite stand-in for the PostgreSQL full-text index: an external-content FTS5 table over
+# resumes.summary and resumes.raw_text, kept in sync by triggers (see app/crud/crud_resume_search.py).
+SQLITE_FTS_TABLE = "resumes_fts"
+_SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5(summary, raw_text, content='resumes', content_rowid='id')",
+    f"""CREATE TRIGGER resumes_fts_ai AFTER INSERT ON resumes BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, summary, raw_text) VALUES (new.id, new.summary, new.raw_text);
+    END""",
+    f"""CREATE TRIGGER resumes_fts_ad AFTER DELETE ON resumes BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, summary, raw_text) VALUES ('delete', old.id, old.summary, old.raw_text);
+    END""",
+    f"""CREATE TRIGGER resumes_fts_au AFTER UPDATE OF summary, raw_text ON resumes BEGIN
+        INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, summary, raw_text) VALUES ('delete', old.id, old.summary, old.raw_text);
+        INSERT INTO {SQLITE_FTS_TABLE}(rowid, summary, raw_text) VALUES (new.id, new.summary, new.raw_text);
+    END""",
+    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')", # Index the rows that already exist
+)
+
+def create_sqlite_search_index(engine) -> None:
+    if engine.dialect.name != "sqlite" or inspect(engine).has_table(SQLITE_FTS_TABLE):
+        return
+    logger.info(f"Migrating: creating FTS5 table {SQLITE_FTS_TABLE}")
+    with engine.begin() as conn:
+        for statement in _SQLITE_FTS_DDL:
+            conn.execute(text(statement))
+
+def run_migrations(engine) -> None:
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    create_sqlite_search_index(engine)
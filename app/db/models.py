@@ -1,14 +1,42 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey, Index, JSON, text
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 
+# JSONB on PostgreSQL; plain JSON elsewhere (e.g. SQLite in tests)
+JSONVariant = JSON().with_variant(JSONB(), "postgresql")
+
+# Full-text search document of a resume. The PostgreSQL GIN index below is built on this exact
+# expression, so queries must use it unchanged (see app/crud/crud_resume_search.py).
+# Constants are inlined as literals so that queries render exactly the indexed expression.
+SEARCH_TS_CONFIG = text("'english'::regconfig")
+
+def search_document_tsvector(summary_column, raw_text_column):
+    empty, space = text("''"), text("' '")
+    return func.to_tsvector(SEARCH_TS_CONFIG, func.coalesce(summary_column, empty).op("||")(space).op("||")(func.coalesce(raw_text_column, empty)))
+
+# Deferred column groups of Resume. The large payload columns are only loaded when a query
+# undefers their group (see crud_resume.payload_options) or on first attribute access.
+PAYLOAD_RAW_TEXT = "raw_text"
+PAYLOAD_LLM_ANALYSIS = "llm_analysis"
+PAYLOAD_SECTIONS = "sections" # Structured resume sections (education, experience, skills, ...)
+PAYLOAD_CHECKPOINTS = "checkpoints" # Intermediate pipeline outputs; only loaded to resume processing
+
+# Values of Resume.processing_status
+PROCESSING_STATUS_PROCESSING = "processing"
+PROCESSING_STATUS_COMPLETED = "completed"
+PROCESSING_STATUS_FAILED = "failed" # failed_stage and processing_error say where and why
+
 class Resume(Base):
     __tablename__ = "resumes"
 
     id = Column(Integer, primary_key=True, index=True)
     file_name = Column(String, index=True, nullable=False)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now()) # Last-Modified of GET /resumes/{id}
+    version = Column(Integer, nullable=True, default=1) # Incremented on every update; part of the ETag of GET /resumes/{id}
+    content_hash = Column(String(64), nullable=True, index=True) # sha256 of the uploaded file, used for deduplication
     
     # Extracted Personal Information
     name = Column(String, nullable=True, index=True)
@@ -22,30 +50,149 @@ class Resume(Base):
 
     # Structured Data Fields (using JSONB for flexibility)
     # These correspond to Pydantic models like EducationBase, WorkExperienceBase etc.
-    education_history = Column(JSONB, nullable=True)  # List of education objects
-    work_experience = Column(JSONB, nullable=True)    # List of work experience objects
-    projects = Column(JSONB, nullable=True)           # List of project objects
+    education_history = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of education objects
+    work_experience = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of work experience objects
+    projects = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of project objects
     
-    technical_skills = Column(JSONB, nullable=True)   # List of strings or dict
-    soft_skills = Column(JSONB, nullable=True)        # List of strings
-    other_skills = Column(JSONB, nullable=True)       # List of strings
-
-    languages = Column(JSONB, nullable=True)          # List of language objects
-    certifications = Column(JSONB, nullable=True)     # List of certification objects
-    awards_honors = Column(JSONB, nullable=True)      # List of strings
-    publications = Column(JSONB, nullable=True)       # List of strings
+    technical_skills = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of strings or dict
+    soft_skills = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of strings
+    other_skills = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of strings
+
+    languages = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of language objects
+    certifications = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of certification objects
+    awards_honors = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of strings
+    publications = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_SECTIONS) # List of strings
     references_available = Column(Boolean, nullable=True)
 
     # Raw text from resume
-    raw_text = Column(Text, nullable=True)
+    raw_text = deferred(Column(Text, nullable=True), group=PAYLOAD_RAW_TEXT)
+
+    # Pipeline progress (PROCESSING_STATUS_*). The outputs of completed stages are kept on
+    # the row (raw_text, extracted_data, llm_analysis), so failed processing can resume where it stopped.
+    processing_status = Column(String, nullable=True, index=True)
+    failed_stage = Column(String, nullable=True)
+    processing_error = Column(Text, nullable=True)
+    extracted_data = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_CHECKPOINTS) # Raw LLM extraction output
+    # Prompt + model fingerprints of the stored results (llm_service.*_RESULT_VERSION), for backfills
+    extraction_version = Column(String(32), nullable=True)
+    analysis_version = Column(String(32), nullable=True)
+    stage_timings = Column(JSONVariant, nullable=True) # Seconds per pipeline stage of the last processing run
 
     # LLM Analysis and Suggestions
     # This corresponds to the LLMAnalysis Pydantic model
-    llm_analysis = Column(JSONB, nullable=True)
+    llm_analysis = deferred(Column(JSONVariant, nullable=True), group=PAYLOAD_LLM_ANALYSIS)
     # Example sub-fields that might be directly in llm_analysis JSON:
     # resume_rating = Column(Float, nullable=True) 
     # improvement_areas = Column(Text, nullable=True)
     # upskill_suggestions = Column(Text, nullable=True) # Or JSONB if more structured
 
+    __table_args__ = (
+        # Keyset pagination of the resume listing (see crud_resume.get_resume_page)
+        Index("ix_resumes_uploaded_at_id", "uploaded_at", "id"),
+        # Its name and file name prefix filters: outside the C collation, PostgreSQL only serves LIKE 'x%'
+        # from an index with the pattern operator class
+        Index("ix_resumes_name_pattern", "name", postgresql_ops={"name": "varchar_pattern_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_resumes_file_name_pattern", "file_name", postgresql_ops={"file_name": "varchar_pattern_ops"}).ddl_if(dialect="postgresql"),
+        # GET /resumes/search: skill containment (PostgreSQL only; see also ix_resumes_search_document below)
+        Index("ix_resumes_technical_skills", "technical_skills", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_resumes_soft_skills", "soft_skills", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_resumes_certifications", "certifications", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+    def __repr__(self):
+        return f"<Resume(id={self.id}, file_name='{self.file_name}', name='{self.name}')>" 
+
+# Full-text index for GET /resumes/search. PostgreSQL only; SQLite uses the FTS5 table created in migrations.py.
+Index(
+    "ix_resumes_search_document",
+    search_document_tsvector(Resume.__table__.c.summary, Resume.__table__.c.raw_text),
+    postgresql_using="gin",
+).ddl_if(dialect="postgresql")
+
+class UploadJob(Base):
+    """
+    A resume upload accepted for background processing.
+    Jobs are persisted so that unfinished ones can be picked up again after a restart.
+    """
+    __tablename__ = "upload_jobs"
+
+    id = Column(String(32), primary_key=True) # uuid4 hex
+    file_name = Column(String, nullable=False)
+    file_path = Column(String, nullable=True) # Saved upload, removed once the job finishes
+    stage = Column(String, nullable=False, default="queued", index=True) # See app/services/resume_pipeline.py
+    content_hash = Column(String(64), nullable=True)
+    on_duplicate = Column(String, nullable=True) # Duplicate handling requested at upload time
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="SET NULL"), nullable=True)
+    # Lease of the process whose worker pool holds the job, renewed while it does; only jobs whose
+    # lease has expired (or that never had one) are recovered by another process
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<UploadJob(id={self.id}, file_name='{self.file_name}', stage='{self.stage}')>"
+
+class LLMCacheEntry(Base):
+    """
+    Persistent tier of the LLM result cache (see app/services/llm_cache.py).
+    """
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String(64), primary_key=True) # sha256 of operation, prompt version, model and normalized input
+    operation = Column(String, nullable=False)
+    model_name = Column(String, nullable=True)
+    value = Column(JSONVariant, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    llm_seconds = Column(Float, nullable=True) # Latency of the LLM call that produced the value
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<LLMCacheEntry(key={self.key[:12]}, operation='{self.operation}')>"
+
+class ResumeStatCounter(Base):
+    """
+    Aggregates over all processed resumes for GET /resumes/stats, maintained incrementally
+    by the resume crud functions (see app/crud/crud_stats.py).
+    """
+    __tablename__ = "resume_stat_counters"
+
+    kind = Column(String, primary_key=True) # e.g. "technical_skill", "score_bucket", "upskill"
+    key = Column(String, primary_key=True) # Normalized skill name, bucket label, ...
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0) # Sum of values, where the kind has one (scores)
+
+    __table_args__ = (
+        Index("ix_resume_stat_counters_kind_count", "kind", "count"),
+    )
+
+    def __repr__(self):
+        return f"<ResumeStatCounter(kind='{self.kind}', key='{self.key}', count={self.count})>"
+
+class BackfillRun(Base):
+    """
+    Progress of a named backfill run (app/services/backfill.py). Resumes are processed in ID order,
+    and last_resume_id is committed together with each batch of results, so a stopped run
+    continues after the last stored batch.
+    """
+    __tablename__ = "backfill_runs"
+
+    name = Column(String, primary_key=True)
+    stage = Column(String, nullable=False) # llm_extraction (re-runs extraction and analysis) or llm_analysis
+    status = Column(String, nullable=False) # running, completed or stopped
+    options = Column(JSONVariant, nullable=True) # Sampling, limit, target versions, ...
+    last_resume_id = Column(Integer, nullable=False, default=0)
+    succeeded = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    failed_resume_ids = Column(JSONVariant, nullable=True) # The first failures, for inspection and targeted retries
+    llm_seconds = Column(Float, nullable=False, default=0.0) # Time spent in the LLM stages, summed over resumes
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
     def __repr__(self):
-        return f"<Resume(id={self.id}, file_name='{self.file_name}', name='{self.name}')>" 
\ No newline at end of file
+        return f"<BackfillRun(name='{self.name}', stage='{self.stage}', status='{self.status}', last_resume_id={self.last_resume_id})>"
@@ -0,0 +1,67 @@
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy import exc
+from typing import Any, Dict
+import threading
+import time
+
+# Connection pools that record how long checkouts wait for a connection (GET /system/db-pool).
+# A checkout only waits in _do_get, when every pooled and overflow connection is in use.
+
+class _CheckoutMetrics:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        with self._metrics_lock:
+            self._waiting += 1
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._metrics_lock:
+                self._waiting -= 1
+                self._checkouts += 1
+                self._timeouts += timed_out
+                self._wait_seconds += waited
+                self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                "pool_size": self.size(),
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_seconds": round(self._wait_seconds, 3),
+                "max_wait_seconds": round(self._max_wait_seconds, 3),
+                "avg_wait_ms": round(1000 * self._wait_seconds / self._checkouts, 3) if self._checkouts else 0.0,
+            }
+
+class InstrumentedQueuePool(_CheckoutMetrics, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_CheckoutMetrics, AsyncAdaptedQueuePool):
+    pass
+
+def pool_metrics(engine) -> Dict[str, Any]:
+    """
+    Metrics of an engine's pool, or None for pools without instrumentation (e.g. in-memory SQLite).
+    """
+    if engine is None:
+        return None
+    pool = engine.pool
+    return pool.metrics() if isinstance(pool, _CheckoutMetrics) else None
@@ -1,9 +1,30 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
+from starlette.formparsers import MultiPartParser
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+import time
+
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.db.database import init_db
+from app.services import llm_service, resume_export, upload_jobs
+from app.utils import metrics, pdf_text, parse_sandbox, request_limits
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    upload_jobs.start_workers()
+    upload_jobs.recover_unfinished_jobs()
+    yield
+    upload_jobs.shutdown_workers()
+    llm_service.shutdown_executor()
+    pdf_text.shutdown_executor()
+    parse_sandbox.shutdown()
 
-app = FastAPI(title="TuneCV API", version="0.1.0")
+app = FastAPI(title="TuneCV API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,10 +34,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Large JSON responses (listings, search) are gzip-compressed. GET /resumes/{id} compresses
+# (and caches) its own body, and responses that already carry a Content-Encoding are left alone.
+# The export's media types are excluded: the middleware would re-buffer its stream, which is already
+# sent in EXPORT_CHUNK_BYTES pieces as the rows arrive.
+app.add_middleware(
+    GZipMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + tuple(resume_export.MEDIA_TYPES.values()),
+)
+
+# Oversized uploads are rejected before their body is received and parsed (file_helpers.ingest_upload
+# still checks each file against MAX_UPLOAD_BYTES exactly). Uploaded files are read in place from the
+# buffers the multipart parser fills, so its spool threshold decides whether an upload touches disk.
+app.add_middleware(request_limits.RequestSizeLimitMiddleware, limits={
+    f"{settings.API_V1_STR}/resumes/upload": settings.MAX_UPLOAD_BYTES + request_limits.MULTIPART_OVERHEAD_BYTES,
+    f"{settings.API_V1_STR}/resumes/batch": settings.MAX_BATCH_UPLOAD_BYTES,
+})
+MultiPartParser.spool_max_size = settings.UPLOAD_SPOOL_THRESHOLD_BYTES
+
+def _route_label(request: Request) -> str:
+    # The path with its parameters as placeholders (/api/v1/resumes/{resume_id}), so the number of
+    # series stays bounded; paths that matched no route share one label
+    if request.scope.get("route") is None:
+        return "unmatched"
+    placeholders = {str(value): "{" + name + "}" for name, value in request.path_params.items()}
+    return "/".join(placeholders.get(segment, segment) for segment in request.url.path.split("/"))
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started_at = time.perf_counter()
+    response = await call_next(request)
+    if settings.METRICS_ENABLED:
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started_at,
+            method=request.method, route=_route_label(request), status=str(response.status_code),
+        )
+    return response
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to TuneCV API"}
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """
+    Pipeline stage latencies, LLM request latencies, token counts, retries, throttling and output
+    parse failures, and HTTP latencies, in the Prometheus text format.
+    """
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import logging
+import threading
+import time
+import zlib
+
+from app.core.config import settings
+from app.crud import crud_backfill, crud_resume
+from app.db import models
+from app.services import llm_service, resume_pipeline, vector_index
+from app.utils import http_cache
+
+logger = logging.getLogger(__name__)
+
+# Backfills of stored resumes after a prompt or model change (`python -m app.cli backfill`).
+# A run walks the resumes whose stored results carry an older extraction_version/analysis_version,
+# in ID order, and re-runs the LLM stages for a batch at a time with bounded concurrency (the calls
+# go through the shared rate limiter). Each batch's results are written in one transaction together
+# with the run's position in backfill_runs, so a stopped run continues after its last stored batch.
+
+_SCAN_PAGE_SIZE = 1000 # Candidate IDs read per keyset query
+_SAMPLE_BUCKETS = 10_000
+
+class BackfillOptions(NamedTuple):
+    stage: str # llm_extraction re-runs extraction and analysis; llm_analysis reuses the stored extraction
+    sample: float = 1.0 # Fraction of the candidates to process, chosen by ID hash (stable across restarts)
+    limit: Optional[int] = None # Maximum resumes processed by the run
+    force: bool = False # Process resumes whose results are already current, too
+
+class BackfillReport(NamedTuple):
+    run_name: str
+    status: str
+    succeeded: int
+    failed: int
+    skipped: int # Changed or deleted while their batch was processed; left as they were
+    last_resume_id: int
+
+def _stage_spec(stage: str) -> Tuple[str, Tuple[str, ...], bool]:
+    # (version column, versions that count as current, reuses the stored extraction)
+    if stage == resume_pipeline.STAGE_LLM_ANALYSIS:
+        return "analysis_version", (llm_service.ANALYSIS_RESULT_VERSION, llm_service.COMBINED_RESULT_VERSION), True
+    return "extraction_version", (llm_service.EXTRACTION_RESULT_VERSION, llm_service.COMBINED_RESULT_VERSION), False
+
+def _filter(options: BackfillOptions) -> List[Any]:
+    column_name, current_versions, reuse_extraction = _stage_spec(options.stage)
+    return crud_backfill.backfill_filter(column_name, current_versions, reuse_extraction, options.force)
+
+def _in_sample(resume_id: int, sample: float) -> bool:
+    return sample >= 1.0 or zlib.crc32(str(resume_id).encode()) % _SAMPLE_BUCKETS < sample * _SAMPLE_BUCKETS
+
+def _candidate_ids(session_factory: resume_pipeline.SessionFactory, options: BackfillOptions, after_id: int) -> Iterator[int]:
+    # Keyset pages in short sessions, so no transaction stays open while the LLM runs
+    clauses = _filter(options)
+    while True:
+        with session_factory() as db:
+            page = crud_backfill.get_candidate_ids(db, clauses, after_id, _SCAN_PAGE_SIZE)
+        if not page:
+            return
+        for resume_id in page:
+            if _in_sample(resume_id, options.sample):
+                yield resume_id
+        after_id = page[-1]
+
+def _batches(ids: Iterable[int], size: int) -> Iterator[List[int]]:
+    batch = []
+    for resume_id in ids:
+        batch.append(resume_id)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def estimate(session_factory: resume_pipeline.SessionFactory, options: BackfillOptions, after_id: int = 0) -> Dict[str, Any]:
+    """
+    What a run would do (used for --dry-run): the number of resumes it would process and the LLM calls that takes.
+    """
+    with session_factory() as db:
+        candidates = crud_backfill.count_candidates(db, _filter(options), after_id)
+    resumes = round(candidates * min(options.sample, 1.0))
+    if options.limit is not None:
+        resumes = min(resumes, options.limit)
+    calls_per_resume = 1
+    if options.stage == resume_pipeline.STAGE_LLM_EXTRACTION and settings.LLM_PIPELINE_MODE != llm_service.PIPELINE_MODE_COMBINED:
+        calls_per_resume = 2 # Upper bound in split mode
+    return {"candidates": candidates, "resumes": resumes, "llm_calls": resumes * calls_per_resume}
+
+class _Work(NamedTuple):
+    resume_id: int
+    version: Optional[int]
+    file_name: str
+    raw_text: str
+    extracted_data_dict: Optional[Dict[str, Any]]
+
+def _load_batch(session_factory: resume_pipeline.SessionFactory, resume_ids: List[int], stage: str) -> List[_Work]:
+    load_groups = (models.PAYLOAD_RAW_TEXT,)
+    if stage == resume_pipeline.STAGE_LLM_ANALYSIS:
+        load_groups += (models.PAYLOAD_CHECKPOINTS, models.PAYLOAD_SECTIONS, models.PAYLOAD_LLM_ANALYSIS)
+    with session_factory() as db:
+        return [
+            _Work(
+                db_resume.id, db_resume.version, db_resume.file_name, db_resume.raw_text,
+                resume_pipeline.stored_extraction(db_resume) if stage == resume_pipeline.STAGE_LLM_ANALYSIS else None,
+            )
+            for db_resume in crud_resume.get_resumes_by_ids(db, resume_ids, load_groups=load_groups)
+        ]
+
+def _process(work: _Work) -> Tuple[Union[Dict[str, Any], Exception], float]:
+    """
+    LLM stages for one resume. Returns (its new column values or the error, seconds spent).
+    """
+    started = time.monotonic()
+    try:
+        extracted_data_dict, llm_analysis_dict = resume_pipeline.run_llm_stages(
+            work.raw_text, f"resume ID {work.resume_id} (backfill)", extracted_data_dict=work.extracted_data_dict,
+        )
+        update_data = resume_pipeline.build_resume_update(work.file_name, work.raw_text, extracted_data_dict, llm_analysis_dict)
+        columns = {
+            **crud_resume.resume_update_to_columns(update_data),
+            **resume_pipeline.result_versions(work.raw_text, reused_extraction=work.extracted_data_dict is not None),
+            "extracted_data": extracted_data_dict,
+        }
+        return columns, time.monotonic() - started
+    except Exception as e:
+        # PipelineErrors were logged where they were raised
+        if not isinstance(e, resume_pipeline.PipelineError):
+            logger.error(f"Backfill of resume ID {work.resume_id} failed: {e}", exc_info=True)
+        return e, time.monotonic() - started
+
+def run(
+    session_factory: resume_pipeline.SessionFactory,
+    run_name: str,
+    options: BackfillOptions,
+    concurrency: int,
+    batch_size: int,
+    stop: Optional[threading.Event] = None,
+) -> BackfillReport:
+    """
+    Runs (or continues) the backfill named `run_name`. A continued run keeps the options it was
+    started with. Setting `stop` ends the run after the batch in progress, as status "stopped".
+    A batch in which every resume failed (e.g. the LLM is unavailable) also stops the run, without
+    advancing past it.
+    """
+    with session_factory() as db:
+        db_run = crud_backfill.get_run(db, run_name)
+        if db_run is None:
+            db_run = crud_backfill.create_run(db, run_name, options.stage, options._asdict())
+            logger.info(f"Backfill run '{run_name}' started: {options}")
+        else:
+            if db_run.status == crud_backfill.RUN_STATUS_COMPLETED:
+                logger.info(f"Backfill run '{run_name}' has already completed.")
+                return BackfillReport(run_name, db_run.status, db_run.succeeded, db_run.failed, 0, db_run.last_resume_id)
+            options = BackfillOptions(**db_run.options)
+            crud_backfill.set_status(db, db_run, crud_backfill.RUN_STATUS_RUNNING)
+            logger.info(f"Backfill run '{run_name}' continuing after resume ID {db_run.last_resume_id}: {options}")
+        start_after, processed = db_run.last_resume_id, db_run.succeeded + db_run.failed
+
+    total = estimate(session_factory, options, start_after)["resumes"]
+    if options.limit is not None:
+        total = min(total, max(0, options.limit - processed))
+    logger.info(f"Backfill run '{run_name}': {total} resumes to process ({options.stage}, concurrency {concurrency}, batches of {batch_size}).")
+
+    status = crud_backfill.RUN_STATUS_COMPLETED
+    succeeded = failed = skipped = 0
+    started = time.monotonic()
+    ids = _candidate_ids(session_factory, options, start_after)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="backfill") as executor:
+        for batch_ids in _batches(ids, batch_size):
+            if options.limit is not None:
+                batch_ids = batch_ids[:max(0, options.limit - processed)]
+                if not batch_ids:
+                    break
+            if stop is not None and stop.is_set():
+                status = crud_backfill.RUN_STATUS_STOPPED
+                break
+
+            work = _load_batch(session_factory, batch_ids, options.stage)
+            results = list(executor.map(_process, work))
+            if work and all(isinstance(result, Exception) for result, _ in results):
+                logger.error(f"Every resume in the batch starting at ID {batch_ids[0]} failed; stopping run '{run_name}'. Run it again to retry from this batch.")
+                status = crud_backfill.RUN_STATUS_STOPPED
+                break
+
+            updates = {item.resume_id: result for item, (result, _) in zip(work, results) if not isinstance(result, Exception)}
+            failed_ids = [item.resume_id for item, (result, _) in zip(work, results) if isinstance(result, Exception)]
+            with session_factory() as db:
+                db_run = crud_backfill.get_run(db, run_name)
+                updated_ids = crud_resume.stage_resume_updates(db, updates, expected_versions={item.resume_id: item.version for item in work})
+                crud_backfill.record_progress(db, db_run, batch_ids[-1], len(updated_ids), failed_ids, sum(seconds for _, seconds in results))
+                db.commit()
+            for resume_id in updated_ids:
+                http_cache.invalidate_resume(resume_id)
+            if options.stage == resume_pipeline.STAGE_LLM_EXTRACTION:
+                # New extractions change the embedded sections
+                vector_index.index_resumes((resume_id, updates[resume_id]) for resume_id in updated_ids)
+
+            succeeded += len(updated_ids)
+            failed += len(failed_ids)
+            skipped += len(batch_ids) - len(updated_ids) - len(failed_ids)
+            processed += len(batch_ids)
+            done = succeeded + failed + skipped
+            elapsed = time.monotonic() - started
+            remaining = max(0, total - done)
+            eta = f"{remaining * elapsed / done / 60:.1f} min" if done else "unknown"
+            logger.info(f"Backfill run '{run_name}': {done}/{total} done ({succeeded} updated, {failed} failed, {skipped} skipped), up to resume ID {batch_ids[-1]}, ETA {eta}.")
+
+    with session_factory() as db:
+        db_run = crud_backfill.get_run(db, run_name)
+        crud_backfill.set_status(db, db_run, status)
+        logger.info(f"Backfill run '{run_name}' {status}: {db_run.succeeded} updated, {db_run.failed} failed in total.")
+        return BackfillReport(run_name, status, succeeded, failed, skipped, db_run.last_resume_id)
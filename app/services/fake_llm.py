@@ -0,0 +1,160 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+from google.api_core import exceptions as google_exceptions
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+# Deterministic local stand-in for the Gemini chat model, for benchmarks (app/benchmark.py) and
+# development without an API key. It answers the extraction, analysis and combined prompts of
+# llm_service with schema-valid JSON derived from the resume text, after a lognormal latency,
+# and can inject throttling (429) errors and malformed JSON at configurable rates. Follow-up requests
+# for failed sections get just those sections.
+
+_EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_PHONE_PATTERN = re.compile(r"\+?\d[\d ().-]{7,}\d")
+_FENCED_TEXT_PATTERN = re.compile(r"```(?:text|json)\n(.*?)\n```", re.DOTALL)
+_FOLLOWUP_FIELDS_PATTERN = re.compile(r"^Fields to return: (.*)$", re.MULTILINE)
+_KNOWN_SKILLS = (
+    "Python", "Java", "JavaScript", "TypeScript", "SQL", "React", "Docker", "Kubernetes", "AWS", "Excel",
+    "Figma", "Salesforce", "Project Management", "Agile", "Scrum", "Sales", "Marketing", "Photoshop",
+)
+_SOFT_SKILLS = ("Communication", "Leadership", "Teamwork", "Problem Solving", "Negotiation", "Customer Service")
+
+def _resume_text(human_message: str) -> str:
+    match = _FENCED_TEXT_PATTERN.search(human_message)
+    return match.group(1) if match else human_message
+
+def fake_extraction(resume_text: str) -> Dict[str, Any]:
+    """A plausible extraction of `resume_text` (contact details, summary, known skills), as the LLM would return it."""
+    lines = [line.strip() for line in resume_text.splitlines() if line.strip()]
+    email = _EMAIL_PATTERN.search(resume_text)
+    phone = _PHONE_PATTERN.search(resume_text)
+    lowered = resume_text.lower()
+    return {
+        "name": lines[0][:60] if lines else None,
+        "email": email.group(0) if email else None,
+        "phone": phone.group(0).strip() if phone else None,
+        "summary": " ".join(lines[1:4])[:300] or None,
+        "education_history": [],
+        "work_experience": [{"job_title": line[:80], "responsibilities": []} for line in lines[4:6]],
+        "projects": [],
+        "technical_skills": [skill for skill in _KNOWN_SKILLS if skill.lower() in lowered],
+        "soft_skills": [skill for skill in _SOFT_SKILLS if skill.lower() in lowered],
+        "other_skills": [],
+        "languages": [],
+        "certifications": [],
+        "awards_honors": [],
+        "publications": [],
+    }
+
+def fake_followup(fields: List[str], human_message: str) -> Dict[str, Any]:
+    """An answer to a follow-up request: only `fields` ("field" or "parent.field"), nested."""
+    resume_text = _resume_text(human_message)
+    extraction, analysis = fake_extraction(resume_text), fake_analysis(human_message)
+    combined = {"extracted_data": extraction, "analysis": analysis}
+    body: Dict[str, Any] = {}
+    for field in fields:
+        parent, _, key = field.rpartition(".")
+        source = combined[parent] if parent else combined if field in combined else extraction if field in extraction else analysis
+        target = body.setdefault(parent, {}) if parent else body
+        if key in source:
+            target[key] = source[key]
+    return body
+
+def fake_analysis(seed_text: str) -> Dict[str, Any]:
+    """A schema-valid LLM analysis whose score is a stable function of `seed_text`."""
+    score = 4 + zlib.crc32(seed_text.encode("utf-8")) % 6
+    return {
+        "resume_rating": {"overall_score": score, "comments": "Generated by the local fake LLM."},
+        "strength_areas": ["Clear structure"],
+        "improvement_areas": {"content_suggestions": ["Quantify achievements."], "formatting_style_suggestions": [], "missing_information_suggestions": []},
+        "action_verb_check": {"current_usage_rating": "Good", "suggestions": []},
+        "quantification_check": {"current_usage_rating": "Needs Improvement", "suggestions": ["Add numbers to results."]},
+        "upskill_suggestions": [{"skill_name": "SQL", "reasoning": "Common requirement.", "suggested_resources": [], "relevance_to_career_goals": "High"}],
+        "career_path_alignment": {"current_alignment_assessment": "Aligned", "potential_paths": [], "suggestions_for_strengthening_alignment": []},
+    }
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers llm_service prompts locally. Latency is lognormal around
+    `latency_median_seconds`; `throttle_rate` of the calls raise ResourceExhausted (HTTP 429) and
+    `malformed_rate` of the answers are truncated JSON. With the same `seed` and call order, the
+    injected failures and latencies repeat exactly.
+    """
+    latency_median_seconds: float = 0.5
+    latency_sigma: float = 0.5 # Of the underlying normal distribution; 0 gives a constant latency
+    throttle_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: int = 0
+
+    _random: random.Random = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"calls": 0, "throttled": 0, "malformed": 0})
+
+    def model_post_init(self, __context: Any) -> None:
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _draw(self) -> Dict[str, Any]:
+        # One draw per call from the shared generator, so retries of the same prompt can succeed
+        with self._lock:
+            self._stats["calls"] += 1
+            latency = self.latency_median_seconds * (self._random.lognormvariate(0.0, self.latency_sigma) if self.latency_sigma > 0 else 1.0)
+            throttled = self._random.random() < self.throttle_rate
+            malformed = not throttled and self._random.random() < self.malformed_rate
+            if throttled:
+                self._stats["throttled"] += 1
+            if malformed:
+                self._stats["malformed"] += 1
+        return {"latency": latency, "throttled": throttled, "malformed": malformed}
+
+    def _answer(self, messages: List[BaseMessage], malformed: bool) -> ChatResult:
+        system_text = "\n".join(str(message.content) for message in messages[:-1])
+        human_text = str(messages[-1].content)
+        followup_fields = _FOLLOWUP_FIELDS_PATTERN.search(human_text)
+        if followup_fields:
+            body = fake_followup([field.strip() for field in followup_fields.group(1).split(",")], human_text)
+        elif "Extracted Data:" in human_text:
+            body = fake_analysis(human_text)
+        else:
+            resume_text = _resume_text(human_text)
+            body = fake_extraction(resume_text)
+            if '"extracted_data"' in human_text: # The combined prompt asks for both parts
+                body = {"extracted_data": body, "analysis": fake_analysis(resume_text)}
+        content = json.dumps(body)
+        if malformed:
+            content = "```json\n" + content[:len(content) // 2] # Truncated mid-object
+        prompt_chars = len(system_text) + len(human_text)
+        usage = {"input_tokens": prompt_chars // 4 + 1, "output_tokens": len(content) // 4 + 1}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, usage_metadata=usage))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        draw = self._draw()
+        time.sleep(draw["latency"])
+        if draw["throttled"]:
+            raise google_exceptions.ResourceExhausted("Fake LLM quota exceeded, retry in 1s")
+        return self._answer(messages, draw["malformed"])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        draw = self._draw()
+        await asyncio.sleep(draw["latency"])
+        if draw["throttled"]:
+            raise google_exceptions.ResourceExhausted("Fake LLM quota exceeded, retry in 1s")
+        return self._answer(messages, draw["malformed"])
@@ -0,0 +1,235 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import unicodedata
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.db import database, models
+
+logger = logging.getLogger(__name__)
+
+# Two-tier, content-addressed cache for LLM results.
+# Tier 1 is a bounded in-process LRU, tier 2 is the llm_cache_entries table (shared between
+# workers and kept across restarts) with a TTL and a total size budget.
+# Keys hash the normalized input together with the prompt version and model name, so editing a
+# prompt template or switching models simply stops matching old entries.
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, Tuple[Dict[str, Any], float, float]]" = OrderedDict() # key -> (value, stored_at, llm_seconds)
+_writes_since_eviction = 0
+_stats = {
+    "memory_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "evictions": 0,
+    "saved_llm_calls": 0,
+    "saved_llm_seconds": 0.0,
+}
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text for cache keying: Unicode NFC and collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def prompt_version(*templates: str) -> str:
+    """
+    Short fingerprint of the prompt templates used by an operation.
+    """
+    digest = hashlib.sha256()
+    for template in templates:
+        digest.update(template.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+def make_key(operation: str, prompt_ver: str, model_name: str, *inputs: Any) -> str:
+    """
+    Builds the cache key for an LLM call. String inputs are normalized, anything else is
+    serialized as canonical JSON.
+    """
+    digest = hashlib.sha256()
+    for part in (operation, prompt_ver, model_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    for item in inputs:
+        if isinstance(item, str):
+            item_str = normalize_text(item)
+        else:
+            item_str = json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+        digest.update(item_str.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+def _ttl_seconds() -> float:
+    return float(settings.LLM_CACHE_TTL_SECONDS)
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+def _record_hit(tier: str, llm_seconds: float) -> None:
+    with _lock:
+        _stats[f"{tier}_hits"] += 1
+        _stats["saved_llm_calls"] += 1
+        _stats["saved_llm_seconds"] += llm_seconds or 0.0
+
+def _remember(key: str, value: Dict[str, Any], stored_at: float, llm_seconds: float) -> None:
+    with _lock:
+        _memory[key] = (value, stored_at, llm_seconds)
+        _memory.move_to_end(key)
+        while len(_memory) > settings.LLM_CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Looks up a cached LLM result. Returns a copy the caller may modify, or None on a miss.
+    """
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if now - entry[1] <= _ttl_seconds():
+                _memory.move_to_end(key)
+            else:
+                del _memory[key]
+                entry = None
+    if entry is not None:
+        _record_hit("memory", entry[2])
+        return copy.deepcopy(entry[0])
+
+    value = _get_persistent(key)
+    if value is not None:
+        return copy.deepcopy(value)
+
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+def _get_persistent(key: str) -> Optional[Dict[str, Any]]:
+    if not settings.LLM_CACHE_PERSISTENT or database.SessionLocal is None:
+        return None
+    try:
+        db = database.SessionLocal()
+        try:
+            db_entry = db.query(models.LLMCacheEntry).filter(models.LLMCacheEntry.key == key).first()
+            if db_entry is None:
+                return None
+            created_at = _as_utc(db_entry.created_at)
+            now = datetime.now(timezone.utc)
+            if (now - created_at).total_seconds() > _ttl_seconds():
+                return None # Expired; removed by the next eviction pass
+            db_entry.last_accessed_at = now
+            db_entry.hit_count = (db_entry.hit_count or 0) + 1
+            value, llm_seconds = db_entry.value, db_entry.llm_seconds or 0.0
+            db.commit()
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"LLM cache lookup failed, treating as miss: {e}")
+        return None
+    _remember(key, value, created_at.timestamp(), llm_seconds)
+    _record_hit("db", llm_seconds)
+    return value
+
+def put(key: str, operation: str, value: Dict[str, Any], llm_seconds: float = 0.0, model_name: Optional[str] = None) -> None:
+    """
+    Stores a successful LLM result in both tiers. Failures to persist are logged and ignored.
+    `model_name` is the model that produced it (default: GEMINI_MODEL_NAME).
+    """
+    if not settings.LLM_CACHE_ENABLED:
+        return
+    value = copy.deepcopy(value)
+    _remember(key, value, time.time(), llm_seconds)
+    with _lock:
+        _stats["stores"] += 1
+
+    if not settings.LLM_CACHE_PERSISTENT or database.SessionLocal is None:
+        return
+    global _writes_since_eviction
+    try:
+        payload = json.dumps(value, separators=(",", ":"), default=str)
+        now = datetime.now(timezone.utc)
+        db = database.SessionLocal()
+        try:
+            db.merge(models.LLMCacheEntry(
+                key=key,
+                operation=operation,
+                model_name=model_name or settings.GEMINI_MODEL_NAME,
+                value=value,
+                size_bytes=len(payload.encode("utf-8")),
+                llm_seconds=llm_seconds,
+                hit_count=0,
+                created_at=now,
+                last_accessed_at=now,
+            ))
+            db.commit()
+            with _lock:
+                _writes_since_eviction += 1
+                run_eviction = _writes_since_eviction >= settings.LLM_CACHE_EVICTION_INTERVAL
+                if run_eviction:
+                    _writes_since_eviction = 0
+            if run_eviction:
+                evict_persistent(db)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"Failed to store LLM result in persistent cache: {e}")
+
+def evict_persistent(db) -> int:
+    """
+    Removes expired entries, then the least recently used ones until the table fits
+    within LLM_CACHE_MAX_DB_BYTES. Returns the number of rows removed.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=_ttl_seconds())
+    removed = db.query(models.LLMCacheEntry).filter(models.LLMCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+
+    total_bytes = db.query(func.coalesce(func.sum(models.LLMCacheEntry.size_bytes), 0)).scalar() or 0
+    if total_bytes > settings.LLM_CACHE_MAX_DB_BYTES:
+        excess = total_bytes - settings.LLM_CACHE_MAX_DB_BYTES
+        victims = []
+        for entry_key, size_bytes in (
+            db.query(models.LLMCacheEntry.key, models.LLMCacheEntry.size_bytes)
+            .order_by(models.LLMCacheEntry.last_accessed_at)
+            .yield_per(500)
+        ):
+            if excess <= 0:
+                break
+            victims.append(entry_key)
+            excess -= size_bytes or 0
+        for i in range(0, len(victims), 500):
+            removed += db.query(models.LLMCacheEntry).filter(models.LLMCacheEntry.key.in_(victims[i:i + 500])).delete(synchronize_session=False)
+        db.commit()
+
+    if removed:
+        with _lock:
+            _stats["evictions"] += removed
+        logger.info(f"Evicted {removed} entries from the persistent LLM cache.")
+    return removed
+
+def clear_memory() -> None:
+    with _lock:
+        _memory.clear()
+
+def stats() -> Dict[str, Any]:
+    """
+    Snapshot of the hit/miss counters. `saved_llm_seconds` sums the original LLM latency of every hit.
+    """
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["memory_entries"] = len(_memory)
+    lookups = snapshot["memory_hits"] + snapshot["db_hits"] + snapshot["misses"]
+    snapshot["hit_ratio"] = (snapshot["memory_hits"] + snapshot["db_hits"]) / lookups if lookups else 0.0
+    snapshot["enabled"] = settings.LLM_CACHE_ENABLED
+    return snapshot
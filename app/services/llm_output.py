@@ -0,0 +1,152 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type, Union
+import threading
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# Field-by-field validation of parsed LLM output (used by llm_service).
+# Each top-level field of the target schema is a section, validated on its own: valid sections are
+# kept, invalid ones dropped and reported by path ("work_experience", "analysis.resume_rating"), so
+# only those need to be requested again. In list sections, valid items survive invalid neighbours.
+
+class Sections(NamedTuple):
+    """The sections of an object: the fields of `model`, minus those the LLM doesn't produce."""
+    model: Type[BaseModel]
+    exclude: Tuple[str, ...] = ()
+
+# An object whose sections are validated, or an object of required nested objects (the combined output)
+SectionSchema = Union[Sections, Dict[str, "SectionSchema"]]
+
+_adapters: Dict[Tuple[Type[BaseModel], str], TypeAdapter] = {}
+_adapters_lock = threading.Lock()
+
+def _adapter(model: Type[BaseModel], field_name: str) -> TypeAdapter:
+    key = (model, field_name)
+    with _adapters_lock:
+        adapter = _adapters.get(key)
+        if adapter is None:
+            adapter = _adapters[key] = TypeAdapter(model.model_fields[field_name].annotation)
+        return adapter
+
+def _error_summary(e: ValidationError) -> str:
+    error = e.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+def section_paths(schema: SectionSchema, prefix: str = "") -> List[str]:
+    """The top-level section paths of `schema` (what a complete re-request asks for)."""
+    if isinstance(schema, dict):
+        return [prefix + key for key in schema]
+    return [prefix + name for name in schema.model.model_fields if name not in schema.exclude]
+
+def _validate_model_sections(data: Dict[str, Any], sections: Sections, prefix: str, require_all: bool) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    valid: Dict[str, Any] = {}
+    failures: Dict[str, str] = {}
+    for key, value in data.items():
+        if key not in sections.model.model_fields or key in sections.exclude:
+            valid[key] = value # Not a schema field: passed through as before
+            continue
+        adapter = _adapter(sections.model, key)
+        try:
+            adapter.validate_python(value)
+            valid[key] = value
+            continue
+        except ValidationError as e:
+            failures[prefix + key] = _error_summary(e)
+        if isinstance(value, list):
+            # Keep the items that are valid on their own; the section is still re-requested
+            items = []
+            for item in value:
+                try:
+                    adapter.validate_python([item])
+                    items.append(item)
+                except ValidationError:
+                    pass
+            if items:
+                valid[key] = items
+    if require_all:
+        for name in section_paths(sections):
+            if name not in data:
+                failures[prefix + name] = "missing"
+    return valid, failures
+
+def validate_sections(data: Dict[str, Any], schema: SectionSchema, require_all: bool = False, prefix: str = "") -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Splits `data` into its valid sections and the failed ones. Returns (valid data, {section path: reason}).
+    With `require_all` (e.g. for truncated output), absent sections count as failed too; nested
+    objects of a dict schema are always required.
+    """
+    if not isinstance(schema, dict):
+        return _validate_model_sections(data, schema, prefix, require_all)
+    valid: Dict[str, Any] = {}
+    failures: Dict[str, str] = {}
+    for key, sub_schema in schema.items():
+        value = data.get(key)
+        if not isinstance(value, dict):
+            failures[prefix + key] = "missing" if value is None else "not an object"
+            continue
+        valid[key], sub_failures = validate_sections(value, sub_schema, require_all, f"{prefix}{key}.")
+        failures.update(sub_failures)
+    return valid, failures
+
+def section_of(schema: SectionSchema, key_path: Tuple[str, ...]) -> Optional[str]:
+    """The section path a key path (e.g. from json_repair's truncated_path) falls in, or None if it's above the sections."""
+    parts: List[str] = []
+    for key in key_path:
+        parts.append(key)
+        if not isinstance(schema, dict):
+            return ".".join(parts) if key in schema.model.model_fields and key not in schema.exclude else None
+        if key not in schema:
+            return None
+        schema = schema[key]
+    return None
+
+def drop_truncated(result: Dict[str, Any], path: str) -> None:
+    """Removes what truncation left of the section at `path`: the last item of a list, any other value entirely."""
+    *parents, key = path.split(".")
+    for parent in parents:
+        result = result.get(parent)
+        if not isinstance(result, dict):
+            return
+    value = result.get(key)
+    if isinstance(value, list) and len(value) > 1:
+        result[key] = value[:-1]
+    else:
+        result.pop(key, None)
+
+def section_schemas(schema: SectionSchema, paths: List[str]) -> Dict[str, Any]:
+    """The JSON schema of each section path, for a follow-up request that asks only for those sections."""
+    schemas: Dict[str, Any] = {}
+    for path in paths:
+        node: Any = schema
+        for key in path.split("."):
+            if isinstance(node, dict):
+                node = node[key]
+            else:
+                node = _adapter(node.model, key).json_schema()
+                break
+        if isinstance(node, Sections): # A whole object, e.g. a missing "analysis"
+            sections, node = node, node.model.model_json_schema()
+            for name in sections.exclude:
+                node.get("properties", {}).pop(name, None)
+            if "required" in node:
+                node["required"] = [name for name in node["required"] if name not in sections.exclude]
+        schemas[path] = node
+    return schemas
+
+def merge_sections(result: Dict[str, Any], followup: Dict[str, Any], paths: List[str]) -> List[str]:
+    """
+    Copies the sections at `paths` from a validated follow-up result into `result`.
+    Returns the paths the follow-up didn't provide.
+    """
+    missing = []
+    for path in paths:
+        *parents, key = path.split(".")
+        source, target = followup, result
+        for parent in parents:
+            source = source.get(parent) if isinstance(source, dict) else None
+            target = target.setdefault(parent, {})
+        if isinstance(source, dict) and key in source:
+            target[key] = source[key]
+        else:
+            missing.append(path)
+    return missing
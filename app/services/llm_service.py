@@ -1,36 +1,28 @@
+import asyncio
+import concurrent.futures
 import json
 import logging
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 import tenacity
-from google.api_core.exceptions import ResourceExhausted, TooManyRequests
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 # from langchain.output_parsers import PydanticOutputParser # For stricter Pydantic output, if needed later
 
 from app.core.config import settings
 from app.api.v1 import schemas # For Pydantic models if using PydanticOutputParser or for reference
+from app.services import llm_cache, llm_output, llm_providers, pre_extractor, rate_limiter
+from app.utils import json_repair, metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# Initialize LLM
-if not settings.GOOGLE_API_KEY:
-    logger.error("GOOGLE_API_KEY not found in settings. LLM service will not function.")
-    llm = None
-else:
-    try:
-        # Note: The user encountered quota issues with 'gemini-2.0-flash'.
-        # This might be a custom or less common model name. Standard models include 'gemini-1.5-flash-latest' or 'gemini-1.0-pro'.
-        # For now, keeping the user's specified model. If issues persist beyond rate limits, this could be a point of investigation.
-        llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=settings.GOOGLE_API_KEY,
-                                   temperature=0.2, convert_system_message_to_human=True)
-        logger.info("Google Generative AI (gemini-2.0-flash) initialized successfully.")
-    except Exception as e:
-        logger.error(f"Failed to initialize Google Generative AI: {e}")
-        llm = None
+# Default model (GEMINI_MODEL_NAME from LLM_PROVIDER), used by operations without a route of their own.
+# Looked up at call time, so it can be replaced (e.g. by the fake model in app/benchmark.py).
+llm = llm_providers.get_model(llm_providers.default_spec())
 
 # --- Prompt Templates --- #
 
@@ -64,112 +56,514 @@ Be specific, constructive, and actionable in your feedback. For upskilling, sugg
 
 ANALYSIS_HUMAN_MESSAGE_TEMPLATE = "Please analyze the following resume information:\n\nExtracted Data:\n```json\n{extracted_data_json}\n```\n\n{raw_text_section}Provide your analysis and suggestions based on the JSON schema in the system message."
 
+# Combined mode: one round trip returning both the extraction and the analysis (LLM_PIPELINE_MODE)
+COMBINED_SYSTEM_MESSAGE = """
+You are an expert AI assistant that parses resumes into structured data and, as a career coach, analyzes them.
+Perform BOTH tasks described below on the same resume in a single response.
+Format your output STRICTLY as a single JSON object with exactly two keys, "extracted_data" and "analysis":
+{{ "extracted_data": {{ ...extraction object... }}, "analysis": {{ ...analysis object... }} }}
+Do not include any explanatory text before or after the JSON.
+
+### Task 1: extraction. The object described here is the value of "extracted_data".
+""" + EXTRACTION_SYSTEM_MESSAGE + """
+### Task 2: analysis. The object described here is the value of "analysis".
+""" + ANALYSIS_SYSTEM_MESSAGE
+
+COMBINED_HUMAN_MESSAGE_TEMPLATE = "Here is the resume text to parse and analyze:\n\n```text\n{resume_text}\n```\n\nReturn the combined JSON object with \"extracted_data\" and \"analysis\" as described in the system message."
+
+PIPELINE_MODE_TWO_STEP = "two_step"
+PIPELINE_MODE_COMBINED = "combined"
+PIPELINE_MODE_SPLIT = "split" # A/B: route LLM_COMBINED_SPLIT_PERCENT of resumes to combined mode
+
+# Prompt versions, part of the LLM cache key: any edit to a template invalidates its cached results
+EXTRACTION_PROMPT_VERSION = llm_cache.prompt_version(EXTRACTION_SYSTEM_MESSAGE, EXTRACTION_HUMAN_MESSAGE_TEMPLATE)
+ANALYSIS_PROMPT_VERSION = llm_cache.prompt_version(ANALYSIS_SYSTEM_MESSAGE, ANALYSIS_HUMAN_MESSAGE_TEMPLATE)
+COMBINED_PROMPT_VERSION = llm_cache.prompt_version(COMBINED_SYSTEM_MESSAGE, COMBINED_HUMAN_MESSAGE_TEMPLATE)
+
+def result_version(prompt_ver: str, model_id: str) -> str:
+    """
+    Identifies the prompt and model an LLM result was produced with. Stored on resumes
+    (extraction_version, analysis_version) so results from older prompts or models can be backfilled.
+    Hedged requests answered by the fallback model carry the version of the routed model.
+    Pre-extraction changes what the model sees, so its version is part of it when enabled.
+    """
+    if settings.LLM_PRE_EXTRACTION_ENABLED:
+        return llm_cache.prompt_version(prompt_ver, model_id, pre_extractor.VERSION)
+    return llm_cache.prompt_version(prompt_ver, model_id)
+
+EXTRACTION_RESULT_VERSION = result_version(EXTRACTION_PROMPT_VERSION, llm_providers.route_id("extraction"))
+ANALYSIS_RESULT_VERSION = result_version(ANALYSIS_PROMPT_VERSION, llm_providers.route_id("analysis"))
+COMBINED_RESULT_VERSION = result_version(COMBINED_PROMPT_VERSION, llm_providers.route_id("combined"))
+
 # Output Parsers
 string_output_parser = StrOutputParser()
 
-# Helper function to parse LLM JSON output
-def parse_llm_json_output(llm_output: str, context: str) -> Dict[str, Any]:
-    try:
-        # The LLM might sometimes include markdown ```json ... ``` around the JSON
-        if llm_output.strip().startswith("```json"):
-            llm_output = llm_output.strip()[7:-3].strip()
-        elif llm_output.strip().startswith("```"):
-             llm_output = llm_output.strip()[3:-3].strip()
-
-        parsed_json = json.loads(llm_output)
-        return parsed_json
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON output from LLM for {context}. Error: {e}. Output: {llm_output}")
-        # Fallback or error reporting
-        return {"error": "Failed to parse LLM output", "details": str(e), "raw_output": llm_output}
-    except Exception as e:
-        logger.error(f"An unexpected error occurred during JSON parsing for {context}. Error: {e}. Output: {llm_output}")
-        return {"error": "Unexpected error parsing LLM output", "details": str(e), "raw_output": llm_output}
+# Follow-up for the sections of an answer that were missing or invalid (see _followup_request).
+# It carries only the schemas of those sections and the input they are read from, not the full prompt.
+FOLLOWUP_SYSTEM_MESSAGE = """
+You are completing an earlier answer about a resume, in which some fields were missing or invalid.
+Format your output STRICTLY as a single JSON object containing ONLY the requested fields. Do not include any explanatory text before or after the JSON.
+A field written as "parent.field" goes inside the "parent" object. If the resume has no information for a field, use `null`, or `[]` for lists.
+The value of each field must conform to its JSON schema:
+{section_schemas}
+"""
 
-def _invoke_llm_chain_with_retry(chain: Any, params: Dict[str, Any], operation_name: str) -> str:
-    """Helper function to invoke LLM chain with retry logic."""
-    retry_decorator = tenacity.retry(
-        wait=tenacity.wait_exponential(multiplier=1, min=4, max=60), # Exponential backoff, min 4s, max 60s
-        stop=tenacity.stop_after_attempt(5), # Stop after 5 attempts
-        retry=(
-            tenacity.retry_if_exception_type(ResourceExhausted) | # Retry on Google's ResourceExhausted (429)
-            tenacity.retry_if_exception_type(TooManyRequests) | # General 429
-            tenacity.retry_if_exception_type(Exception) # Fallback for other transient errors, can be narrowed
-        ),
-        before_sleep=tenacity.before_sleep_log(logger, logging.WARNING), # Log retries
+FOLLOWUP_HUMAN_MESSAGE_TEMPLATE = "Fields to return: {fields}\nProblems in the earlier answer: {failed_sections}\n\n{context}\n\nReturn the JSON object with only these fields."
+
+def _llm_retry_decorator(operation_name: str):
+    # Only transient errors (throttling, 5xx, timeouts, connection failures) are retried.
+    # Throttling also pauses all LLM calls in the shared limiter until the server's retry hint has passed,
+    # so the jittered wait here mainly spreads retries out.
+    log_retry = tenacity.before_sleep_log(logger, logging.WARNING)
+    def before_sleep(retry_state: tenacity.RetryCallState) -> None:
+        reason = "throttled" if rate_limiter.is_throttling_error(retry_state.outcome.exception()) else "transient"
+        metrics.LLM_RETRIES.inc(operation=operation_name, reason=reason)
+        log_retry(retry_state)
+    return tenacity.retry(
+        wait=tenacity.wait_random_exponential(multiplier=1, min=1, max=30),
+        stop=tenacity.stop_after_attempt(settings.LLM_MAX_ATTEMPTS),
+        retry=tenacity.retry_if_exception(rate_limiter.is_transient_error),
+        before_sleep=before_sleep, # Log and count retries
         reraise=True # Reraise the last exception if all retries fail
     )
-    return retry_decorator(chain.invoke)(params)
 
-def extract_resume_data_from_text(resume_text: str) -> Dict[str, Any]:
-    if not llm:
-        return {"error": "LLM not initialized"}
+def _response_text(message: Any, params: Dict[str, Any], operation_name: str) -> str:
+    """The text of an LLM response message; records its prompt and response token counts."""
+    text = string_output_parser.invoke(message)
+    usage = getattr(message, "usage_metadata", None) or {}
+    metrics.LLM_TOKENS.observe(usage.get("input_tokens", rate_limiter.estimate_tokens(params)), operation=operation_name, kind="prompt")
+    metrics.LLM_TOKENS.observe(usage.get("output_tokens", rate_limiter.estimate_tokens({"text": text})), operation=operation_name, kind="response")
+    return text
+
+def _count_throttling(e: Exception, operation_name: str) -> None:
+    if rate_limiter.is_throttling_error(e):
+        metrics.LLM_THROTTLED.inc(operation=operation_name)
 
-    extraction_prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(EXTRACTION_SYSTEM_MESSAGE),
-        HumanMessagePromptTemplate.from_template(EXTRACTION_HUMAN_MESSAGE_TEMPLATE)
+def _invoke_llm_chain_with_retry(chain: Any, params: Dict[str, Any], operation_name: str) -> str:
+    """Helper function to invoke LLM chain with retry logic, within the shared rate limit."""
+    def invoke_once() -> str:
+        try:
+            if not settings.LLM_RATE_LIMIT_ENABLED:
+                message = chain.invoke(params)
+            else:
+                with rate_limiter.limiter.slot(rate_limiter.estimate_tokens(params)):
+                    message = chain.invoke(params)
+        except Exception as e:
+            _count_throttling(e, operation_name)
+            raise
+        return _response_text(message, params, operation_name)
+    return _llm_retry_decorator(operation_name)(invoke_once)()
+
+async def _ainvoke_llm_chain_with_retry(chain: Any, params: Dict[str, Any], operation_name: str) -> str:
+    """Async variant of _invoke_llm_chain_with_retry: awaits chain.ainvoke and backs off with asyncio.sleep."""
+    async def ainvoke_once() -> str:
+        try:
+            if not settings.LLM_RATE_LIMIT_ENABLED:
+                message = await chain.ainvoke(params)
+            else:
+                async with rate_limiter.limiter.aslot(rate_limiter.estimate_tokens(params)):
+                    message = await chain.ainvoke(params)
+        except Exception as e:
+            _count_throttling(e, operation_name)
+            raise
+        return _response_text(message, params, operation_name)
+    return await _llm_retry_decorator(operation_name)(ainvoke_once)()
+
+def select_pipeline_mode(resume_text: str) -> str:
+    """
+    Picks two-step or combined LLM mode according to LLM_PIPELINE_MODE.
+    In split mode the choice is a stable function of the text, so re-uploads land in the same arm.
+    """
+    mode = settings.LLM_PIPELINE_MODE
+    if mode == PIPELINE_MODE_SPLIT:
+        bucket = int(llm_cache.make_key("ab", "", "", resume_text)[:8], 16) % 100
+        return PIPELINE_MODE_COMBINED if bucket < settings.LLM_COMBINED_SPLIT_PERCENT else PIPELINE_MODE_TWO_STEP
+    if mode == PIPELINE_MODE_COMBINED:
+        return PIPELINE_MODE_COMBINED
+    return PIPELINE_MODE_TWO_STEP
+
+# Sections of each operation's output, validated one by one (app/services/llm_output.py)
+EXTRACTION_SECTIONS = llm_output.Sections(schemas.ResumeUpdate, exclude=("file_name", "raw_text", "llm_analysis"))
+ANALYSIS_SECTIONS = llm_output.Sections(schemas.LLMAnalysis)
+COMBINED_SECTIONS = {"extracted_data": EXTRACTION_SECTIONS, "analysis": ANALYSIS_SECTIONS}
+
+class _LLMOperation(NamedTuple):
+    name: str # Cache operation name, also used in error messages
+    description: str # For log messages
+    system_message: str
+    human_template: str
+    prompt_version: str
+    sections: llm_output.SectionSchema
+
+EXTRACTION_OPERATION = _LLMOperation("extraction", "resume data extraction", EXTRACTION_SYSTEM_MESSAGE, EXTRACTION_HUMAN_MESSAGE_TEMPLATE, EXTRACTION_PROMPT_VERSION, EXTRACTION_SECTIONS)
+ANALYSIS_OPERATION = _LLMOperation("analysis", "resume analysis", ANALYSIS_SYSTEM_MESSAGE, ANALYSIS_HUMAN_MESSAGE_TEMPLATE, ANALYSIS_PROMPT_VERSION, ANALYSIS_SECTIONS)
+COMBINED_OPERATION = _LLMOperation("combined", "combined resume extraction and analysis", COMBINED_SYSTEM_MESSAGE, COMBINED_HUMAN_MESSAGE_TEMPLATE, COMBINED_PROMPT_VERSION, COMBINED_SECTIONS)
+
+def _build_chain(operation: _LLMOperation, model: Any) -> Any:
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(operation.system_message),
+        HumanMessagePromptTemplate.from_template(operation.human_template)
     ])
-    
-    chain = extraction_prompt | llm | string_output_parser
-    
-    logger.info("Sending resume text to LLM for data extraction...")
+    return prompt | model # The response message carries the token usage; _response_text extracts the text
+
+class _Model(NamedTuple):
+    model: Any # None if it could not be initialized
+    id: str # llm_providers.ModelSpec.id, part of cache keys
+
+def _routed_model(operation: _LLMOperation) -> _Model:
+    spec = llm_providers.route(operation.name)
+    if spec is None:
+        return _Model(llm, llm_providers.default_spec().id)
+    return _Model(llm_providers.get_model(spec), spec.id)
+
+def _fallback_model(primary: _Model) -> Optional[_Model]:
+    spec = llm_providers.fallback_spec()
+    if spec is None or spec.id == primary.id:
+        return None
+    model = llm_providers.get_model(spec)
+    return _Model(model, spec.id) if model is not None else None
+
+def configuration_error() -> Optional[str]:
+    """Why LLM requests can't be made (missing API key, unknown provider or model), or None if they can."""
+    for operation in (EXTRACTION_OPERATION, ANALYSIS_OPERATION, COMBINED_OPERATION):
+        model = _routed_model(operation)
+        if model.model is None:
+            spec = llm_providers.route(operation.name) or llm_providers.default_spec()
+            if spec.provider == llm_providers.PROVIDER_GEMINI and not settings.GOOGLE_API_KEY:
+                return "LLM service not configured: GOOGLE_API_KEY missing."
+            return f"LLM client for {operation.name} ({model.id}) could not be initialized. Check the LLM settings, API key and service status."
+    return None
+
+def _cache_key(operation: _LLMOperation, model_id: str, cache_inputs: Tuple[Any, ...]) -> str:
+    return llm_cache.make_key(operation.name, operation.prompt_version, model_id, *cache_inputs)
+
+def _process_output(operation: _LLMOperation, response_content: str, followup: bool = False) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Parses (and if needed repairs) a response, then validates it section by section.
+    Returns (the valid sections, {failed section path: reason}); an unparseable response fails every section.
+    """
+    label = f"{operation.description} follow-up" if followup else operation.description
+    logger.info(f"Received {label} response from LLM.")
     try:
-        response_content = _invoke_llm_chain_with_retry(chain, {"resume_text": resume_text}, "data extraction")
-        logger.info("Received extraction response from LLM.")
-        # Basic check if response seems like JSON before parsing fully
-        if not response_content.strip().startswith("{"):
-             logger.warning(f"LLM extraction output does not look like JSON: {response_content[:200]}...") # Log first 200 chars
-             # Potentially add specific error key or attempt to find JSON within the string if robustly needed
-
-        extracted_data = parse_llm_json_output(response_content, "resume data extraction")
-        return extracted_data
-    except ResourceExhausted as e: # Specifically catch ResourceExhausted if it's reraised
-        logger.error(f"Rate limit exceeded during LLM data extraction chain after retries: {e}")
-        return {"error": "LLM rate limit exceeded", "details": str(e)}
-    except Exception as e:
-        logger.error(f"Error during LLM data extraction chain: {e}")
-        return {"error": "LLM chain invocation failed for extraction", "details": str(e)}
+        parsed = json_repair.parse_object(response_content)
+    except ValueError as e:
+        logger.error(f"Failed to parse JSON output from LLM for {label}. Error: {e}. Output: {response_content[:500]}")
+        metrics.LLM_INVALID_OUTPUTS.inc(operation=operation.name, reason="parse")
+        return {}, {path: "unparseable response" for path in llm_output.section_paths(operation.sections)}
+    if parsed.repairs:
+        logger.warning(f"Repaired LLM {label} output ({', '.join(parsed.repairs)}).")
+        for repair in parsed.repairs:
+            metrics.LLM_OUTPUT_REPAIRS.inc(operation=operation.name, repair=repair)
+
+    # Sections cut off by truncation count as failed; otherwise an absent section is just empty
+    result, failures = llm_output.validate_sections(parsed.value, operation.sections, require_all=parsed.truncated and not followup)
+    truncated_section = llm_output.section_of(operation.sections, parsed.truncated_path) if parsed.truncated else None
+    if truncated_section is not None:
+        # Its value is half-written even if it validates
+        llm_output.drop_truncated(result, truncated_section)
+        failures.setdefault(truncated_section, "truncated")
+    if failures and not followup:
+        logger.warning(f"LLM {label} output has missing or invalid sections: {failures}")
+        metrics.LLM_INVALID_OUTPUTS.inc(operation=operation.name, reason="validation")
+    return result, failures
+
+def _extracted_data_context(extracted_data_json: str) -> str:
+    return f"Extracted Data:\n```json\n{extracted_data_json}\n```"
+
+def _resume_context(resume_text: str, field_names: List[str]) -> str:
+    return f"Resume text (the relevant parts):\n```text\n{pre_extractor.excerpt(resume_text, field_names)}\n```"
+
+def _followup_context(operation: _LLMOperation, params: Dict[str, Any], paths: List[str], result: Dict[str, Any]) -> str:
+    """
+    The input the failed sections are read from: the resume sections of extraction fields, and the
+    extracted data for analysis fields (the full resume text only if no extracted data is available).
+    """
+    if operation.name == ANALYSIS_OPERATION.name:
+        return _extracted_data_context(params["extracted_data_json"])
+    if operation.name == EXTRACTION_OPERATION.name:
+        return _resume_context(params["resume_text"], paths)
+
+    # Combined: paths are "extracted_data.<field>" or "analysis.<field>" (or a whole missing object)
+    extraction_fields = [path.partition(".")[2] for path in paths if path.startswith("extracted_data")]
+    needs_analysis = any(path.startswith("analysis") for path in paths)
+    if "" in extraction_fields or (needs_analysis and not result.get("extracted_data")):
+        return f"Resume text:\n```text\n{params['resume_text']}\n```"
+    parts = []
+    if extraction_fields:
+        parts.append(_resume_context(params["resume_text"], extraction_fields))
+    if needs_analysis:
+        parts.append(_extracted_data_context(json.dumps(result["extracted_data"], separators=(",", ":"), ensure_ascii=False)))
+    return "\n\n".join(parts)
+
+def _followup_request(operation: _LLMOperation, params: Dict[str, Any], failures: Dict[str, str], result: Dict[str, Any]) -> Tuple[_LLMOperation, Dict[str, Any]]:
+    """A request for only the failed sections: their schemas and the input they are read from."""
+    # Its own name keeps follow-ups (short answers) out of the operation's hedging latencies and
+    # counts them separately in the retry, throttling and token metrics
+    followup_operation = operation._replace(
+        name=f"{operation.name}_followup",
+        description=f"{operation.description} follow-up",
+        system_message=FOLLOWUP_SYSTEM_MESSAGE,
+        human_template=FOLLOWUP_HUMAN_MESSAGE_TEMPLATE,
+    )
+    paths = list(failures)
+    return followup_operation, {
+        "section_schemas": json.dumps(llm_output.section_schemas(operation.sections, paths), separators=(",", ":")),
+        "fields": ", ".join(paths),
+        "failed_sections": "; ".join(f"{path} ({reason})" for path, reason in failures.items()),
+        "context": _followup_context(operation, params, paths, result),
+    }
+
+def _merge_followup(operation: _LLMOperation, result: Dict[str, Any], followup_result: Dict[str, Any], failures: Dict[str, str]) -> Dict[str, str]:
+    """Fills the failed sections of `result` from the follow-up's answer. Returns the sections still failed."""
+    missing = llm_output.merge_sections(result, followup_result, list(failures))
+    outcome = "recovered" if not missing else "partial" if len(missing) < len(failures) else "failed"
+    metrics.LLM_SECTION_FOLLOWUPS.inc(operation=operation.name, outcome=outcome)
+    logger.info(f"LLM {operation.name} follow-up {outcome}: {len(failures) - len(missing)} of {len(failures)} sections recovered.")
+    return {path: failures[path] for path in missing}
+
+def _finish_output(operation: _LLMOperation, result: Dict[str, Any], failures: Dict[str, str], llm_seconds: float, cache_key: str, model_id: str) -> Dict[str, Any]:
+    """
+    The operation's result: an error if nothing usable is left (or a required object of the combined
+    output is missing), otherwise the valid sections, with the still-failed ones dropped. Only complete
+    results are cached, so a later request for the same text gets another chance at dropped sections.
+    """
+    required = operation.sections.keys() if isinstance(operation.sections, dict) else ()
+    if not result or any(key not in result for key in required):
+        details = "; ".join(f"{path}: {reason}" for path, reason in failures.items()) or "empty output"
+        logger.error(f"Invalid {operation.name} LLM output: {details}")
+        return {"error": f"Invalid {operation.name} LLM output", "details": details}
+    if failures:
+        logger.warning(f"Dropped invalid sections of the LLM {operation.name} output: {', '.join(failures)}")
+        return result
+    llm_cache.put(cache_key, operation.name, result, llm_seconds, model_name=model_id)
+    return result
+
+def _handle_error(operation: _LLMOperation, e: Exception) -> Dict[str, Any]:
+    if rate_limiter.is_throttling_error(e): # Still throttled after all retries
+        logger.error(f"Rate limit exceeded during LLM {operation.name} chain after retries: {e}")
+        return {"error": f"LLM rate limit exceeded for {operation.name}", "details": str(e)}
+    logger.error(f"Error during LLM {operation.name} chain: {e}")
+    return {"error": f"LLM chain invocation failed for {operation.name}", "details": str(e)}
+
+def _observe_request(operation: _LLMOperation, started_at: float, outcome: str) -> None:
+    metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started_at, operation=operation.name, outcome=outcome)
+
+# --- Hedged requests ---
+# With LLM_FALLBACK_MODEL set, a request to the routed model that hasn't answered by its deadline (the
+# LLM_HEDGE_PERCENTILE of its recent latencies) is also sent to the fallback model, and the first
+# successful answer is used; a request that fails is sent to the fallback model right away. Both go
+# through the shared rate limiter. The sync path runs the two calls in a small thread pool (a losing
+# call finishes in the background); the async path cancels the loser.
+
+_hedge_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+def _get_hedge_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2 * settings.LLM_MAX_CONCURRENCY, thread_name_prefix="llm-hedge")
+        return _hedge_executor
+
+def shutdown_executor() -> None:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is not None:
+            _hedge_executor.shutdown(wait=False, cancel_futures=True)
+            _hedge_executor = None
+
+def _latency_key(operation: _LLMOperation, model: _Model) -> str:
+    return f"{operation.name}:{model.id}"
+
+def _record_hedge(operation: _LLMOperation, reason: str, winner: str) -> None:
+    metrics.LLM_HEDGED_REQUESTS.inc(operation=operation.name, reason=reason, winner=winner)
+    if winner != "primary":
+        logger.warning(f"LLM {operation.name} request hedged ({reason}); answered by: {winner}.")
+
+def _call_primary(operation: _LLMOperation, primary: _Model, params: Dict[str, Any]) -> str:
+    started_at = time.perf_counter()
+    response_content = _invoke_llm_chain_with_retry(_build_chain(operation, primary.model), params, operation.name)
+    llm_providers.latencies.record(_latency_key(operation, primary), time.perf_counter() - started_at)
+    return response_content
+
+async def _acall_primary(operation: _LLMOperation, primary: _Model, params: Dict[str, Any]) -> str:
+    started_at = time.perf_counter()
+    try:
+        response_content = await _ainvoke_llm_chain_with_retry(_build_chain(operation, primary.model), params, operation.name)
+    except asyncio.CancelledError:
+        # Lost to a hedge: the time so far is a lower bound of its latency, and keeps the percentile honest
+        llm_providers.latencies.record(_latency_key(operation, primary), time.perf_counter() - started_at)
+        raise
+    llm_providers.latencies.record(_latency_key(operation, primary), time.perf_counter() - started_at)
+    return response_content
+
+def _invoke(operation: _LLMOperation, primary: _Model, params: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Calls the routed model, hedged to the fallback model if one is configured.
+    Returns (response text, ID of the model that answered); raises the routed model's error if both fail.
+    """
+    fallback = _fallback_model(primary)
+    if fallback is None:
+        return _call_primary(operation, primary, params), primary.id
+
+    executor = _get_hedge_executor()
+    primary_future = executor.submit(_call_primary, operation, primary, params)
+    done, _ = concurrent.futures.wait([primary_future], timeout=llm_providers.latencies.hedge_delay(_latency_key(operation, primary)))
+    if done and primary_future.exception() is None:
+        return primary_future.result(), primary.id
+
+    reason = "error" if done else "deadline"
+    fallback_future = executor.submit(_invoke_llm_chain_with_retry, _build_chain(operation, fallback.model), params, operation.name)
+    futures = {primary_future: primary, fallback_future: fallback}
+    for future in concurrent.futures.as_completed(futures):
+        if future.exception() is None:
+            _record_hedge(operation, reason, "primary" if future is primary_future else "fallback")
+            return future.result(), futures[future].id
+    _record_hedge(operation, reason, "none")
+    raise primary_future.exception()
+
+async def _ainvoke(operation: _LLMOperation, primary: _Model, params: Dict[str, Any]) -> Tuple[str, str]:
+    """Async variant of _invoke. The losing request is cancelled."""
+    fallback = _fallback_model(primary)
+    if fallback is None:
+        return await _acall_primary(operation, primary, params), primary.id
+
+    primary_task = asyncio.ensure_future(_acall_primary(operation, primary, params))
+    tasks = {primary_task: primary}
+    try:
+        done, _ = await asyncio.wait({primary_task}, timeout=llm_providers.latencies.hedge_delay(_latency_key(operation, primary)))
+        if done and primary_task.exception() is None:
+            return primary_task.result(), primary.id
+
+        reason = "error" if done else "deadline"
+        fallback_task = asyncio.ensure_future(_ainvoke_llm_chain_with_retry(_build_chain(operation, fallback.model), params, operation.name))
+        tasks[fallback_task] = fallback
+        pending = set(tasks) - done
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    _record_hedge(operation, reason, "primary" if task is primary_task else "fallback")
+                    return task.result(), tasks[task].id
+        _record_hedge(operation, reason, "none")
+        raise primary_task.exception()
+    finally:
+        for task in tasks:
+            task.cancel() # No-op for finished tasks
+
+def _run_operation(operation: _LLMOperation, params: Dict[str, Any], cache_inputs: Tuple[Any, ...]) -> Dict[str, Any]:
+    """
+    Cache lookup, LLM call with retries (and hedging), JSON parsing/repair and section validation,
+    a follow-up request for failed sections, and cache store for one operation.
+    Returns the parsed result or a dict with an "error" key.
+    """
+    primary = _routed_model(operation)
+    if not primary.model:
+        return {"error": "LLM not initialized"}
 
-def analyze_resume_content(extracted_data_dict: Dict[str, Any], raw_resume_text: Optional[str] = None) -> Dict[str, Any]:
-    if not llm:
+    # Keyed by the routed model, like the result versions: answers from the fallback model are stored
+    # under the same key, so they are found again
+    cache_key = _cache_key(operation, primary.id, cache_inputs)
+    cached_result = llm_cache.get(cache_key)
+    if cached_result is not None:
+        logger.info(f"Using cached LLM {operation.name} result.")
+        metrics.LLM_CACHE_HITS.inc(operation=operation.name)
+        return cached_result
+
+    logger.info(f"Sending request to LLM for {operation.description}...")
+    started_at = time.perf_counter()
+    try:
+        response_content, model_id = _invoke(operation, primary, params)
+        result, failures = _process_output(operation, response_content)
+        if failures and settings.LLM_OUTPUT_FOLLOWUP_ENABLED:
+            # Only the failed sections are requested again
+            followup_operation, followup_params = _followup_request(operation, params, failures, result)
+            try:
+                followup_content, _ = _invoke(followup_operation, primary, followup_params)
+                followup_result, _ = _process_output(operation, followup_content, followup=True)
+            except Exception as e:
+                logger.warning(f"LLM {operation.name} follow-up request failed: {e}")
+                followup_result = {}
+            failures = _merge_followup(operation, result, followup_result, failures)
+        llm_seconds = time.perf_counter() - started_at
+        result = _finish_output(operation, result, failures, llm_seconds, cache_key, model_id)
+    except Exception as e:
+        _observe_request(operation, started_at, "error")
+        return _handle_error(operation, e)
+    _observe_request(operation, started_at, "invalid_output" if "error" in result else "success")
+    return result
+
+async def _arun_operation(operation: _LLMOperation, params: Dict[str, Any], cache_inputs: Tuple[Any, ...]) -> Dict[str, Any]:
+    """
+    Async variant of _run_operation. The LLM call is awaited; the cache (which may hit the
+    database) is consulted in a worker thread so the event loop never blocks on it.
+    """
+    primary = _routed_model(operation)
+    if not primary.model:
         return {"error": "LLM not initialized"}
 
-    analysis_prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(ANALYSIS_SYSTEM_MESSAGE),
-        HumanMessagePromptTemplate.from_template(ANALYSIS_HUMAN_MESSAGE_TEMPLATE)
-    ])
+    cache_key = _cache_key(operation, primary.id, cache_inputs)
+    cached_result = await asyncio.to_thread(llm_cache.get, cache_key)
+    if cached_result is not None:
+        logger.info(f"Using cached LLM {operation.name} result.")
+        metrics.LLM_CACHE_HITS.inc(operation=operation.name)
+        return cached_result
 
-    chain = analysis_prompt | llm | string_output_parser
+    logger.info(f"Sending request to LLM for {operation.description} (async)...")
+    started_at = time.perf_counter()
+    try:
+        response_content, model_id = await _ainvoke(operation, primary, params)
+        result, failures = await asyncio.to_thread(_process_output, operation, response_content)
+        if failures and settings.LLM_OUTPUT_FOLLOWUP_ENABLED:
+            followup_operation, followup_params = _followup_request(operation, params, failures, result)
+            try:
+                followup_content, _ = await _ainvoke(followup_operation, primary, followup_params)
+                followup_result, _ = await asyncio.to_thread(_process_output, operation, followup_content, True)
+            except Exception as e:
+                logger.warning(f"LLM {operation.name} follow-up request failed: {e}")
+                followup_result = {}
+            failures = _merge_followup(operation, result, followup_result, failures)
+        llm_seconds = time.perf_counter() - started_at
+        result = await asyncio.to_thread(_finish_output, operation, result, failures, llm_seconds, cache_key, model_id)
+    except Exception as e:
+        _observe_request(operation, started_at, "error")
+        return _handle_error(operation, e)
+    _observe_request(operation, started_at, "invalid_output" if "error" in result else "success")
+    return result
 
+def _analysis_params(extracted_data_dict: Dict[str, Any], raw_resume_text: Optional[str]) -> Dict[str, Any]:
     raw_text_section_content = ""
     if raw_resume_text:
         raw_text_section_content = f"Full Resume Text (for context):\n```text\n{raw_resume_text}\n```"
 
-    # Convert extracted_data_dict to JSON string for the prompt
-    extracted_data_json_str = json.dumps(extracted_data_dict, indent=2)
+    # Convert extracted_data_dict to JSON string for the prompt (compact, to keep input tokens down)
+    extracted_data_json_str = json.dumps(extracted_data_dict, separators=(",", ":"), ensure_ascii=False)
+    return {
+        "extracted_data_json": extracted_data_json_str,
+        "raw_text_section": raw_text_section_content
+    }
 
-    logger.info("Sending extracted data (and optionally raw text) to LLM for analysis...")
-    try:
-        response_content = _invoke_llm_chain_with_retry(
-            chain,
-            {
-                "extracted_data_json": extracted_data_json_str,
-                "raw_text_section": raw_text_section_content
-            },
-            "resume analysis"
-        )
-        logger.info("Received analysis response from LLM.")
-        if not response_content.strip().startswith("{"):
-             logger.warning(f"LLM analysis output does not look like JSON: {response_content[:200]}...")
-
-        analysis_result = parse_llm_json_output(response_content, "resume analysis")
-        return analysis_result
-    except ResourceExhausted as e: # Specifically catch ResourceExhausted if it's reraised
-        logger.error(f"Rate limit exceeded during LLM analysis chain after retries: {e}")
-        return {"error": "LLM rate limit exceeded for analysis", "details": str(e)}
-    except Exception as e:
-        logger.error(f"Error during LLM analysis chain: {e}")
-        return {"error": "LLM chain invocation failed for analysis", "details": str(e)}
+def extract_resume_data_from_text(resume_text: str) -> Dict[str, Any]:
+    return _run_operation(EXTRACTION_OPERATION, {"resume_text": resume_text}, (resume_text,))
+
+def analyze_resume_content(extracted_data_dict: Dict[str, Any], raw_resume_text: Optional[str] = None) -> Dict[str, Any]:
+    return _run_operation(ANALYSIS_OPERATION, _analysis_params(extracted_data_dict, raw_resume_text), (extracted_data_dict, raw_resume_text or ""))
+
+def extract_and_analyze_resume(resume_text: str) -> Dict[str, Any]:
+    """
+    Extraction and analysis in a single LLM round trip.
+    Returns {"extracted_data": {...}, "analysis": {...}} or a dict with an "error" key.
+    """
+    return _run_operation(COMBINED_OPERATION, {"resume_text": resume_text}, (resume_text,))
+
+async def aextract_resume_data_from_text(resume_text: str) -> Dict[str, Any]:
+    return await _arun_operation(EXTRACTION_OPERATION, {"resume_text": resume_text}, (resume_text,))
+
+async def aanalyze_resume_content(extracted_data_dict: Dict[str, Any], raw_resume_text: Optional[str] = None) -> Dict[str, Any]:
+    return await _arun_operation(ANALYSIS_OPERATION, _analysis_params(extracted_data_dict, raw_resume_text), (extracted_data_dict, raw_resume_text or ""))
+
+async def aextract_and_analyze_resume(resume_text: str) -> Dict[str, Any]:
+    return await _arun_operation(COMBINED_OPERATION, {"resume_text": resume_text}, (resume_text,))
 
 # Example Usage (for testing purposes, can be removed or placed in a test file)
 # if __name__ == "__main__":
@@ -0,0 +1,274 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import logging
+import re
+import threading
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.api.v1 import schemas
+
+logger = logging.getLogger(__name__)
+
+# Deterministic pre-extraction, run before the LLM stages (resume_pipeline).
+# Section headings are detected from a list of common titles, and contact details (email, phone,
+# LinkedIn/GitHub/portfolio URLs) are read with regexes from the header (the text before the first
+# heading) and any contact section, so a referee's details further down are never taken. Sections
+# that are plain lists (awards, publications) are read item by item.
+# The values found here fill the fields the LLM left empty; where the LLM has a value, it is kept.
+# The LLM text, sent to the extraction call only, is the resume without the lines whose contact
+# details were taken, without the sections read here, and without the sections the schema has no
+# use for (references, interests). Everything else (name, address, summary, experience, education,
+# projects, skills, ...) needs the LLM and is sent as is, so the prompt shrinks by the size of those
+# parts only. The analysis and the combined call judge the whole resume and get the full text.
+
+VERSION = "3" # Part of the result versions; bump when the output for a given text changes
+
+SECTION_SUMMARY = "summary"
+SECTION_EXPERIENCE = "experience"
+SECTION_EDUCATION = "education"
+SECTION_SKILLS = "skills"
+SECTION_PROJECTS = "projects"
+SECTION_CERTIFICATIONS = "certifications"
+SECTION_LANGUAGES = "languages"
+SECTION_AWARDS = "awards"
+SECTION_PUBLICATIONS = "publications"
+SECTION_REFERENCES = "references"
+SECTION_INTERESTS = "interests"
+SECTION_CONTACT = "contact"
+
+_SECTION_TITLES = {
+    SECTION_SUMMARY: ("summary", "professional summary", "summary of qualifications", "career summary", "profile",
+                      "professional profile", "objective", "career objective", "about me", "about"),
+    SECTION_EXPERIENCE: ("experience", "work experience", "professional experience", "relevant experience", "employment",
+                         "employment history", "work history", "career history", "volunteer experience"),
+    SECTION_EDUCATION: ("education", "education and training", "academic background", "academic qualifications", "qualifications"),
+    SECTION_SKILLS: ("skills", "technical skills", "key skills", "core competencies", "competencies", "areas of expertise",
+                     "expertise", "skills and abilities", "skills and expertise"),
+    SECTION_PROJECTS: ("projects", "personal projects", "key projects", "selected projects", "academic projects"),
+    SECTION_CERTIFICATIONS: ("certifications", "certificates", "licenses and certifications", "certifications and licenses", "courses", "training"),
+    SECTION_LANGUAGES: ("languages", "language skills"),
+    SECTION_AWARDS: ("awards", "honors", "honours", "awards and honors", "honors and awards", "achievements", "accomplishments"),
+    SECTION_PUBLICATIONS: ("publications", "selected publications"),
+    SECTION_REFERENCES: ("references", "referees"),
+    SECTION_INTERESTS: ("interests", "hobbies", "hobbies and interests", "interests and hobbies"),
+    SECTION_CONTACT: ("contact", "contact information", "contact info", "contact details", "personal details", "personal information"),
+}
+_TITLE_TO_SECTION = {title: section for section, titles in _SECTION_TITLES.items() for title in titles}
+_OMITTED_SECTIONS = (SECTION_REFERENCES, SECTION_INTERESTS) # Not sent to the LLM
+_LIST_SECTION_FIELDS = {SECTION_AWARDS: "awards_honors", SECTION_PUBLICATIONS: "publications"} # Read here, not sent
+
+# Where each ResumeBase field is found, for excerpts (follow-up requests); contact fields are in the header
+_CONTACT_FIELDS = ("name", "email", "phone", "linkedin_url", "github_url", "portfolio_url", "address")
+FIELD_SECTIONS = {
+    **{field_name: (SECTION_CONTACT,) for field_name in _CONTACT_FIELDS},
+    "summary": (SECTION_SUMMARY,),
+    "education_history": (SECTION_EDUCATION,),
+    "work_experience": (SECTION_EXPERIENCE,),
+    "projects": (SECTION_PROJECTS,),
+    "technical_skills": (SECTION_SKILLS,),
+    "soft_skills": (SECTION_SKILLS, SECTION_SUMMARY),
+    "other_skills": (SECTION_SKILLS,),
+    "languages": (SECTION_LANGUAGES,),
+    "certifications": (SECTION_CERTIFICATIONS,),
+    "awards_honors": (SECTION_AWARDS,),
+    "publications": (SECTION_PUBLICATIONS,),
+    "references_available": (SECTION_REFERENCES,),
+}
+
+_MAX_HEADING_CHARS = 40
+_HEADERLESS_CONTACT_LINES = 15 # Where contact details are looked for when no heading is found
+
+_EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+_PHONE_PATTERN = re.compile(r"(?<![\w/])(?:\+\d{1,3}[\s.\-]{0,2})?(?:\(\d{1,4}\)[\s.\-]{0,2})?\d{2,5}(?:[\s.\-]{1,3}\d{2,6}){1,4}(?![\w/])")
+_LINKEDIN_PATTERN = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/[A-Za-z0-9_%\-]+/?", re.IGNORECASE)
+_GITHUB_PATTERN = re.compile(r"(?:https?://)?(?:www\.)?github\.com/[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})/?(?![\w/-])", re.IGNORECASE)
+_URL_PATTERN = re.compile(r"(?:https?://|www\.)[^\s|,;()<>]+", re.IGNORECASE)
+_PHONE_LABEL_PATTERN = re.compile(r"\b(?:phone|tel|telephone|mobile|mob|cell)\b", re.IGNORECASE)
+# Without a label, a number counts as a phone only if it is formatted like one: international (+44),
+# trunk prefix (0...), area code in parentheses, or the 3-3-4 North American grouping
+_FORMATTED_PHONE_PATTERN = re.compile(r"^(?:[+(0]|\d{3}[\s.\-]\d{3}[\s.\-]\d{4}$)")
+_BULLET_PATTERN = re.compile(r"^\s*(?:[-*•·▪◦●]|\d{1,2}[.)])\s+")
+_YEAR_RANGE_PATTERN = re.compile(r"(?:19|20)\d{2}\s*[\-–]\s*(?:19|20)\d{2}")
+# What may remain of a line that only held contact details
+_CONTACT_LINE_RESIDUE = re.compile(
+    r"^(?:[\s|•·,;:./\-–]|e-?mail|phone|tel|mobile|cell|linkedin|github|portfolio|website|web|url)*$", re.IGNORECASE,
+)
+
+class PreExtraction(NamedTuple):
+    fields: Dict[str, Any] # ResumeBase fields found locally; they fill the fields the LLM left empty
+    sections: Tuple[str, ...] # Detected sections, in document order
+    llm_text: str # What the LLM stages get instead of the full text
+
+    def apply(self, extracted_data_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """An LLM extraction with the locally found fields filled in where it has no value."""
+        merged = dict(extracted_data_dict)
+        for field_name, value in self.fields.items():
+            llm_value = merged.get(field_name)
+            if llm_value in (None, "", []):
+                merged[field_name] = value
+            elif llm_value != value:
+                logger.info(f"Pre-extraction: keeping the LLM's {field_name} over the local value.")
+        return merged
+
+def passthrough(raw_text: str) -> PreExtraction:
+    """No pre-extraction: the LLM gets the full text and decides every field."""
+    return PreExtraction({}, (), raw_text)
+
+_adapters: Dict[str, TypeAdapter] = {}
+_adapters_lock = threading.Lock()
+
+def _is_valid(field_name: str, value: Any) -> bool:
+    # Local values must pass the same validation as the LLM's (EmailStr, HttpUrl)
+    with _adapters_lock:
+        adapter = _adapters.get(field_name)
+        if adapter is None:
+            adapter = _adapters[field_name] = TypeAdapter(schemas.ResumeBase.model_fields[field_name].annotation)
+    try:
+        adapter.validate_python(value)
+        return True
+    except ValidationError:
+        return False
+
+def _heading_section(line: str) -> Optional[str]:
+    stripped = line.strip()
+    if not stripped or len(stripped) > _MAX_HEADING_CHARS:
+        return None
+    title = re.sub(r"[^a-z ]", "", stripped.lower().replace("&", " and ").replace("ç", "c"))
+    return _TITLE_TO_SECTION.get(" ".join(title.split()))
+
+def _split_sections(lines: List[str]) -> List[Tuple[Optional[str], List[str]]]:
+    """(section, lines) blocks; the first block is the header (section None), which may be empty."""
+    blocks: List[Tuple[Optional[str], List[str]]] = [(None, [])]
+    for line in lines:
+        section = _heading_section(line)
+        if section is not None:
+            blocks.append((section, [line]))
+        else:
+            blocks[-1][1].append(line)
+    return blocks
+
+def _url(match: str) -> str:
+    return match if match.lower().startswith("http") else "https://" + match
+
+def _phone_candidates(line: str) -> List[str]:
+    candidates = []
+    for match in _PHONE_PATTERN.finditer(line):
+        candidate = match.group(0).strip(" .-")
+        digits = sum(char.isdigit() for char in candidate)
+        if 7 <= digits <= 15 and not _YEAR_RANGE_PATTERN.search(candidate):
+            candidates.append(candidate)
+    return candidates
+
+def _find_phone(text: str) -> Optional[str]:
+    """A number on a labelled line (Phone, Tel, Mobile) first; otherwise the first phone-formatted one."""
+    lines = text.splitlines()
+    for line in lines:
+        if _PHONE_LABEL_PATTERN.search(line):
+            candidates = _phone_candidates(line)
+            if candidates:
+                return candidates[0]
+    for line in lines:
+        for candidate in _phone_candidates(line):
+            if _FORMATTED_PHONE_PATTERN.match(candidate):
+                return candidate
+    return None
+
+def _contact_fields(text: str) -> Tuple[Dict[str, Any], List[str]]:
+    """Contact fields found in `text`, and the strings they were taken from (to recognise contact-only lines)."""
+    fields: Dict[str, Any] = {}
+    matched: List[str] = []
+
+    def take(field_name: str, value: Optional[str], raw: Optional[str]) -> None:
+        if value and field_name not in fields and _is_valid(field_name, value):
+            fields[field_name] = value
+        if raw and fields.get(field_name) == value:
+            matched.append(raw) # Repeats of a taken value count too; rejected values stay in the text
+
+    for match in _EMAIL_PATTERN.finditer(text):
+        take("email", match.group(0), match.group(0))
+    for match in _LINKEDIN_PATTERN.finditer(text):
+        take("linkedin_url", _url(match.group(0)), match.group(0))
+    for match in _GITHUB_PATTERN.finditer(text):
+        take("github_url", _url(match.group(0)), match.group(0))
+    for match in _URL_PATTERN.finditer(text):
+        url = match.group(0).rstrip(".")
+        if "linkedin.com" in url.lower() or "github.com" in url.lower():
+            continue
+        take("portfolio_url", _url(url), url)
+    phone = _find_phone(text)
+    take("phone", phone, phone)
+    return fields, matched
+
+def _list_items(lines: List[str]) -> List[str]:
+    """The items of a list section: bullets (with their continuation lines), or else one per line."""
+    lines = [line.strip() for line in lines if line.strip()]
+    if not any(_BULLET_PATTERN.match(line) for line in lines):
+        return lines
+    items: List[str] = []
+    for line in lines:
+        bullet = _BULLET_PATTERN.match(line)
+        if bullet or not items:
+            items.append(line[bullet.end():] if bullet else line)
+        else:
+            items[-1] += " " + line
+    return items
+
+def _is_contact_line(line: str, matched: List[str]) -> bool:
+    remainder = line
+    found = False
+    for value in matched:
+        if value in remainder:
+            remainder = remainder.replace(value, " ")
+            found = True
+    return found and bool(_CONTACT_LINE_RESIDUE.match(remainder))
+
+def excerpt(raw_text: str, field_names: List[str]) -> str:
+    """
+    The parts of `raw_text` the given fields are read from: the header plus their sections, in document
+    order. The whole text if a field's section can't be found (other than a contact field's).
+    """
+    blocks = _split_sections(raw_text.splitlines())
+    present = {section for section, _ in blocks[1:]}
+    wanted = set()
+    for field_name in field_names:
+        found = present.intersection(FIELD_SECTIONS.get(field_name, ()))
+        if not found and field_name not in _CONTACT_FIELDS:
+            return raw_text
+        wanted |= found
+    lines = blocks[0][1] + [line for section, block in blocks[1:] if section in wanted for line in block]
+    return "\n".join(lines).strip() or raw_text
+
+def pre_extract(raw_text: str) -> PreExtraction:
+    """Finds sections and contact fields in `raw_text` and builds the shorter text for the LLM."""
+    lines = raw_text.splitlines()
+    blocks = _split_sections(lines)
+    if len(blocks) == 1:
+        contact_lines = lines[:_HEADERLESS_CONTACT_LINES]
+    else:
+        contact_lines = blocks[0][1] + [line for section, block in blocks[1:] if section == SECTION_CONTACT for line in block[1:]]
+    fields, matched = _contact_fields("\n".join(contact_lines))
+
+    kept: List[str] = []
+    contact_line_ids = {id(line) for line in contact_lines}
+    for section, block in blocks:
+        if section in _OMITTED_SECTIONS:
+            continue
+        if section in _LIST_SECTION_FIELDS:
+            items = _list_items(block[1:])
+            field_name = _LIST_SECTION_FIELDS[section]
+            if items and _is_valid(field_name, fields.get(field_name, []) + items):
+                fields[field_name] = fields.get(field_name, []) + items
+                continue
+        block_lines = [line for line in block if not (id(line) in contact_line_ids and _is_contact_line(line, matched))]
+        if section == SECTION_CONTACT and not any(line.strip() for line in block_lines[1:]):
+            continue # Only the heading is left
+        kept.extend(block_lines)
+    sections = tuple(section for section, _ in blocks[1:])
+    if SECTION_REFERENCES in sections:
+        fields["references_available"] = True
+
+    llm_text = "\n".join(kept).strip()
+    if not llm_text:
+        llm_text = raw_text # Nothing but contact details; let the LLM see all of it
+    logger.info(f"Pre-extraction found {sorted(fields)} and sections {list(sections)}; LLM text {len(llm_text)} of {len(raw_text)} chars.")
+    return PreExtraction(fields, sections, llm_text)
@@ -0,0 +1,233 @@
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import re
+import threading
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Process-wide limiter for LLM calls.
+# Every call, from any thread or coroutine, takes a request token, an estimated number of
+# LLM tokens and a concurrency slot before it is sent. The budgets are token buckets refilled
+# at LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE, scaled by an AIMD rate factor: a throttling
+# response halves the factor and pauses all callers until the server's retry hint has passed;
+# each success raises it again by LLM_RATE_LIMIT_RECOVERY_STEP.
+
+_BURST_SECONDS = 10.0 # Bucket capacity, in seconds of budget
+_POLL_SECONDS = 0.05 # Wait between checks when only a concurrency slot is missing
+_CHARS_PER_TOKEN = 4 # Rough token estimate for budgeting
+
+_THROTTLE_STATUS_CODES = {429}
+_TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+_TRANSIENT_EXCEPTION_TYPES = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+_RETRY_HINT_PATTERNS = (
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+    re.compile(r"'retryDelay':\s*'([\d.]+)s'"),
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+)
+
+def _exception_chain(exc: BaseException):
+    # LangChain wraps the SDK errors, so the status code is often on a cause
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for candidate in (getattr(exc, "code", None), getattr(exc, "status_code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+def is_throttling_error(exc: BaseException) -> bool:
+    """True for quota / rate limit responses (HTTP 429, RESOURCE_EXHAUSTED)."""
+    for error in _exception_chain(exc):
+        if isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+            return True
+        if _status_code(error) in _THROTTLE_STATUS_CODES or "RESOURCE_EXHAUSTED" in str(error):
+            return True
+    return False
+
+def is_transient_error(exc: BaseException) -> bool:
+    """True for errors worth retrying: throttling, server errors, timeouts and connection failures."""
+    for error in _exception_chain(exc):
+        if isinstance(error, _TRANSIENT_EXCEPTION_TYPES) or _status_code(error) in _TRANSIENT_STATUS_CODES:
+            return True
+    return is_throttling_error(exc)
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """The server's retry hint (Retry-After header or RetryInfo), if the error carries one."""
+    for error in _exception_chain(exc):
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers is not None:
+            try:
+                return float(headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        text = str(error)
+        for pattern in _RETRY_HINT_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return float(match.group(1))
+    return None
+
+def estimate_tokens(params: Dict[str, Any]) -> int:
+    return sum(len(value) for value in params.values() if isinstance(value, str)) // _CHARS_PER_TOKEN + 1
+
+class _TokenBucket:
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute * _BURST_SECONDS / 60.0)
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float, rate_factor: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.per_minute / 60.0 * rate_factor)
+        self.updated_at = now
+
+    def seconds_until(self, amount: float, rate_factor: float) -> float:
+        missing = min(amount, self.capacity) - self.available
+        if missing <= 0:
+            return 0.0
+        return missing / (self.per_minute / 60.0 * rate_factor)
+
+class AdaptiveRateLimiter:
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_concurrency: int,
+                 min_rate_factor: float, recovery_step: float):
+        self._lock = threading.Lock()
+        self._requests = _TokenBucket(requests_per_minute)
+        self._tokens = _TokenBucket(tokens_per_minute)
+        self._max_concurrency = max_concurrency
+        self._min_rate_factor = min_rate_factor
+        self._recovery_step = recovery_step
+        self._rate_factor = 1.0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._stats = {"acquired": 0, "throttled": 0, "waits": 0, "wait_seconds": 0.0}
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Takes the budget for one call and returns 0, or returns how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._requests.refill(now, self._rate_factor)
+            self._tokens.refill(now, self._rate_factor)
+            wait = max(self._requests.seconds_until(1, self._rate_factor), self._tokens.seconds_until(tokens, self._rate_factor))
+            if wait > 0:
+                return wait
+            if self._in_flight >= self._max_concurrency:
+                return _POLL_SECONDS
+            self._requests.available -= 1
+            self._tokens.available -= min(tokens, self._tokens.capacity)
+            self._in_flight += 1
+            self._stats["acquired"] += 1
+            return 0.0
+
+    def _record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._stats["waits"] += 1
+            self._stats["wait_seconds"] += seconds
+
+    def _release(self, error: Optional[BaseException]) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if error is None:
+                # Additive increase
+                self._rate_factor = min(1.0, self._rate_factor + self._recovery_step)
+                return
+            if not is_throttling_error(error):
+                return
+            # Multiplicative decrease, and a shared pause so waiting callers don't retry in a herd
+            self._stats["throttled"] += 1
+            self._rate_factor = max(self._min_rate_factor, self._rate_factor / 2)
+            pause = retry_after_seconds(error)
+            if pause is None:
+                pause = 60.0 / max(self._requests.per_minute * self._rate_factor, 1e-6)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            # Drop the burst allowance so traffic resumes at the reduced rate
+            self._requests.available = min(self._requests.available, 0.0)
+            logger.warning(f"LLM call throttled; rate factor now {self._rate_factor:.2f}, pausing LLM calls for {pause:.1f}s.")
+
+    @contextmanager
+    def slot(self, tokens: int):
+        """Blocks the calling thread until the call fits the budget, then holds a concurrency slot."""
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            self._record_wait(waited)
+        try:
+            yield
+        except BaseException as e:
+            self._release(e)
+            raise
+        self._release(None)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int):
+        """Async variant of slot(): waits with asyncio.sleep."""
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+        if waited:
+            self._record_wait(waited)
+        try:
+            yield
+        except BaseException as e:
+            self._release(e)
+            raise
+        self._release(None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": self._in_flight,
+                "rate_factor": round(self._rate_factor, 3),
+                "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 3),
+                "requests_per_minute": self._requests.per_minute,
+                "tokens_per_minute": self._tokens.per_minute,
+                "max_concurrency": self._max_concurrency,
+            }
+
+def build_limiter(budget_share: float = 1.0) -> AdaptiveRateLimiter:
+    """
+    A limiter with `budget_share` of the configured request and token budgets, for processes
+    (like the backfill CLI) that share the LLM quota with the API server.
+    """
+    return AdaptiveRateLimiter(
+        requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE * budget_share,
+        tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE * budget_share,
+        max_concurrency=max(1, round(settings.LLM_MAX_CONCURRENCY * budget_share)),
+        min_rate_factor=settings.LLM_RATE_LIMIT_MIN_FACTOR,
+        recovery_step=settings.LLM_RATE_LIMIT_RECOVERY_STEP,
+    )
+
+limiter = build_limiter()
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from app.api.v1 import schemas
+from app.core.config import settings
+from app.crud import crud_resume
+from app.services import resume_pipeline, vector_index
+from app.utils import file_helpers
+
+logger = logging.getLogger(__name__)
+
+# Batch processing for POST /resumes/batch.
+# Parsing and the LLM stages run for all files with bounded concurrency and no DB session
+# involvement; the resulting rows are then written with a single bulk insert.
+
+BATCH_STATUS_PROCESSED = "processed"
+BATCH_STATUS_DUPLICATE = "duplicate"
+BATCH_STATUS_FAILED = "failed"
+
+def _prepare_item(item: file_helpers.IngestedUpload) -> Union[Dict[str, Any], resume_pipeline.PipelineError]:
+    """
+    Text extraction, LLM stages and validation for one file. Returns the column values
+    for its Resume row, or the PipelineError that stopped it.
+    """
+    timings = resume_pipeline.StageTimings()
+    try:
+        with timings.stage(resume_pipeline.STAGE_EXTRACTING_TEXT):
+            raw_text = resume_pipeline.extract_text(item.buffer, item.file_name, timings)
+        extracted_data_dict, llm_analysis_dict = resume_pipeline.run_llm_stages(raw_text, f"batch file {item.file_name}", timings=timings)
+        try:
+            resume_update_data = resume_pipeline.build_resume_update(item.file_name, raw_text, extracted_data_dict, llm_analysis_dict)
+        except Exception as e:
+            raise resume_pipeline.PipelineError(500, f"Error preparing data for database update: {str(e)}", resume_pipeline.STAGE_SAVING)
+        return {
+            **crud_resume.resume_update_to_columns(resume_update_data),
+            **resume_pipeline.result_versions(raw_text),
+            "stage_timings": dict(timings.seconds),
+        }
+    except resume_pipeline.PipelineError as e:
+        return e
+    except Exception as e:
+        logger.error(f"Unexpected error processing batch file {item.file_name}: {e}", exc_info=True)
+        return resume_pipeline.PipelineError(500, str(e), resume_pipeline.STAGE_EXTRACTING_TEXT)
+
+def process_batch(session_factory: resume_pipeline.SessionFactory, items: List[file_helpers.IngestedUpload], on_duplicate: str) -> List[schemas.BatchItemResult]:
+    """
+    Processes a batch of ingested uploads and returns one result per item, in order.
+    Files already processed (by content hash) follow `on_duplicate`; identical files within
+    the batch are only sent to the LLM once. The duplicate lookup and the bulk insert each use
+    a short session from `session_factory`; none is open while files are parsed and analyzed.
+    """
+    results: List[Optional[schemas.BatchItemResult]] = [None] * len(items)
+
+    # 1. Files whose content is already stored
+    known_resumes = {}
+    if on_duplicate != resume_pipeline.DUPLICATE_REPROCESS:
+        with session_factory() as db:
+            try:
+                known_resumes = crud_resume.get_processed_resumes_by_hashes(db, [item.content_hash for item in items])
+            except Exception as e:
+                logger.error(f"Error looking up duplicate batch uploads: {e}", exc_info=True)
+                db.rollback()
+
+    # 2. Parse and run the LLM stages once per new content hash, with bounded concurrency
+    pending = {}
+    for item in items:
+        if item.content_hash not in known_resumes and item.content_hash not in pending:
+            pending[item.content_hash] = item
+    logger.info(f"Batch of {len(items)} files: {len(pending)} to process, {len(items) - len(pending)} duplicates")
+    prepared: Dict[str, Union[Dict[str, Any], resume_pipeline.PipelineError]] = {}
+    if pending:
+        with ThreadPoolExecutor(max_workers=settings.BATCH_CONCURRENCY, thread_name_prefix="resume-batch") as executor:
+            futures = {content_hash: executor.submit(_prepare_item, item) for content_hash, item in pending.items()}
+            for content_hash, future in futures.items():
+                prepared[content_hash] = future.result()
+
+    # 3. Build all rows and insert them in one transaction
+    rows: List[Dict[str, Any]] = []
+    row_slots: List[int] = []
+    for index, item in enumerate(items):
+        known_resume = known_resumes.get(item.content_hash)
+        if known_resume is not None:
+            if on_duplicate == resume_pipeline.DUPLICATE_EXISTING:
+                results[index] = schemas.BatchItemResult(file_name=item.file_name, status=BATCH_STATUS_DUPLICATE, resume_id=known_resume.id, duplicate_of=known_resume.id)
+                continue
+            columns = crud_resume.resume_content_columns(known_resume)
+        else:
+            outcome = prepared[item.content_hash]
+            if isinstance(outcome, resume_pipeline.PipelineError):
+                results[index] = schemas.BatchItemResult(file_name=item.file_name, status=BATCH_STATUS_FAILED, error=outcome.detail)
+                continue
+            columns = dict(outcome)
+        columns.update(file_name=item.file_name, content_hash=item.content_hash)
+        rows.append(columns)
+        row_slots.append(index)
+
+    if rows:
+        try:
+            with session_factory() as db:
+                new_ids = crud_resume.create_resumes_bulk(db, rows)
+        except Exception as e:
+            logger.error(f"Bulk insert of {len(rows)} batch resumes failed: {e}", exc_info=True)
+            for index in row_slots:
+                results[index] = schemas.BatchItemResult(file_name=items[index].file_name, status=BATCH_STATUS_FAILED, error="Database error: Could not store resume.")
+        else:
+            vector_index.index_resumes((new_id, row) for new_id, row in zip(new_ids, rows))
+            for index, new_id in zip(row_slots, new_ids):
+                known_resume = known_resumes.get(items[index].content_hash)
+                results[index] = schemas.BatchItemResult(
+                    file_name=items[index].file_name,
+                    status=BATCH_STATUS_DUPLICATE if known_resume is not None else BATCH_STATUS_PROCESSED,
+                    resume_id=new_id,
+                    duplicate_of=known_resume.id if known_resume is not None else None,
+                )
+    return results
@@ -0,0 +1,160 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union, get_args, get_origin
+import csv
+import io
+import json
+import logging
+
+from app.api.v1 import schemas
+from app.core.config import settings
+from app.crud import crud_resume
+from app.db import database, models
+
+logger = logging.getLogger(__name__)
+
+# Streaming export of resumes (GET /resumes/export) as NDJSON or CSV.
+# Rows come from a server-side cursor and are written into fixed-size text chunks, so memory
+# use doesn't depend on the number of rows exported.
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+MEDIA_TYPES = {FORMAT_NDJSON: "application/x-ndjson", FORMAT_CSV: "text/csv"}
+
+# The fields of GET /resumes/{id} (schemas.ResumeDetail), without its processing diagnostics.
+# Pipeline checkpoints, result versions and content hashes are never exported.
+_EXCLUDED_COLUMNS = {"raw_text"} # Exported only on request: it dominates the size of a row
+_INTERNAL_COLUMNS = {"stage_timings", "processing_error"}
+_LIST_SEPARATOR = "; "
+
+def export_columns(include_raw_text: bool = False) -> List[str]:
+    fields = schemas.ResumeDetail.model_fields
+    return [
+        column.name for column in models.Resume.__table__.columns
+        if column.name in fields and column.name not in _INTERNAL_COLUMNS
+        and (include_raw_text or column.name not in _EXCLUDED_COLUMNS)
+    ]
+
+def _model_type(annotation: Any) -> Optional[Type[BaseModel]]:
+    # The pydantic model behind Optional[Model], if any
+    if get_origin(annotation) is Union:
+        annotation = next((arg for arg in get_args(annotation) if arg is not type(None)), None)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+def _nested_paths(model: Type[BaseModel], prefix: Tuple[str, ...]) -> List[Tuple[str, ...]]:
+    paths = []
+    for name, field in model.model_fields.items():
+        nested = _model_type(field.annotation)
+        paths.extend(_nested_paths(nested, prefix + (name,)) if nested else [prefix + (name,)])
+    return paths
+
+# JSON columns whose nested objects become one CSV column per field (e.g. llm_analysis.resume_rating.overall_score)
+_CSV_EXPANDED_COLUMNS = {"llm_analysis": schemas.LLMAnalysis}
+
+def csv_header(columns: Iterable[str]) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    The CSV columns as (header, path into the row) pairs.
+    """
+    header = []
+    for column in columns:
+        model = _CSV_EXPANDED_COLUMNS.get(column)
+        paths = _nested_paths(model, (column,)) if model else [(column,)]
+        header.extend((".".join(path), path) for path in paths)
+    return header
+
+def _csv_cell(value: Any) -> Any:
+    # Lists of plain values are joined; lists of objects (work experience, projects, ...) stay JSON
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list) and all(isinstance(item, (str, int, float, bool)) for item in value):
+        return _LIST_SEPARATOR.join(str(item) for item in value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return value
+
+def _lookup(row: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    value: Any = row
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _chunked(lines: Iterable[str]) -> Iterator[str]:
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= settings.EXPORT_CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+def ndjson_lines(rows: Iterable[Any]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(row._mapping), default=_json_default, ensure_ascii=False) + "\n"
+
+def csv_lines(rows: Iterable[Any], columns: List[str]) -> Iterator[str]:
+    header = csv_header(columns)
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def line(values: List[Any]) -> str:
+        output.seek(0)
+        output.truncate()
+        writer.writerow(values)
+        return output.getvalue()
+
+    yield line([name for name, _ in header])
+    for row in rows:
+        values = dict(row._mapping)
+        yield line([_csv_cell(_lookup(values, path)) for _, path in header])
+
+def stream_export(
+    format: str,
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+    processed_only: bool = True,
+    include_raw_text: bool = False,
+) -> Iterator[str]:
+    """
+    Yields the export as text chunks. Uses its own session, which stays open while the response
+    streams and is closed when the generator finishes or the client disconnects.
+    """
+    columns = export_columns(include_raw_text)
+    db = database.SessionLocal()
+    exported = 0
+    try:
+        rows = crud_resume.iter_resume_rows(
+            db, columns, uploaded_after=uploaded_after, uploaded_before=uploaded_before,
+            processed_only=processed_only, batch_size=settings.EXPORT_BATCH_SIZE,
+        )
+
+        def counted(rows: Iterable[Any]) -> Iterator[Any]:
+            nonlocal exported
+            for row in rows:
+                exported += 1
+                yield row
+
+        lines = csv_lines(counted(rows), columns) if format == FORMAT_CSV else ndjson_lines(counted(rows))
+        yield from _chunked(lines)
+        logger.info(f"Exported {exported} resumes as {format}.")
+    except GeneratorExit:
+        logger.warning(f"Resume export ({format}) cancelled by the client after {exported} rows.")
+        raise
+    except Exception as e:
+        # The status line has already been sent; the truncated body is all the client will see
+        logger.error(f"Resume export ({format}) failed after {exported} rows: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,629 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, IO, List, NamedTuple, Optional, Tuple, Union
+import asyncio
+import logging
+import time
+
+from app.api.v1 import schemas
+from app.core.config import settings
+from app.crud import crud_resume, crud_resume_async
+from app.db import models
+from app.services import llm_service, pre_extractor, vector_index
+from app.utils import file_helpers, metrics, parse_sandbox, pdf_text
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages, in the order they run. These are also the values reported
+# for background upload jobs (see app/services/upload_jobs.py).
+STAGE_QUEUED = "queued"
+STAGE_EXTRACTING_TEXT = "extracting_text"
+STAGE_PRE_EXTRACTING = "pre_extracting" # Local section and contact detection; timed, but not reported as a job stage
+STAGE_LLM_EXTRACTION = "llm_extraction"
+STAGE_LLM_ANALYSIS = "llm_analysis"
+STAGE_LLM_COMBINED = "llm_extract_analyze" # Replaces the two stages above in combined LLM mode
+STAGE_SAVING = "saving"
+STAGE_EMBEDDING = "embedding" # Adding the stored resume to the local vector index
+STAGE_COMPLETED = "completed"
+STAGE_FAILED = "failed"
+
+TERMINAL_STAGES = (STAGE_COMPLETED, STAGE_FAILED)
+
+# How to handle an upload whose content hash matches an already processed resume
+DUPLICATE_REUSE = "reuse" # Create a new entry for this upload, copying the stored extraction and analysis
+DUPLICATE_EXISTING = "existing" # Return the stored entry as-is; nothing new is written
+DUPLICATE_REPROCESS = "reprocess" # Ignore the match and run the full pipeline
+DUPLICATE_MODES = (DUPLICATE_REUSE, DUPLICATE_EXISTING, DUPLICATE_REPROCESS)
+
+StageCallback = Callable[[str], None]
+# Opens a new session; used as a context manager for each database step of the pipeline
+SessionFactory = Callable[[], Session]
+
+class PipelineResult(NamedTuple):
+    resume: models.Resume
+    duplicate_of: Optional[int] = None # ID of the stored resume whose results were reused, if any
+
+class PipelineError(Exception):
+    """
+    Raised when a pipeline stage fails. Carries the HTTP status code and detail
+    that the synchronous endpoint should return, and the stage that failed.
+    """
+    def __init__(self, status_code: int, detail: str, stage: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.stage = stage
+
+# Further steps that are timed (see StageTimings) but not reported as job stages
+STAGE_INGESTING = "ingesting" # Reading the upload, in the endpoints
+STAGE_CREATING_ENTRY = "creating_entry" # Inserting the initial resume row
+
+# Per-page PDF extraction times, summarized with the stage timings of a resume
+TIMING_PDF_PAGE_MAX = "pdf_page_max" # Slowest page
+TIMING_PDF_PAGE_MEAN = "pdf_page_mean"
+
+class StageTimings:
+    """
+    Durations of the pipeline stages of one resume, in seconds. Every timed stage is also observed
+    in the stage latency histogram served at /metrics; the durations of the stages before the final
+    update are stored on the resume (stage_timings), with the slowest and mean PDF page times.
+    """
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "success"
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self.seconds[name] = round(self.seconds.get(name, 0.0) + elapsed, 4)
+            metrics.PIPELINE_STAGE_SECONDS.observe(elapsed, stage=name, outcome=outcome)
+
+    def record_pages(self, page_seconds: List[float]) -> None:
+        if page_seconds:
+            self.seconds[TIMING_PDF_PAGE_MAX] = round(max(page_seconds), 4)
+            self.seconds[TIMING_PDF_PAGE_MEAN] = round(sum(page_seconds) / len(page_seconds), 4)
+
+def _notify(on_stage: Optional[StageCallback], stage: str) -> None:
+    if on_stage is None:
+        return
+    try:
+        on_stage(stage)
+    except Exception as e:
+        # Progress reporting must never break the pipeline itself
+        logger.error(f"Error reporting pipeline stage '{stage}': {e}")
+
+def _index_resume(db_resume: models.Resume) -> None:
+    vector_index.index_resume(db_resume.id, vector_index.embedded_columns(db_resume))
+
+def extract_text(source: Union[str, IO[bytes]], file_name: str, timings: Optional[StageTimings] = None) -> str:
+    """
+    Extracts text from a saved upload path or an upload stream. Raises PipelineError if nothing could be extracted.
+    The PDF page times are added to `timings`.
+    """
+    try:
+        with pdf_text.collect_page_timings() as page_seconds:
+            raw_text = file_helpers.get_text(source, file_name)
+        if timings is not None:
+            timings.record_pages(page_seconds)
+    except parse_sandbox.DocumentParseBusy as e:
+        logger.error(f"No parse worker available for {file_name}: {e}")
+        raise PipelineError(503, str(e), STAGE_EXTRACTING_TEXT)
+    except parse_sandbox.DocumentParseError as e:
+        logger.error(f"Parsing {file_name} hit a sandbox limit: {e}")
+        raise PipelineError(422, f"Could not parse file: {str(e)}", STAGE_EXTRACTING_TEXT)
+    except Exception as e:
+        logger.error(f"Error during file processing for {file_name}: {e}", exc_info=True)
+        raise PipelineError(500, f"Error processing file: {str(e)}", STAGE_EXTRACTING_TEXT)
+    if not raw_text:
+        logger.warning(f"Could not extract text from file: {file_name}")
+        raise PipelineError(400, f"Could not extract text from file: {file_name}. Ensure it's a supported format (PDF, DOCX, TXT) and not empty/corrupted.", STAGE_EXTRACTING_TEXT)
+    logger.info(f"Text extracted successfully from {file_name} (length: {len(raw_text)} chars)")
+    return raw_text
+
+def build_resume_update(file_name: str, raw_text: str, extracted_data_dict: Dict[str, Any], llm_analysis_dict: Dict[str, Any]) -> schemas.ResumeUpdate:
+    """
+    Validates the LLM outputs against the Pydantic schemas and combines them into a ResumeUpdate.
+    """
+    llm_analysis_pydantic = schemas.LLMAnalysis(**llm_analysis_dict)
+
+    valid_resume_fields = schemas.ResumeUpdate.model_fields.keys()
+    filtered_extracted_data = {k: v for k, v in extracted_data_dict.items() if k in valid_resume_fields and k not in ("file_name", "raw_text", "llm_analysis")}
+
+    return schemas.ResumeUpdate(
+        file_name=file_name,
+        raw_text=raw_text,
+        llm_analysis=llm_analysis_pydantic,
+        **filtered_extracted_data
+    )
+
+def _llm_call_error(e: Exception, stage: str, label: str, resume_ref: str) -> PipelineError:
+    logger.error(f"Exception during {label} for {resume_ref}: {e}", exc_info=True)
+    return PipelineError(500, f"{label} process encountered an error: {str(e)}", stage)
+
+def _check_llm_result(result: Dict[str, Any], stage: str, label: str, resume_ref: str) -> Dict[str, Any]:
+    if "error" in result:
+        details = result.get('details', result['error'])
+        logger.error(f"{label} failed for {resume_ref}: {details}")
+        raise PipelineError(500, f"{label} failed: {details}", stage)
+    logger.info(f"{label} successful for {resume_ref}")
+    return result
+
+def _pre_extract(raw_text: str, timings: StageTimings) -> pre_extractor.PreExtraction:
+    if not settings.LLM_PRE_EXTRACTION_ENABLED:
+        return pre_extractor.passthrough(raw_text)
+    with timings.stage(STAGE_PRE_EXTRACTING):
+        return pre_extractor.pre_extract(raw_text)
+
+def _run_extraction(raw_text: str, resume_ref: str) -> Dict[str, Any]:
+    logger.info(f"Sending text to LLM for extraction ({resume_ref})")
+    try:
+        extracted_data_dict = llm_service.extract_resume_data_from_text(raw_text)
+    except Exception as e:
+        raise _llm_call_error(e, STAGE_LLM_EXTRACTION, "LLM data extraction", resume_ref)
+    return _check_llm_result(extracted_data_dict, STAGE_LLM_EXTRACTION, "LLM data extraction", resume_ref)
+
+def _run_analysis(extracted_data_dict: Dict[str, Any], raw_text: str, resume_ref: str) -> Dict[str, Any]:
+    logger.info(f"Sending extracted data to LLM for analysis ({resume_ref})")
+    try:
+        llm_analysis_dict = llm_service.analyze_resume_content(extracted_data_dict, raw_resume_text=raw_text)
+    except Exception as e:
+        raise _llm_call_error(e, STAGE_LLM_ANALYSIS, "LLM analysis", resume_ref)
+    return _check_llm_result(llm_analysis_dict, STAGE_LLM_ANALYSIS, "LLM analysis", resume_ref)
+
+def _run_combined(raw_text: str, resume_ref: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    logger.info(f"Sending text to LLM for combined extraction and analysis ({resume_ref})")
+    try:
+        combined_dict = llm_service.extract_and_analyze_resume(raw_text)
+    except Exception as e:
+        raise _llm_call_error(e, STAGE_LLM_COMBINED, "LLM extraction and analysis", resume_ref)
+    combined_dict = _check_llm_result(combined_dict, STAGE_LLM_COMBINED, "LLM extraction and analysis", resume_ref)
+    return combined_dict["extracted_data"], combined_dict["analysis"]
+
+def run_llm_stages(
+    raw_text: str,
+    resume_ref: str,
+    on_stage: Optional[StageCallback] = None,
+    extracted_data_dict: Optional[Dict[str, Any]] = None,
+    on_extracted: Optional[Callable[[Dict[str, Any]], None]] = None,
+    timings: Optional[StageTimings] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Runs the LLM stages in the mode selected by LLM_PIPELINE_MODE.
+    `resume_ref` identifies the resume in log messages. With `extracted_data_dict` (a stored
+    extraction) only the analysis runs; `on_extracted` is called with a new extraction before
+    the analysis starts, so it can be checkpointed. Stage durations are added to `timings`.
+    With pre-extraction (LLM_PRE_EXTRACTION_ENABLED) the extraction call gets the text left after it,
+    and the fields found locally fill the ones the LLM left empty. The analysis judges the whole
+    resume, so it always gets the full text, and so does the combined call, which includes it.
+    Returns (extracted_data_dict, llm_analysis_dict).
+    """
+    timings = timings or StageTimings()
+    if extracted_data_dict is not None:
+        _notify(on_stage, STAGE_LLM_ANALYSIS)
+        with timings.stage(STAGE_LLM_ANALYSIS):
+            return extracted_data_dict, _run_analysis(extracted_data_dict, raw_text, resume_ref)
+
+    pre_extraction = _pre_extract(raw_text, timings)
+    mode = llm_service.select_pipeline_mode(raw_text)
+    logger.info(f"Using '{mode}' LLM pipeline mode ({resume_ref})")
+    if mode == llm_service.PIPELINE_MODE_COMBINED:
+        _notify(on_stage, STAGE_LLM_COMBINED)
+        with timings.stage(STAGE_LLM_COMBINED):
+            extracted_data_dict, llm_analysis_dict = _run_combined(raw_text, resume_ref)
+        return pre_extraction.apply(extracted_data_dict), llm_analysis_dict
+
+    _notify(on_stage, STAGE_LLM_EXTRACTION)
+    with timings.stage(STAGE_LLM_EXTRACTION):
+        extracted_data_dict = pre_extraction.apply(_run_extraction(pre_extraction.llm_text, resume_ref))
+    if on_extracted is not None:
+        on_extracted(extracted_data_dict)
+    _notify(on_stage, STAGE_LLM_ANALYSIS)
+    with timings.stage(STAGE_LLM_ANALYSIS):
+        llm_analysis_dict = _run_analysis(extracted_data_dict, raw_text, resume_ref)
+    return extracted_data_dict, llm_analysis_dict
+
+async def _arun_analysis(extracted_data_dict: Dict[str, Any], raw_text: str, resume_ref: str) -> Dict[str, Any]:
+    logger.info(f"Sending extracted data to LLM for analysis ({resume_ref})")
+    try:
+        llm_analysis_dict = await llm_service.aanalyze_resume_content(extracted_data_dict, raw_resume_text=raw_text)
+    except Exception as e:
+        raise _llm_call_error(e, STAGE_LLM_ANALYSIS, "LLM analysis", resume_ref)
+    return _check_llm_result(llm_analysis_dict, STAGE_LLM_ANALYSIS, "LLM analysis", resume_ref)
+
+async def arun_llm_stages(
+    raw_text: str,
+    resume_ref: str,
+    extracted_data_dict: Optional[Dict[str, Any]] = None,
+    on_extracted: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    timings: Optional[StageTimings] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Async variant of run_llm_stages: the LLM calls are awaited instead of blocking a thread.
+    """
+    timings = timings or StageTimings()
+    if extracted_data_dict is not None:
+        with timings.stage(STAGE_LLM_ANALYSIS):
+            return extracted_data_dict, await _arun_analysis(extracted_data_dict, raw_text, resume_ref)
+
+    pre_extraction = _pre_extract(raw_text, timings)
+    mode = llm_service.select_pipeline_mode(raw_text)
+    logger.info(f"Using '{mode}' LLM pipeline mode ({resume_ref})")
+    if mode == llm_service.PIPELINE_MODE_COMBINED:
+        logger.info(f"Sending text to LLM for combined extraction and analysis ({resume_ref})")
+        with timings.stage(STAGE_LLM_COMBINED):
+            try:
+                combined_dict = await llm_service.aextract_and_analyze_resume(raw_text)
+            except Exception as e:
+                raise _llm_call_error(e, STAGE_LLM_COMBINED, "LLM extraction and analysis", resume_ref)
+            combined_dict = _check_llm_result(combined_dict, STAGE_LLM_COMBINED, "LLM extraction and analysis", resume_ref)
+        return pre_extraction.apply(combined_dict["extracted_data"]), combined_dict["analysis"]
+
+    logger.info(f"Sending text to LLM for extraction ({resume_ref})")
+    with timings.stage(STAGE_LLM_EXTRACTION):
+        try:
+            extracted_data_dict = await llm_service.aextract_resume_data_from_text(pre_extraction.llm_text)
+        except Exception as e:
+            raise _llm_call_error(e, STAGE_LLM_EXTRACTION, "LLM data extraction", resume_ref)
+        extracted_data_dict = pre_extraction.apply(_check_llm_result(extracted_data_dict, STAGE_LLM_EXTRACTION, "LLM data extraction", resume_ref))
+    if on_extracted is not None:
+        await on_extracted(extracted_data_dict)
+    with timings.stage(STAGE_LLM_ANALYSIS):
+        return extracted_data_dict, await _arun_analysis(extracted_data_dict, raw_text, resume_ref)
+
+def result_versions(raw_text: str, reused_extraction: bool = False) -> Dict[str, Any]:
+    """
+    The extraction_version / analysis_version columns for results run_llm_stages produced for
+    `raw_text` (the pipeline mode is deterministic per text). A reused extraction keeps its stored version.
+    """
+    if reused_extraction:
+        return {"analysis_version": llm_service.ANALYSIS_RESULT_VERSION}
+    if llm_service.select_pipeline_mode(raw_text) == llm_service.PIPELINE_MODE_COMBINED:
+        return {"extraction_version": llm_service.COMBINED_RESULT_VERSION, "analysis_version": llm_service.COMBINED_RESULT_VERSION}
+    return {"extraction_version": llm_service.EXTRACTION_RESULT_VERSION, "analysis_version": llm_service.ANALYSIS_RESULT_VERSION}
+
+def resolve_duplicate(db: Session, file_name: str, content_hash: Optional[str], on_duplicate: str) -> Optional[PipelineResult]:
+    """
+    Short-circuits the pipeline when a file with the same content hash has already been processed.
+    Returns None if there is no usable match (or duplicates should be reprocessed).
+    """
+    if not content_hash or on_duplicate == DUPLICATE_REPROCESS:
+        return None
+    try:
+        existing_resume = crud_resume.get_processed_resume_by_hash(db, content_hash)
+        if existing_resume is None:
+            return None
+        if on_duplicate == DUPLICATE_EXISTING:
+            logger.info(f"Upload {file_name} matches resume ID {existing_resume.id}, returning the stored entry.")
+            return PipelineResult(resume=existing_resume, duplicate_of=existing_resume.id)
+        copied_resume = crud_resume.copy_resume_entry(db, existing_resume, file_name=file_name, content_hash=content_hash)
+        _index_resume(copied_resume)
+        logger.info(f"Upload {file_name} matches resume ID {existing_resume.id}, reused its results as resume ID {copied_resume.id}.")
+        return PipelineResult(resume=copied_resume, duplicate_of=existing_resume.id)
+    except Exception as e:
+        # Deduplication is an optimization only; fall back to the full pipeline
+        logger.error(f"Error checking for duplicate upload of {file_name}: {e}", exc_info=True)
+        db.rollback()
+        return None
+
+def _completed_columns(extracted_data_dict: Dict[str, Any], versions: Dict[str, Any], timings: StageTimings) -> Dict[str, Any]:
+    # Written together with the final update
+    return {
+        **versions,
+        "stage_timings": dict(timings.seconds),
+        "extracted_data": extracted_data_dict,
+        "processing_status": models.PROCESSING_STATUS_COMPLETED,
+        "failed_stage": None,
+        "processing_error": None,
+    }
+
+def _failed_columns(error: PipelineError, timings: StageTimings) -> Dict[str, Any]:
+    return {
+        "processing_status": models.PROCESSING_STATUS_FAILED, "failed_stage": error.stage, "processing_error": error.detail,
+        "stage_timings": dict(timings.seconds),
+    }
+
+def _save_checkpoint(session_factory: SessionFactory, resume_id: int, **values) -> None:
+    # Checkpoints only save work on retries, so failing to write one doesn't fail the pipeline
+    try:
+        with session_factory() as db:
+            crud_resume.update_processing_state(db, resume_id, **values)
+    except Exception as e:
+        logger.error(f"Error saving processing state of resume ID {resume_id}: {e}", exc_info=True)
+
+def complete_resume(
+    session_factory: SessionFactory,
+    resume_id: int,
+    file_name: str,
+    raw_text: str,
+    extracted_data_dict: Optional[Dict[str, Any]] = None,
+    on_stage: Optional[StageCallback] = None,
+    timings: Optional[StageTimings] = None,
+) -> models.Resume:
+    """
+    Runs the stages after text extraction for a stored resume: LLM extraction (skipped when
+    `extracted_data_dict` is given), analysis, the final update and indexing. A new extraction
+    is saved on the resume before the analysis runs, and a failure is recorded with its stage,
+    so POST /resumes/{id}/reprocess can pick up where processing stopped. The final update (or
+    the failure) also stores the durations in `timings` of the stages that ran before it.
+    Raises PipelineError on failure.
+    """
+    timings = timings or StageTimings()
+    versions = result_versions(raw_text, reused_extraction=extracted_data_dict is not None)
+    try:
+        extracted_data_dict, llm_analysis_dict = run_llm_stages(
+            raw_text, f"resume ID {resume_id}", on_stage,
+            extracted_data_dict=extracted_data_dict,
+            on_extracted=lambda data: _save_checkpoint(session_factory, resume_id, extracted_data=data, extraction_version=versions["extraction_version"]),
+            timings=timings,
+        )
+
+        # Prepare data for DB update (using Pydantic models for validation and structure)
+        _notify(on_stage, STAGE_SAVING)
+        with timings.stage(STAGE_SAVING):
+            try:
+                resume_update_data = build_resume_update(file_name, raw_text, extracted_data_dict, llm_analysis_dict)
+                logger.info(f"Prepared data for DB update (resume ID: {resume_id})")
+            except Exception as e: # Catch Pydantic validation errors or other issues
+                logger.error(f"Error preparing data for DB update (resume ID: {resume_id}): {e}", exc_info=True)
+                raise PipelineError(500, f"Error preparing data for database update: {str(e)}", STAGE_SAVING)
+
+            # Update resume entry in DB with extracted data and analysis
+            with session_factory() as db:
+                try:
+                    updated_resume = crud_resume.update_resume_with_extracted_data(
+                        db, resume_id=resume_id, update_data=resume_update_data,
+                        extra_columns=_completed_columns(extracted_data_dict, versions, timings),
+                    )
+                except Exception as e:
+                    logger.error(f"Error updating DB with extracted data for resume ID {resume_id}: {e}", exc_info=True)
+                    db.rollback()
+                    raise PipelineError(500, "Database error: Could not update resume with extracted data.", STAGE_SAVING)
+            if not updated_resume:
+                logger.error(f"Failed to update resume in DB (ID: {resume_id})")
+                raise PipelineError(404, "Resume not found after update attempt.", STAGE_SAVING)
+    except PipelineError as e:
+        _save_checkpoint(session_factory, resume_id, **_failed_columns(e, timings))
+        raise
+    logger.info(f"Resume entry updated successfully in DB (ID: {updated_resume.id})")
+
+    # Add to the vector index used by /resumes/match
+    _notify(on_stage, STAGE_EMBEDDING)
+    with timings.stage(STAGE_EMBEDDING):
+        _index_resume(updated_resume)
+    return updated_resume
+
+def process_resume_file(
+    session_factory: SessionFactory,
+    source: Union[str, IO[bytes]],
+    file_name: str,
+    content_hash: Optional[str] = None,
+    on_duplicate: str = DUPLICATE_REUSE,
+    on_stage: Optional[StageCallback] = None,
+    timings: Optional[StageTimings] = None,
+) -> PipelineResult:
+    """
+    Runs the full upload pipeline for a saved file path or an upload stream: text extraction, initial DB entry,
+    LLM extraction and analysis (two calls, or one in combined mode) and the final DB update.
+    If `content_hash` matches an already processed resume, parsing and both LLM calls are
+    skipped according to `on_duplicate`.
+    `on_stage` is called with the name of each stage as it starts; stage durations are added to `timings`.
+    Each database step runs in its own short session from `session_factory`, so no pooled
+    connection is held while the file is parsed or the LLM is called.
+    Raises PipelineError on failure. The source is left in place (and open) for the caller to clean up.
+    """
+    with session_factory() as db:
+        duplicate_result = resolve_duplicate(db, file_name, content_hash, on_duplicate)
+    if duplicate_result is not None:
+        return duplicate_result
+
+    timings = timings or StageTimings()
+    # 1. Extract text
+    _notify(on_stage, STAGE_EXTRACTING_TEXT)
+    with timings.stage(STAGE_EXTRACTING_TEXT):
+        raw_text = extract_text(source, file_name, timings)
+
+    # 2. Create initial resume entry in DB
+    with timings.stage(STAGE_CREATING_ENTRY), session_factory() as db:
+        try:
+            resume_id = crud_resume.create_resume_entry(db, file_name=file_name, raw_text=raw_text, content_hash=content_hash).id
+            logger.info(f"Initial resume entry created with ID: {resume_id}")
+        except Exception as e:
+            logger.error(f"Error creating initial DB entry for {file_name}: {e}", exc_info=True)
+            db.rollback()
+            raise PipelineError(500, "Database error: Could not create initial resume entry.", STAGE_EXTRACTING_TEXT)
+
+    # 3-7. LLM stages, final update and indexing
+    return PipelineResult(resume=complete_resume(session_factory, resume_id, file_name, raw_text, on_stage=on_stage, timings=timings))
+
+async def aresolve_duplicate(db: AsyncSession, file_name: str, content_hash: Optional[str], on_duplicate: str) -> Optional[PipelineResult]:
+    """
+    Async variant of resolve_duplicate.
+    """
+    if not content_hash or on_duplicate == DUPLICATE_REPROCESS:
+        return None
+    try:
+        existing_resume = await crud_resume_async.get_processed_resume_by_hash(db, content_hash)
+        if existing_resume is None:
+            return None
+        if on_duplicate == DUPLICATE_EXISTING:
+            logger.info(f"Upload {file_name} matches resume ID {existing_resume.id}, returning the stored entry.")
+            return PipelineResult(resume=existing_resume, duplicate_of=existing_resume.id)
+        copied_resume = await crud_resume_async.copy_resume_entry(db, existing_resume, file_name=file_name, content_hash=content_hash)
+        await asyncio.to_thread(_index_resume, copied_resume)
+        logger.info(f"Upload {file_name} matches resume ID {existing_resume.id}, reused its results as resume ID {copied_resume.id}.")
+        return PipelineResult(resume=copied_resume, duplicate_of=existing_resume.id)
+    except Exception as e:
+        logger.error(f"Error checking for duplicate upload of {file_name}: {e}", exc_info=True)
+        await db.rollback()
+        return None
+
+async def _asave_checkpoint(session_factory: async_sessionmaker, resume_id: int, **values) -> None:
+    try:
+        async with session_factory() as db:
+            await crud_resume_async.update_processing_state(db, resume_id, **values)
+    except Exception as e:
+        logger.error(f"Error saving processing state of resume ID {resume_id}: {e}", exc_info=True)
+
+async def acomplete_resume(
+    session_factory: async_sessionmaker,
+    resume_id: int,
+    file_name: str,
+    raw_text: str,
+    extracted_data_dict: Optional[Dict[str, Any]] = None,
+    timings: Optional[StageTimings] = None,
+) -> models.Resume:
+    """
+    Async variant of complete_resume.
+    """
+    timings = timings or StageTimings()
+    versions = result_versions(raw_text, reused_extraction=extracted_data_dict is not None)
+
+    async def on_extracted(data: Dict[str, Any]) -> None:
+        await _asave_checkpoint(session_factory, resume_id, extracted_data=data, extraction_version=versions["extraction_version"])
+
+    try:
+        extracted_data_dict, llm_analysis_dict = await arun_llm_stages(
+            raw_text, f"resume ID {resume_id}", extracted_data_dict=extracted_data_dict, on_extracted=on_extracted, timings=timings,
+        )
+
+        with timings.stage(STAGE_SAVING):
+            try:
+                resume_update_data = build_resume_update(file_name, raw_text, extracted_data_dict, llm_analysis_dict)
+            except Exception as e:
+                logger.error(f"Error preparing data for DB update (resume ID: {resume_id}): {e}", exc_info=True)
+                raise PipelineError(500, f"Error preparing data for database update: {str(e)}", STAGE_SAVING)
+
+            async with session_factory() as db:
+                try:
+                    updated_resume = await crud_resume_async.update_resume_with_extracted_data(
+                        db, resume_id=resume_id, update_data=resume_update_data,
+                        extra_columns=_completed_columns(extracted_data_dict, versions, timings),
+                    )
+                except Exception as e:
+                    logger.error(f"Error updating DB with extracted data for resume ID {resume_id}: {e}", exc_info=True)
+                    await db.rollback()
+                    raise PipelineError(500, "Database error: Could not update resume with extracted data.", STAGE_SAVING)
+            if not updated_resume:
+                logger.error(f"Failed to update resume in DB (ID: {resume_id})")
+                raise PipelineError(404, "Resume not found after update attempt.", STAGE_SAVING)
+    except PipelineError as e:
+        await _asave_checkpoint(session_factory, resume_id, **_failed_columns(e, timings))
+        raise
+    logger.info(f"Resume entry updated successfully in DB (ID: {updated_resume.id})")
+
+    with timings.stage(STAGE_EMBEDDING):
+        await asyncio.to_thread(_index_resume, updated_resume)
+    return updated_resume
+
+async def aprocess_resume_file(
+    session_factory: async_sessionmaker,
+    source: Union[str, IO[bytes]],
+    file_name: str,
+    content_hash: Optional[str] = None,
+    on_duplicate: str = DUPLICATE_REUSE,
+    timings: Optional[StageTimings] = None,
+) -> PipelineResult:
+    """
+    Async variant of process_resume_file, with AsyncSessions from `session_factory`. The LLM calls and
+    DB statements are awaited; text extraction (CPU-bound, or waiting on a parse worker) runs in a worker thread.
+    As in the sync pipeline, each database step uses its own short session.
+    Raises PipelineError on failure.
+    """
+    async with session_factory() as db:
+        duplicate_result = await aresolve_duplicate(db, file_name, content_hash, on_duplicate)
+    if duplicate_result is not None:
+        return duplicate_result
+
+    timings = timings or StageTimings()
+    # 1. Extract text
+    with timings.stage(STAGE_EXTRACTING_TEXT):
+        raw_text = await asyncio.to_thread(extract_text, source, file_name, timings)
+
+    # 2. Create initial resume entry in DB
+    with timings.stage(STAGE_CREATING_ENTRY):
+        async with session_factory() as db:
+            try:
+                resume_id = (await crud_resume_async.create_resume_entry(db, file_name=file_name, raw_text=raw_text, content_hash=content_hash)).id
+                logger.info(f"Initial resume entry created with ID: {resume_id}")
+            except Exception as e:
+                logger.error(f"Error creating initial DB entry for {file_name}: {e}", exc_info=True)
+                await db.rollback()
+                raise PipelineError(500, "Database error: Could not create initial resume entry.", STAGE_EXTRACTING_TEXT)
+
+    # 3-7. LLM stages, final update and indexing
+    return PipelineResult(resume=await acomplete_resume(session_factory, resume_id, file_name, raw_text, timings=timings))
+
+# Stages POST /resumes/{id}/reprocess can start from. Text extraction needs the original file,
+# which isn't kept, so a resume without raw text has to be uploaded again.
+REPROCESS_STAGES = (STAGE_LLM_EXTRACTION, STAGE_LLM_ANALYSIS)
+
+class ReprocessResult(NamedTuple):
+    resume: models.Resume
+    from_stage: Optional[str] # None if the resume was already complete and nothing ran
+
+def stored_extraction(db_resume: models.Resume) -> Optional[Dict[str, Any]]:
+    """
+    The LLM extraction of a resume: its checkpoint or, for resumes processed before checkpoints
+    were kept, the extracted section columns. None if extraction never completed.
+    """
+    if db_resume.extracted_data is not None:
+        return db_resume.extracted_data
+    if db_resume.llm_analysis is None:
+        return None
+    return {field: getattr(db_resume, field) for field in schemas.ResumeBase.model_fields if field != "file_name"}
+
+def first_incomplete_stage(db_resume: models.Resume) -> Optional[str]:
+    """
+    The first pipeline stage whose output is missing from the resume, or None if all are present.
+    """
+    if not db_resume.raw_text:
+        return STAGE_EXTRACTING_TEXT
+    if stored_extraction(db_resume) is None:
+        return STAGE_LLM_EXTRACTION
+    if db_resume.llm_analysis is None:
+        return STAGE_LLM_ANALYSIS
+    return None
+
+def reprocess_resume(
+    session_factory: SessionFactory,
+    resume_id: int,
+    from_stage: Optional[str] = None,
+    on_stage: Optional[StageCallback] = None,
+) -> ReprocessResult:
+    """
+    Re-runs a stored resume from `from_stage` (one of REPROCESS_STAGES), or by default from its first
+    incomplete stage, reusing the stored outputs of the stages before it.
+    Raises PipelineError: 404 for an unknown resume, 409 if the requested stage lacks its inputs.
+    """
+    with session_factory() as db:
+        db_resume = crud_resume.get_resume_by_id(
+            db, resume_id, load_groups=crud_resume.RESUME_PAYLOAD_GROUPS + (models.PAYLOAD_CHECKPOINTS,),
+        )
+        if db_resume is None:
+            raise PipelineError(404, "Resume not found", from_stage or STAGE_QUEUED)
+        first_incomplete = first_incomplete_stage(db_resume)
+        extracted_data_dict = stored_extraction(db_resume)
+
+    if first_incomplete == STAGE_EXTRACTING_TEXT:
+        raise PipelineError(409, "The resume has no extracted text to reprocess; upload the file again.", STAGE_EXTRACTING_TEXT)
+    start = from_stage or first_incomplete
+    if start is None:
+        logger.info(f"Resume ID {resume_id} is already fully processed; nothing to reprocess.")
+        return ReprocessResult(resume=db_resume, from_stage=None)
+    if first_incomplete is not None and REPROCESS_STAGES.index(start) > REPROCESS_STAGES.index(first_incomplete):
+        raise PipelineError(409, f"Stage '{first_incomplete}' has not completed; reprocess from it or an earlier stage.", start)
+
+    logger.info(f"Reprocessing resume ID {resume_id} from stage '{start}'")
+    _save_checkpoint(session_factory, resume_id, processing_status=models.PROCESSING_STATUS_PROCESSING, failed_stage=None, processing_error=None)
+    updated_resume = complete_resume(
+        session_factory, resume_id, db_resume.file_name, db_resume.raw_text,
+        extracted_data_dict=extracted_data_dict if start == STAGE_LLM_ANALYSIS else None,
+        on_stage=on_stage,
+    )
+    return ReprocessResult(resume=updated_resume, from_stage=start)
@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from app.core.config import settings
+from app.crud import crud_job
+from app.db import database, models
+from app.services import resume_pipeline
+from app.utils import file_helpers
+
+logger = logging.getLogger(__name__)
+
+# Bounded in-process worker pool for background uploads.
+# Job state lives in the upload_jobs table, so the pool itself holds nothing that can't be rebuilt.
+# Several processes (uvicorn workers, old and new ones during a restart) share the table: each job is
+# leased to the process whose pool holds it, a heartbeat thread renews that process's leases, and
+# only jobs whose lease has expired are taken over by another process.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending_jobs = 0 # Jobs submitted to the pool that have not finished yet
+_owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}" # Holder of this process's leases
+_heartbeat: Optional[threading.Thread] = None
+_heartbeat_stop = threading.Event()
+
+class JobQueueFullError(Exception):
+    """Raised when UPLOAD_JOB_MAX_PENDING jobs are already waiting or running."""
+    pass
+
+def _lease_until(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) + timedelta(seconds=settings.UPLOAD_JOB_LEASE_SECONDS)
+
+def start_workers() -> None:
+    global _executor, _heartbeat
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_JOB_WORKERS, thread_name_prefix="upload-job")
+            logger.info(f"Upload job worker pool started with {settings.UPLOAD_JOB_WORKERS} workers.")
+            if database.SessionLocal is not None:
+                _heartbeat_stop.clear()
+                _heartbeat = threading.Thread(target=_heartbeat_loop, name="upload-job-heartbeat", daemon=True)
+                _heartbeat.start()
+
+def _heartbeat_loop() -> None:
+    # Renews this process's leases, and takes over the jobs of processes that stopped renewing theirs
+    while not _heartbeat_stop.wait(settings.UPLOAD_JOB_LEASE_SECONDS / 3):
+        try:
+            with database.session_scope() as db:
+                crud_job.renew_leases(db, _owner, _lease_until(), resume_pipeline.TERMINAL_STAGES)
+            recover_unfinished_jobs()
+        except Exception as e:
+            logger.error(f"Error renewing upload job leases: {e}", exc_info=True)
+
+def shutdown_workers() -> None:
+    """
+    Stops accepting new jobs and waits for running ones. Jobs still queued stay in the
+    database with their leases released, and are recovered by the next process that starts.
+    """
+    global _executor, _heartbeat, _pending_jobs
+    with _executor_lock:
+        executor, _executor = _executor, None
+        heartbeat, _heartbeat = _heartbeat, None
+    _heartbeat_stop.set()
+    if heartbeat is not None:
+        heartbeat.join()
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+        with _executor_lock:
+            _pending_jobs = 0 # Cancelled jobs never release their slot
+        if database.SessionLocal is not None:
+            with database.session_scope() as db:
+                crud_job.release_leases(db, _owner, resume_pipeline.TERMINAL_STAGES)
+        logger.info("Upload job worker pool stopped.")
+
+def _submit(job_id: str, enforce_limit: bool = True) -> None:
+    global _pending_jobs
+    start_workers()
+    with _executor_lock:
+        if enforce_limit and _pending_jobs >= settings.UPLOAD_JOB_MAX_PENDING:
+            raise JobQueueFullError(f"Too many pending upload jobs ({_pending_jobs}). Try again later.")
+        _pending_jobs += 1
+        _executor.submit(_run_job, job_id)
+
+def _release_slot() -> None:
+    global _pending_jobs
+    with _executor_lock:
+        _pending_jobs -= 1
+
+def enqueue_upload(db, file_name: str, file_path: str, content_hash: Optional[str] = None, on_duplicate: str = resume_pipeline.DUPLICATE_REUSE) -> models.UploadJob:
+    """
+    Records a job for a saved upload and hands it to the worker pool.
+    Raises JobQueueFullError if the pool is saturated; the job is then marked failed.
+    """
+    db_job = crud_job.create_upload_job(
+        db, file_name=file_name, file_path=file_path, content_hash=content_hash, on_duplicate=on_duplicate,
+        locked_by=_owner, locked_until=_lease_until(),
+    )
+    try:
+        _submit(db_job.id)
+    except JobQueueFullError as e:
+        crud_job.update_job(db, db_job, stage=resume_pipeline.STAGE_FAILED, error=str(e), file_path=None)
+        raise
+    logger.info(f"Upload job {db_job.id} queued for file: {file_name}")
+    return db_job
+
+def _run_job(job_id: str) -> None:
+    try:
+        _process_job(job_id)
+    except Exception as e:
+        logger.error(f"Unexpected error in upload job {job_id}: {e}", exc_info=True)
+    finally:
+        _release_slot()
+
+def _update_job(job_id: str, **fields) -> None:
+    # Each job update is its own short transaction; no connection is held between stages
+    with database.session_scope() as db:
+        db_job = crud_job.get_upload_job(db, job_id)
+        if db_job is not None:
+            crud_job.update_job(db, db_job, **fields)
+
+def _process_job(job_id: str) -> None:
+    with database.session_scope() as db:
+        now = datetime.now(timezone.utc)
+        if not crud_job.claim_job(db, job_id, _owner, now, _lease_until(now), resume_pipeline.TERMINAL_STAGES):
+            logger.info(f"Upload job {job_id} is finished or leased to another process, skipping it.")
+            return
+        db_job = crud_job.get_upload_job(db, job_id)
+
+        if db_job.attempts >= settings.UPLOAD_JOB_MAX_ATTEMPTS:
+            logger.error(f"Upload job {job_id} exceeded {settings.UPLOAD_JOB_MAX_ATTEMPTS} attempts, giving up.")
+            file_helpers.remove_saved_file(db_job.file_path)
+            crud_job.update_job(db, db_job, stage=resume_pipeline.STAGE_FAILED, error="Job exceeded the maximum number of attempts.", file_path=None)
+            return
+
+        crud_job.update_job(db, db_job, attempts=db_job.attempts + 1)
+        logger.info(f"Processing upload job {job_id} (attempt {db_job.attempts}) for file: {db_job.file_name}")
+        file_path, file_name = db_job.file_path, db_job.file_name
+        content_hash, on_duplicate = db_job.content_hash, db_job.on_duplicate
+
+    def on_stage(stage: str) -> None:
+        _update_job(job_id, stage=stage)
+
+    try:
+        result = resume_pipeline.process_resume_file(
+            database.SessionLocal, file_path, file_name,
+            content_hash=content_hash,
+            on_duplicate=on_duplicate or resume_pipeline.DUPLICATE_REUSE,
+            on_stage=on_stage,
+        )
+        _update_job(job_id, stage=resume_pipeline.STAGE_COMPLETED, resume_id=result.resume.id, error=None)
+        logger.info(f"Upload job {job_id} completed (resume ID: {result.resume.id})")
+    except resume_pipeline.PipelineError as e:
+        logger.error(f"Upload job {job_id} failed at stage '{e.stage}': {e.detail}")
+        _update_job(job_id, stage=resume_pipeline.STAGE_FAILED, error=e.detail)
+    except Exception as e:
+        logger.error(f"Upload job {job_id} failed: {e}", exc_info=True)
+        _update_job(job_id, stage=resume_pipeline.STAGE_FAILED, error=str(e))
+
+    file_helpers.remove_saved_file(file_path)
+    _update_job(job_id, file_path=None)
+
+def recover_unfinished_jobs() -> int:
+    """
+    Re-queues unfinished jobs whose lease has expired, i.e. whose process stopped (a restart or crash)
+    without finishing them. Jobs another live process holds are left alone.
+    Returns the number of jobs re-queued.
+    """
+    if database.SessionLocal is None:
+        return 0
+    db = database.SessionLocal()
+    try:
+        requeued = 0
+        now = datetime.now(timezone.utc)
+        for db_job in crud_job.get_unfinished_jobs(db, resume_pipeline.TERMINAL_STAGES, lease_expired_at=now):
+            if db_job.locked_by == _owner:
+                continue # Already in this process's pool
+            if not crud_job.claim_job(db, db_job.id, _owner, now, _lease_until(now), resume_pipeline.TERMINAL_STAGES):
+                continue # Another process claimed it first
+            if not db_job.file_path or not file_helpers.file_exists(db_job.file_path):
+                logger.warning(f"Upload job {db_job.id} cannot be recovered: saved file is missing.")
+                crud_job.update_job(db, db_job, stage=resume_pipeline.STAGE_FAILED, error="Uploaded file was lost before processing finished. Please upload again.", file_path=None)
+                continue
+            crud_job.update_job(db, db_job, stage=resume_pipeline.STAGE_QUEUED)
+            # Recovered jobs were already accepted once, so they bypass the pending limit
+            _submit(db_job.id, enforce_limit=False)
+            requeued += 1
+        if requeued:
+            logger.info(f"Re-queued {requeued} unfinished upload job(s).")
+        return requeued
+    finally:
+        db.close()
@@ -0,0 +1,312 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError: # Not available on Windows, where only one process may write the index
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Local vector index for matching resumes against job descriptions (POST /resumes/match).
+# Resumes and job descriptions are embedded offline with signed feature hashing of word unigrams
+# and bigrams (sublinear tf, L2-normalized), so cosine similarity is a dot product. The vectors
+# live in a float32 matrix memory-mapped from VECTOR_INDEX_DIR, with a parallel int64 matrix of
+# resume ids; rows are updated in place on upload and swap-removed on delete.
+# Every API worker and the maintenance commands open the same files: changes are made under an
+# exclusive flock on a lock file, reads under a shared one, and each change bumps the generation
+# in meta.json, so a process re-reads the count and ids whenever another one has written.
+
+_VECTORS_FILE = "vectors.f32"
+_IDS_FILE = "ids.i64"
+_META_FILE = "meta.json"
+_LOCK_FILE = "index.lock"
+_MIN_CAPACITY = 1024
+_QUERY_CHUNK_ROWS = 65536 # Rows scored per matrix product, bounding temporary memory
+_SKILL_WEIGHT = 2 # Skills count double: they are the most direct signal for matching
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+
+def _tokens(text: str) -> List[str]:
+    words = _TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+def _hash_features(weighted_texts: Iterable[Tuple[str, float]], dim: int) -> np.ndarray:
+    counts: Dict[int, float] = {}
+    for text, weight in weighted_texts:
+        for token in _tokens(text):
+            hashed = zlib.crc32(token.encode("utf-8"))
+            index = hashed % dim
+            # The sign bit keeps collisions from only ever adding up
+            counts[index] = counts.get(index, 0.0) + (weight if hashed & 0x80000000 else -weight)
+    vector = np.zeros(dim, dtype=np.float32)
+    if counts:
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        vector[indices] = np.sign(values) * np.log1p(np.abs(values))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+    return vector
+
+def _strings(value: Any, keys: Tuple[str, ...] = ()) -> List[str]:
+    # Flattens a JSON section (list of strings or of objects) into its text values
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [text for key in keys for text in _strings(value.get(key))]
+    if isinstance(value, list):
+        return [text for item in value for text in _strings(item, keys)]
+    return []
+
+# Resume columns the embedding is built from
+EMBEDDED_COLUMNS = (
+    "summary", "work_experience", "projects", "education_history",
+    "technical_skills", "soft_skills", "other_skills", "certifications",
+)
+
+def embedded_columns(db_resume: Any) -> Dict[str, Any]:
+    return {column: getattr(db_resume, column) for column in EMBEDDED_COLUMNS}
+
+def resume_texts(columns: Mapping[str, Any]) -> List[Tuple[str, float]]:
+    """
+    The weighted texts a resume is embedded from, taken from its extracted sections and skills.
+    """
+    texts = [(text, 1.0) for text in _strings(columns.get("summary"))]
+    texts += [(text, 1.0) for text in _strings(columns.get("work_experience"), ("job_title", "responsibilities", "achievements"))]
+    texts += [(text, 1.0) for text in _strings(columns.get("projects"), ("name", "description", "technologies"))]
+    texts += [(text, 1.0) for text in _strings(columns.get("education_history"), ("degree", "field_of_study"))]
+    for section in ("technical_skills", "soft_skills", "other_skills"):
+        texts += [(text, _SKILL_WEIGHT) for text in _strings(columns.get(section))]
+    texts += [(text, _SKILL_WEIGHT) for text in _strings(columns.get("certifications"), ("name",))]
+    return texts
+
+def embed_resume(columns: Mapping[str, Any], dim: Optional[int] = None) -> np.ndarray:
+    return _hash_features(resume_texts(columns), dim or settings.VECTOR_INDEX_DIM)
+
+def embed_text(text: str, dim: Optional[int] = None) -> np.ndarray:
+    return _hash_features([(text, 1.0)], dim or settings.VECTOR_INDEX_DIM)
+
+class VectorIndex:
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._count = 0
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        self._rows: Dict[int, int] = {} # resume id -> row
+        self._generation: Optional[int] = None # Of the files as last read; None until then
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _open(self, capacity: int, mode: str) -> None:
+        self._vectors = np.memmap(self._path(_VECTORS_FILE), dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+        self._ids = np.memmap(self._path(_IDS_FILE), dtype=np.int64, mode=mode, shape=(capacity,))
+        self._capacity = capacity
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Holds the thread lock and the file lock shared between processes, with the index files re-read if needed."""
+        with self._lock:
+            if self._lock_file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._lock_file = open(self._path(_LOCK_FILE), "a")
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._sync(exclusive)
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(_META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _sync(self, exclusive: bool) -> None:
+        meta = self._read_meta()
+        generation = meta.get("generation", 0) if meta else None
+        if self._generation is not None and generation == self._generation:
+            return
+        if meta and meta.get("dim") == self.dim:
+            self._open(meta["capacity"], "r+")
+            self._count = meta["count"]
+            self._rows = {int(resume_id): row for row, resume_id in enumerate(self._ids[:self._count])}
+            if self._generation is None:
+                logger.info(f"Vector index loaded: {self._count} resumes, dimension {self.dim}.")
+            self._generation = generation
+            return
+        self._count = 0
+        self._rows = {}
+        if not exclusive:
+            # Read as empty, and again next time: the files are only (re)created under the exclusive lock
+            self._vectors = self._ids = None
+            self._capacity = 0
+            self._generation = None
+            return
+        if meta:
+            logger.warning(f"Vector index in {self.directory} has dimension {meta.get('dim')}, expected {self.dim}; starting empty. Rebuild it with `python -m app.cli rebuild-vector-index`.")
+        self._open(_MIN_CAPACITY, "w+")
+        self._generation = generation or 0
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        self._generation += 1
+        temp_path = self._path(_META_FILE + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"dim": self.dim, "count": self._count, "capacity": self._capacity, "generation": self._generation}, f)
+        os.replace(temp_path, self._path(_META_FILE))
+
+    def _grow(self) -> None:
+        new_capacity = max(_MIN_CAPACITY, self._capacity * 2)
+        self._vectors.flush()
+        self._ids.flush()
+        del self._vectors, self._ids
+        for name, itemsize in ((_VECTORS_FILE, 4 * self.dim), (_IDS_FILE, 8)):
+            with open(self._path(name), "r+b") as f:
+                f.truncate(new_capacity * itemsize)
+        self._open(new_capacity, "r+")
+
+    def _flush(self) -> None:
+        self._vectors.flush()
+        self._ids.flush()
+        self._write_meta()
+
+    def upsert(self, items: Iterable[Tuple[int, np.ndarray]]) -> None:
+        """Adds or replaces the vectors of the given resume ids."""
+        with self._locked(exclusive=True):
+            for resume_id, vector in items:
+                row = self._rows.get(resume_id)
+                if row is None:
+                    if self._count == self._capacity:
+                        self._grow()
+                    row = self._count
+                    self._count += 1
+                    self._rows[resume_id] = row
+                    self._ids[row] = resume_id
+                self._vectors[row] = vector
+            self._flush()
+
+    def remove(self, resume_id: int) -> bool:
+        with self._locked(exclusive=True):
+            row = self._rows.pop(resume_id, None)
+            if row is None:
+                return False
+            last = self._count - 1
+            if row != last:
+                # Move the last row into the gap so the matrix stays dense
+                moved_id = int(self._ids[last])
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._count = last
+            self._flush()
+            return True
+
+    def reset(self) -> None:
+        with self._locked(exclusive=True):
+            self._count = 0
+            self._rows = {}
+            self._write_meta()
+
+    def __len__(self) -> int:
+        with self._locked(exclusive=False):
+            return self._count
+
+    def top_k(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """
+        Cosine top-k for a (n_queries, dim) matrix of normalized query vectors.
+        Returns one list of (resume_id, score) per query, best first.
+        """
+        with self._locked(exclusive=False):
+            # Held while scoring: removals move rows, and a scan of 100k rows takes milliseconds
+            count = self._count
+            if count == 0:
+                return [[] for _ in range(len(queries))]
+            k = min(k, count)
+            queries = np.asarray(queries, dtype=np.float32)
+            best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+            for start in range(0, count, _QUERY_CHUNK_ROWS):
+                stop = min(start + _QUERY_CHUNK_ROWS, count)
+                scores = queries @ self._vectors[start:stop].T # (n_queries, chunk)
+                chunk_k = min(k, stop - start)
+                candidates = np.argpartition(-scores, chunk_k - 1, axis=1)[:, :chunk_k]
+                best_scores = np.concatenate([best_scores, np.take_along_axis(scores, candidates, axis=1)], axis=1)
+                best_rows = np.concatenate([best_rows, candidates + start], axis=1)
+                if best_scores.shape[1] > k:
+                    keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                    best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                    best_rows = np.take_along_axis(best_rows, keep, axis=1)
+            order = np.argsort(-best_scores, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            best_ids = self._ids[np.take_along_axis(best_rows, order, axis=1)]
+        return [
+            [(int(resume_id), float(score)) for resume_id, score in zip(ids, scores)]
+            for ids, scores in zip(best_ids, best_scores)
+        ]
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+def get_index() -> VectorIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex(settings.VECTOR_INDEX_DIR, settings.VECTOR_INDEX_DIM)
+        return _index
+
+def index_resume(resume_id: int, columns: Mapping[str, Any]) -> None:
+    """
+    Embeds a processed resume and adds it to the index. Errors are logged, not raised:
+    matching is secondary to storing the resume.
+    """
+    if not settings.VECTOR_INDEX_ENABLED:
+        return
+    try:
+        get_index().upsert([(resume_id, embed_resume(columns))])
+    except Exception as e:
+        logger.error(f"Error adding resume ID {resume_id} to the vector index: {e}", exc_info=True)
+
+def index_resumes(items: Iterable[Tuple[int, Mapping[str, Any]]]) -> None:
+    if not settings.VECTOR_INDEX_ENABLED:
+        return
+    try:
+        get_index().upsert([(resume_id, embed_resume(columns)) for resume_id, columns in items])
+    except Exception as e:
+        logger.error(f"Error adding resumes to the vector index: {e}", exc_info=True)
+
+def remove_resume(resume_id: int) -> None:
+    if not settings.VECTOR_INDEX_ENABLED:
+        return
+    try:
+        get_index().remove(resume_id)
+    except Exception as e:
+        logger.error(f"Error removing resume ID {resume_id} from the vector index: {e}", exc_info=True)
+
+def match(job_descriptions: List[str], top_k: int) -> List[List[Tuple[int, float]]]:
+    """
+    Top-k resume ids and cosine scores for each job description.
+    """
+    queries = np.stack([embed_text(text) for text in job_descriptions])
+    return get_index().top_k(queries, top_k)
@@ -1,11 +1,17 @@
 import os
+import hashlib
 import shutil
+import tempfile
+import uuid
+import zipfile
 from fastapi import UploadFile
-from typing import Union, IO
-import PyPDF2
+from typing import Union, IO, List, NamedTuple, Optional, Tuple
 from docx import Document
 import logging
 
+from app.core.config import settings
+from app.utils import pdf_text, parse_sandbox
+
 # Configure logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -17,43 +23,139 @@ UPLOAD_DIR = "uploads"
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 
-def save_upload_file(upload_file: UploadFile, destination_folder: str = UPLOAD_DIR) -> str:
+COPY_CHUNK_SIZE = 1024 * 1024
+
+class UploadTooLargeError(Exception):
+    """Raised while streaming an upload that exceeds MAX_UPLOAD_BYTES."""
+    pass
+
+class IngestedUpload(NamedTuple):
+    file_name: str
+    buffer: IO[bytes] # Positioned at 0; a SpooledTemporaryFile, in memory unless larger than UPLOAD_SPOOL_THRESHOLD_BYTES
+    content_hash: str # sha256 hex digest of the file contents
+    size_bytes: int
+
+def _copy_stream(source: IO[bytes], destination: Optional[IO[bytes]], max_bytes: Optional[int], file_name: str) -> Tuple[str, int]:
+    """
+    Copies `source` to `destination` (if given) in chunks, hashing and counting bytes in the same pass.
+    Raises UploadTooLargeError as soon as more than `max_bytes` have been read.
+    """
+    digest = hashlib.sha256()
+    size_bytes = 0
+    while True:
+        chunk = source.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        size_bytes += len(chunk)
+        if max_bytes is not None and size_bytes > max_bytes:
+            raise UploadTooLargeError(f"File '{file_name}' exceeds the maximum upload size of {max_bytes} bytes.")
+        digest.update(chunk)
+        if destination is not None:
+            destination.write(chunk)
+    return digest.hexdigest(), size_bytes
+
+def ingest_upload(upload_file: UploadFile, max_bytes: Optional[int] = None) -> IngestedUpload:
     """
-    Saves an uploaded file to the specified folder.
-    Returns the path to the saved file.
+    Hashes and measures an upload in one pass over the buffer the multipart parser received it into,
+    and enforces the maximum upload size. The buffer is used as it is, not copied: the caller owns
+    (and must close) the returned buffer, which is the upload's own file.
     """
+    max_bytes = settings.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    buffer = upload_file.file
     try:
-        file_path = os.path.join(destination_folder, upload_file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-        logger.info(f"File '{upload_file.filename}' saved to '{file_path}'")
-        return file_path
+        buffer.seek(0)
+        content_hash, size_bytes = _copy_stream(buffer, None, max_bytes, upload_file.filename)
+        buffer.seek(0)
+        spooled_to_disk = 0 < settings.UPLOAD_SPOOL_THRESHOLD_BYTES < size_bytes # The parser's spool threshold (app/main.py)
+        logger.info(f"File '{upload_file.filename}' ingested ({size_bytes} bytes, {'spooled to disk' if spooled_to_disk else 'in memory'})")
+        return IngestedUpload(file_name=upload_file.filename, buffer=buffer, content_hash=content_hash, size_bytes=size_bytes)
     except Exception as e:
-        logger.error(f"Error saving file '{upload_file.filename}': {e}")
+        buffer.close()
+        logger.error(f"Error ingesting file '{upload_file.filename}': {e}")
+        raise
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+def expand_zip_upload(ingested: IngestedUpload, max_entries: int) -> List[IngestedUpload]:
+    """
+    Expands a ZIP upload into one IngestedUpload per supported document inside it.
+    Each entry is streamed through the same size limit as a regular upload, so a
+    compression bomb is cut off at MAX_UPLOAD_BYTES per entry.
+    Raises UploadTooLargeError if the archive holds more than `max_entries` documents.
+    """
+    expanded: List[IngestedUpload] = []
+    try:
+        with zipfile.ZipFile(ingested.buffer) as archive:
+            for info in archive.infolist():
+                entry_name = os.path.basename(info.filename)
+                if info.is_dir() or not entry_name or info.filename.startswith("__MACOSX/") or entry_name.startswith("."):
+                    continue
+                if os.path.splitext(entry_name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                    logger.info(f"Skipping unsupported ZIP entry '{info.filename}' in '{ingested.file_name}'")
+                    continue
+                if len(expanded) >= max_entries:
+                    raise UploadTooLargeError(f"Archive '{ingested.file_name}' contains more than {max_entries} documents.")
+                buffer = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_THRESHOLD_BYTES)
+                try:
+                    with archive.open(info) as entry:
+                        content_hash, size_bytes = _copy_stream(entry, buffer, settings.MAX_UPLOAD_BYTES, entry_name)
+                except Exception:
+                    buffer.close()
+                    raise
+                buffer.seek(0)
+                expanded.append(IngestedUpload(file_name=entry_name, buffer=buffer, content_hash=content_hash, size_bytes=size_bytes))
+    except Exception:
+        for item in expanded:
+            item.buffer.close()
         raise
-    finally:
-        upload_file.file.close() # Ensure the file stream is closed
+    logger.info(f"Expanded ZIP '{ingested.file_name}' into {len(expanded)} documents")
+    return expanded
+
+def persist_ingested_upload(ingested: IngestedUpload, destination_folder: str = UPLOAD_DIR) -> str:
+    """
+    Writes an ingested upload to disk (used for background jobs, which must survive a restart).
+    Returns the path to the saved file. The buffer is rewound afterwards.
+    """
+    file_path = os.path.join(destination_folder, f"{uuid.uuid4().hex}_{os.path.basename(ingested.file_name)}")
+    ingested.buffer.seek(0)
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(ingested.buffer, f, COPY_CHUNK_SIZE)
+    ingested.buffer.seek(0)
+    logger.info(f"File '{ingested.file_name}' saved to '{file_path}'")
+    return file_path
+
+def file_exists(file_path: str) -> bool:
+    return os.path.exists(file_path)
+
+def remove_saved_file(file_path: str | None) -> None:
+    """
+    Removes a saved upload. Errors are logged and swallowed, since cleanup is non-critical.
+    """
+    if not file_path or not os.path.exists(file_path):
+        return
+    try:
+        os.remove(file_path)
+        logger.info(f"Successfully cleaned up uploaded file: {file_path}")
+    except Exception as e:
+        logger.error(f"Error cleaning up uploaded file {file_path}: {e}")
 
 def extract_text_from_pdf(file_path: Union[str, IO[bytes]]) -> str:
     """
     Extracts text from a PDF file.
     Accepts either a file path or a file-like object.
+    Pages are extracted one by one (in parallel for long documents, see app/utils/pdf_text.py) and joined once.
     """
-    text = ""
+    label = file_path if isinstance(file_path, str) else 'Uploaded File Stream'
     try:
-        if isinstance(file_path, str):
-            with open(file_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                for page_num in range(len(reader.pages)):
-                    text += reader.pages[page_num].extract_text() or ""
-        else: # Assuming file_path is a file-like object
-            reader = PyPDF2.PdfReader(file_path)
-            for page_num in range(len(reader.pages)):
-                text += reader.pages[page_num].extract_text() or ""
-        logger.info(f"Text extracted successfully from PDF: {file_path if isinstance(file_path, str) else 'Uploaded File Stream'}")
-        return text
+        pages = pdf_text.extract_pdf_pages(file_path)
+        pdf_text.log_page_timings(pages, label)
+        pdf_text.record_page_timings([page.seconds for page in pages])
+        logger.info(f"Text extracted successfully from PDF: {label}")
+        return "\n".join(page.text for page in pages)
+    except MemoryError:
+        raise # A memory limit (e.g. the parse sandbox's) is not a malformed file
     except Exception as e:
-        logger.error(f"Error extracting text from PDF '{file_path if isinstance(file_path, str) else 'Uploaded File Stream'}': {e}")
+        logger.error(f"Error extracting text from PDF '{label}': {e}")
         # Depending on desired error handling, you might return empty string or raise
         return "" 
 
@@ -62,17 +164,50 @@ def extract_text_from_docx(file_path: Union[str, IO[bytes]]) -> str:
     Extracts text from a DOCX file.
     Accepts either a file path or a file-like object.
     """
-    text = ""
     try:
         doc = Document(file_path) # python-docx can handle both path string and file-like object
-        for para in doc.paragraphs:
-            text += para.text + "\n"
+        text = "".join(para.text + "\n" for para in doc.paragraphs)
         logger.info(f"Text extracted successfully from DOCX: {file_path if isinstance(file_path, str) else 'Uploaded File Stream'}")
         return text
+    except MemoryError:
+        raise
     except Exception as e:
         logger.error(f"Error extracting text from DOCX '{file_path if isinstance(file_path, str) else 'Uploaded File Stream'}': {e}")
         return ""
 
+def get_text_from_stream(stream: IO[bytes], file_name: str) -> str:
+    """
+    Extracts text from an in-memory or spooled upload, using the file name to detect the type.
+    """
+    _, extension = os.path.splitext(file_name)
+    extension = extension.lower()
+    stream.seek(0)
+
+    if extension == ".pdf":
+        return extract_text_from_pdf(stream)
+    elif extension == ".docx":
+        return extract_text_from_docx(stream)
+    elif extension == ".txt":
+        try:
+            return stream.read().decode("utf-8")
+        except Exception as e:
+            logger.error(f"Error reading text file '{file_name}': {e}")
+            return ""
+    else:
+        logger.warning(f"Unsupported file type for text extraction: {extension} for file {file_name}")
+        return ""
+
+def get_text(source: Union[str, IO[bytes]], file_name: str) -> str:
+    """
+    Extracts text from either a saved file path or an upload stream.
+    PDF and DOCX parsing runs in the parse sandbox when PARSE_SANDBOX_ENABLED is set.
+    """
+    if settings.PARSE_SANDBOX_ENABLED and os.path.splitext(file_name)[1].lower() in (".pdf", ".docx"):
+        return parse_sandbox.extract_text(source, file_name)
+    if isinstance(source, str):
+        return get_text_from_file(source)
+    return get_text_from_stream(source, file_name)
+
 def get_text_from_file(file_path: str) -> str:
     """
     Detects file type and extracts text accordingly.
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Hashable, Mapping, NamedTuple, Optional, Tuple
+import gzip
+import logging
+import threading
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError: # Optional: without it responses are only gzip-compressed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Conditional requests, response caching and compression for GET /resumes/{id}.
+# Responses are cached as serialized JSON, keyed by resume and response variant (fields/exclude)
+# and tagged with the resume version they were built from, so a cached body is only served
+# while the stored version is unchanged. Compressed encodings are computed once per cached body.
+
+ENCODING_BROTLI = "br"
+ENCODING_GZIP = "gzip"
+ENCODING_IDENTITY = "identity"
+
+class CachedBody(NamedTuple):
+    version: int
+    bodies: Dict[str, bytes] # content encoding -> body
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple[int, Hashable], CachedBody]" = OrderedDict() # (resume id, variant) -> body
+_total_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+def _encode(body: bytes) -> Dict[str, bytes]:
+    bodies = {ENCODING_IDENTITY: body}
+    if len(body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        bodies[ENCODING_GZIP] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            bodies[ENCODING_BROTLI] = brotli.compress(body, quality=5)
+    return bodies
+
+def _remove(key: Tuple[int, Hashable]) -> None:
+    global _total_bytes
+    entry = _entries.pop(key, None)
+    if entry is not None:
+        _total_bytes -= entry.size
+
+def get(resume_id: int, variant: Hashable, version: int) -> Optional[CachedBody]:
+    """The cached body of a response variant, if it was built from `version` of the resume."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    key = (resume_id, variant)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry.version != version:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+        return entry
+
+def put(resume_id: int, variant: Hashable, version: int, body: bytes) -> CachedBody:
+    """Encodes a response body and caches it (when enabled). Returns the encoded body either way."""
+    global _total_bytes
+    entry = CachedBody(version=version, bodies=_encode(body))
+    if not settings.RESPONSE_CACHE_ENABLED or entry.size > settings.RESPONSE_CACHE_MAX_BYTES:
+        return entry
+    key = (resume_id, variant)
+    with _lock:
+        _remove(key)
+        _entries[key] = entry
+        _total_bytes += entry.size
+        while _entries and (len(_entries) > settings.RESPONSE_CACHE_MAX_ENTRIES or _total_bytes > settings.RESPONSE_CACHE_MAX_BYTES):
+            _remove(next(iter(_entries)))
+            _stats["evictions"] += 1
+    return entry
+
+def invalidate_resume(resume_id: int) -> None:
+    """Drops every cached variant of a resume (called when it is updated or deleted)."""
+    with _lock:
+        keys = [key for key in _entries if key[0] == resume_id]
+        for key in keys:
+            _remove(key)
+        _stats["invalidations"] += len(keys)
+
+def clear() -> None:
+    global _total_bytes
+    with _lock:
+        _entries.clear()
+        _total_bytes = 0
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        return {**_stats, "entries": len(_entries), "bytes": _total_bytes}
+
+def make_etag(resume_id: int, version: int, variant: str) -> str:
+    # Weak: the same representation is sent with different content encodings
+    return f'W/"{resume_id}-{version}-{variant}"'
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive timestamps; they are stored in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+def is_not_modified(request_headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Whether a GET can be answered with 304. If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        opaque = etag.removeprefix("W/")
+        return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Mapping[str, bytes]) -> str:
+    """
+    The best of the available encodings for an Accept-Encoding header: brotli, then gzip, else identity.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in (ENCODING_BROTLI, ENCODING_GZIP):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return ENCODING_IDENTITY
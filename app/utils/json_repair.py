@@ -0,0 +1,198 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import json
+
+# Tolerant parsing of the JSON objects LLMs return.
+# The first JSON object in the text is used, whatever surrounds it (markdown fences, prose). If it
+# doesn't parse as is, one pass over it repairs the common defects: trailing commas, unescaped quotes
+# and raw control characters inside strings, and truncation (the open string and containers are
+# closed, dropping an incomplete last element if needed). Values cut off by truncation are reported by
+# key path, so callers can treat them as missing rather than trust a half-written value.
+
+REPAIR_TRAILING_COMMA = "trailing_comma"
+REPAIR_UNESCAPED_QUOTE = "unescaped_quote"
+REPAIR_CONTROL_CHARACTER = "control_character"
+REPAIR_MISMATCHED_BRACKET = "mismatched_bracket"
+REPAIR_TRUNCATED = "truncated"
+
+_MAX_TRUNCATION_CUTS = 50 # Earlier element boundaries tried when closing a truncated object
+_VALUE_STARTS = set('"{[-0123456789tfn')
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_CLOSING = {"{": "}", "[": "]"}
+
+class ParsedObject(NamedTuple):
+    value: Dict[str, Any]
+    repairs: Tuple[str, ...] # REPAIR_* values, empty if the object parsed as is
+    truncated_path: Tuple[str, ...] = () # Keys down to the innermost object member cut off by truncation
+
+    @property
+    def truncated(self) -> bool:
+        return REPAIR_TRUNCATED in self.repairs
+
+def _next_significant(text: str, position: int) -> Tuple[str, int]:
+    for offset, char in enumerate(text[position:position + 200]):
+        if not char.isspace():
+            return char, position + offset
+    return "", len(text)
+
+def _ends_string(text: str, position: int, is_key: bool, container: str) -> bool:
+    """Whether the quote at `position` ends a string: JSON must be able to continue after it."""
+    follower, follower_position = _next_significant(text, position + 1)
+    if is_key:
+        return follower in (":", "")
+    if follower in ("}", "]", ""):
+        return True
+    if follower != ",":
+        return False
+    # After a comma comes the next key of an object, or the next value of an array
+    after_comma, _ = _next_significant(text, follower_position + 1)
+    if container == "{":
+        return after_comma in ('"', "")
+    return after_comma in _VALUE_STARTS or after_comma == ""
+
+def _strip_dangling(chars: List[str]) -> None:
+    # Whitespace and commas left at the end of an incomplete container
+    while chars and (chars[-1].isspace() or chars[-1] == ","):
+        chars.pop()
+
+def _close(chars: List[str], stack: Tuple[str, ...]) -> str:
+    chars = list(chars)
+    _strip_dangling(chars)
+    if chars and chars[-1] == ":":
+        chars.append("null") # Key without a value
+    return "".join(chars) + "".join(_CLOSING[opener] for opener in reversed(stack))
+
+def _try_loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+def _truncated_path(keys: List[Optional[str]], complete: List[bool]) -> Tuple[str, ...]:
+    # Members of every open container are cut off, except a finished one at the innermost level
+    path: List[str] = []
+    for depth, key in enumerate(keys):
+        if key is None or (depth == len(keys) - 1 and complete[depth]):
+            break
+        path.append(key)
+    return tuple(path)
+
+def _repair(text: str) -> Tuple[Optional[Any], List[str], Tuple[str, ...]]:
+    """One pass over `text`, which starts at the object's "{"."""
+    chars: List[str] = []
+    stack: List[str] = []
+    keys: List[Optional[str]] = [] # Per open container: the current member's key (None in arrays)
+    complete: List[bool] = [] # Per open container: whether the current member's value is finished
+    cuts: List[Tuple[int, Tuple[str, ...]]] = [] # (output length, open containers) at element boundaries
+    repairs: List[str] = []
+    in_string = escaped = expecting_key = is_key = False
+    string_start = 0
+
+    def note(repair: str) -> None:
+        if repair not in repairs:
+            repairs.append(repair)
+
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+                chars.append(char)
+            elif char == "\\":
+                escaped = True
+                chars.append(char)
+            elif char == '"':
+                # A quote ends the string only where JSON can continue after a string
+                if _ends_string(text, position, is_key, stack[-1] if stack else "{"):
+                    in_string = False
+                    chars.append(char)
+                    if is_key:
+                        keys[-1] = _try_loads("".join(chars[string_start:]))
+                        complete[-1] = False
+                    elif stack:
+                        complete[-1] = True
+                else:
+                    note(REPAIR_UNESCAPED_QUOTE)
+                    chars.append('\\"')
+            elif char < " ":
+                note(REPAIR_CONTROL_CHARACTER)
+                chars.append(_CONTROL_ESCAPES.get(char, f"\\u{ord(char):04x}"))
+            else:
+                chars.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+            is_key = expecting_key and bool(stack) and stack[-1] == "{"
+            expecting_key = False
+            string_start = len(chars)
+            chars.append(char)
+        elif char in "{[":
+            stack.append(char)
+            keys.append(None)
+            complete.append(False)
+            expecting_key = char == "{"
+            chars.append(char)
+            cuts.append((len(chars), tuple(stack))) # Closing right here gives an empty container
+        elif char == ":":
+            expecting_key = False
+            chars.append(char)
+        elif char in "}]":
+            last = len(chars) - 1
+            while last >= 0 and chars[last].isspace():
+                last -= 1
+            if last >= 0 and chars[last] == ",":
+                note(REPAIR_TRAILING_COMMA)
+                del chars[last:]
+            if not stack:
+                break
+            closing = _CLOSING[stack.pop()]
+            keys.pop()
+            complete.pop()
+            if char != closing:
+                note(REPAIR_MISMATCHED_BRACKET)
+            chars.append(closing)
+            if not stack:
+                return _try_loads("".join(chars)), repairs, ()
+            complete[-1] = True
+            cuts.append((len(chars), tuple(stack)))
+        elif char == ",":
+            cuts.append((len(chars), tuple(stack)))
+            if stack:
+                complete[-1] = True
+                expecting_key = stack[-1] == "{"
+            chars.append(char)
+        else:
+            chars.append(char)
+
+    # Ran out of text with containers still open
+    note(REPAIR_TRUNCATED)
+    truncated_path = _truncated_path(keys, complete)
+    if in_string:
+        if escaped:
+            chars.pop()
+        chars.append('"')
+    value = _try_loads(_close(chars, tuple(stack)))
+    if value is not None:
+        return value, repairs, truncated_path
+    for length, open_containers in reversed(cuts[-_MAX_TRUNCATION_CUTS:]):
+        value = _try_loads(_close(chars[:length], open_containers))
+        if value is not None:
+            return value, repairs, truncated_path
+    return None, repairs, truncated_path
+
+def parse_object(text: str) -> ParsedObject:
+    """
+    The first JSON object in `text`, repaired if needed. Raises ValueError if there is none, or it
+    can't be repaired.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON object found in the output.")
+    end = text.rfind("}")
+    if end > start:
+        value = _try_loads(text[start:end + 1]) # Usual case: a well-formed object, maybe in a fence
+        if isinstance(value, dict):
+            return ParsedObject(value, ())
+    value, repairs, truncated_path = _repair(text[start:])
+    if not isinstance(value, dict):
+        raise ValueError(f"Could not repair the JSON object in the output (tried: {', '.join(repairs) or 'nothing to repair'}).")
+    return ParsedObject(value, tuple(repairs), truncated_path)
@@ -0,0 +1,142 @@
+from typing import Dict, List, Sequence, Tuple
+import bisect
+import math
+import threading
+
+# In-process metrics, rendered in the Prometheus text format by GET /metrics.
+# Counters and histograms are kept per label set in plain dicts under one lock; with a few
+# dozen series, that is cheaper than the locking a client library would add. Values are per
+# process: with several workers, Prometheus scrapes each one (or sums across the targets).
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+_lock = threading.Lock()
+_metrics: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        with _lock:
+            _metrics.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in sorted(self._values.items())]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = ()):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {} # Per bucket, not cumulative
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        label_names = self.label_names + ("le",)
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(label_names, key + (_format_value(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        lines = [line for metric in _metrics for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# Upload pipeline (app/services/resume_pipeline.py). Stage names are the resume_pipeline.STAGE_* values.
+PIPELINE_STAGE_SECONDS = Histogram(
+    "tunecv_pipeline_stage_seconds", "Duration of resume pipeline stages.", ("stage", "outcome"), _SECONDS_BUCKETS,
+)
+
+PDF_PAGE_SECONDS = Histogram(
+    "tunecv_pdf_page_seconds", "Text extraction time per PDF page (app/utils/pdf_text.py).", (), _SECONDS_BUCKETS,
+)
+
+# LLM calls (app/services/llm_service.py). Operation names are extraction, analysis and combined.
+LLM_REQUEST_SECONDS = Histogram(
+    "tunecv_llm_request_seconds", "Duration of LLM requests, including rate limit waits and retries.", ("operation", "outcome"), _SECONDS_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "tunecv_llm_tokens", "Tokens per LLM response, as reported by the model (estimated from text length otherwise).", ("operation", "kind"), _TOKEN_BUCKETS,
+)
+LLM_CACHE_HITS = Counter("tunecv_llm_cache_hits_total", "LLM results served from the result cache.", ("operation",))
+LLM_RETRIES = Counter("tunecv_llm_retries_total", "LLM attempts retried after a transient error.", ("operation", "reason"))
+LLM_THROTTLED = Counter("tunecv_llm_throttled_total", "LLM attempts rejected with a rate limit response (HTTP 429).", ("operation",))
+LLM_HEDGED_REQUESTS = Counter(
+    "tunecv_llm_hedged_requests_total",
+    "LLM requests also sent to the fallback model, after the hedging deadline or an error, by the model that answered.",
+    ("operation", "reason", "winner"),
+)
+LLM_INVALID_OUTPUTS = Counter(
+    "tunecv_llm_invalid_outputs_total", "LLM responses that could not be parsed as JSON or had invalid sections.", ("operation", "reason"),
+)
+LLM_OUTPUT_REPAIRS = Counter("tunecv_llm_output_repairs_total", "Defects repaired in LLM JSON output, by kind.", ("operation", "repair"))
+LLM_SECTION_FOLLOWUPS = Counter(
+    "tunecv_llm_section_followups_total", "Follow-up requests for failed output sections, by how many were recovered.", ("operation", "outcome"),
+)
+
+# HTTP requests (app/main.py), labelled with the route template rather than the raw path
+HTTP_REQUEST_SECONDS = Histogram(
+    "tunecv_http_request_seconds", "Time until the response starts, per route.", ("method", "route", "status"), _SECONDS_BUCKETS,
+)
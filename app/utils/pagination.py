@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Tuple, Union
+import base64
+import json
+
+# Opaque cursors for keyset pagination. A cursor is the sort key of the last row of a page,
+# plus the sort direction it was issued for, as url-safe base64 JSON.
+# The upload time is kept as the database returned it for comparisons (crud_resume.uploaded_at_key):
+# on SQLite that is the stored text, which must be compared as stored, not re-formatted.
+
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(uploaded_at: Union[datetime, str], resume_id: int, descending: bool) -> str:
+    uploaded_at = uploaded_at.isoformat() if isinstance(uploaded_at, datetime) else uploaded_at
+    payload = {"u": uploaded_at, "i": resume_id, "d": descending}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, descending: bool) -> Tuple[str, int]:
+    """
+    Returns the (uploaded_at, id) key encoded in `cursor`, with uploaded_at as encoded.
+    Raises InvalidCursorError if it is malformed or was issued for the other sort direction.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        datetime.fromisoformat(payload["u"]) # Validates it
+        key = (str(payload["u"]), int(payload["i"]))
+        issued_descending = bool(payload["d"])
+    except Exception:
+        raise InvalidCursorError("Invalid pagination cursor.")
+    if issued_descending != descending:
+        raise InvalidCursorError("Pagination cursor does not match the requested sort order.")
+    return key
@@ -0,0 +1,232 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+import io
+import logging
+import multiprocessing
+import queue
+import threading
+
+from app.core.config import settings
+from app.utils import pdf_text
+
+logger = logging.getLogger(__name__)
+
+# Isolated document parsing.
+# PDF/DOCX parsing runs in a pool of subprocesses, each with an address-space limit
+# (RLIMIT_AS). The parent enforces a wall-clock timeout per document and kills a worker
+# that exceeds it. Workers are recycled after PARSE_WORKER_MAX_JOBS documents, or earlier
+# if their peak RSS grows past PARSE_MAX_MEMORY_MB.
+# Long PDFs (PDF_PARALLEL_PAGE_THRESHOLD pages or more) are split into page ranges extracted by
+# several workers at once, up to PDF_PARALLEL_WORKERS: the first worker only counts the pages, and
+# each range is a separate job with its own timeout. Workers themselves extract serially.
+
+class DocumentParseError(Exception):
+    """Base class for documents the sandbox refused to finish parsing."""
+    pass
+
+class DocumentParseTimeout(DocumentParseError):
+    pass
+
+class DocumentParseLimitExceeded(DocumentParseError):
+    pass
+
+class DocumentParseBusy(DocumentParseError):
+    """No parse worker became free in time."""
+    pass
+
+def _worker_main(conn, max_memory_bytes: int) -> None:
+    # Runs in the sandboxed subprocess
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+    except Exception as e: # Not available on every platform
+        logger.warning(f"Could not set memory limit for parse worker: {e}")
+
+    # Nested process pools would escape this worker's limits, so PDFs are extracted serially here;
+    # long ones are split over several workers by the parent instead
+    settings.PDF_PARALLEL_WORKERS = 1
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        kind, payload, file_name, options = message
+        try:
+            with pdf_text.collect_page_timings() as page_seconds:
+                result = _parse(kind, payload, file_name, options)
+        except MemoryError:
+            result = ("memory", f"Parsing '{file_name}' exceeded the memory limit.")
+        except Exception as e:
+            result = ("error", str(e))
+        try:
+            import resource
+            peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except Exception:
+            peak_rss_kb = 0
+        conn.send(result + (peak_rss_kb, page_seconds))
+
+def _parse(kind: str, payload: Union[str, bytes], file_name: str, options: Dict[str, Any]) -> Tuple[str, Any]:
+    # Runs in the sandboxed subprocess
+    from app.utils import file_helpers
+
+    page_range = options.get("page_range")
+    if page_range is not None:
+        stream = open(payload, "rb") if kind == "path" else io.BytesIO(payload)
+        with stream:
+            pages = pdf_text.extract_page_range(stream, *page_range)
+        pdf_text.record_page_timings([page.seconds for page in pages])
+        return "ok", "\n".join(page.text for page in pages)
+
+    split_pages = options.get("split_pages")
+    if split_pages is not None and file_name.lower().endswith(".pdf"):
+        stream = open(payload, "rb") if kind == "path" else io.BytesIO(payload)
+        try:
+            with stream:
+                page_count = pdf_text.count_pages(stream)
+        except MemoryError:
+            raise
+        except Exception:
+            page_count = 0 # Unreadable; the regular extraction below reports it
+        if page_count >= split_pages:
+            return "pages", page_count
+
+    if kind == "path":
+        return "ok", file_helpers.get_text_from_file(payload)
+    return "ok", file_helpers.get_text_from_stream(io.BytesIO(payload), file_name)
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, settings.PARSE_MAX_MEMORY_MB * 1024 * 1024),
+            daemon=True,
+            name="parse-worker",
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self, kill: bool = False) -> None:
+        try:
+            if kill:
+                self.process.kill()
+            else:
+                self.conn.send(None)
+                self.process.join(timeout=1)
+                if self.process.is_alive():
+                    self.process.kill()
+        except Exception:
+            pass
+        self.process.join(timeout=1)
+        self.conn.close()
+
+_ctx = multiprocessing.get_context("spawn")
+_idle_workers: "Optional[queue.Queue[Optional[_Worker]]]" = None
+_pool_lock = threading.Lock()
+
+def _get_idle_queue() -> "queue.Queue[Optional[_Worker]]":
+    global _idle_workers
+    with _pool_lock:
+        if _idle_workers is None:
+            _idle_workers = queue.Queue()
+            # Slots start empty; workers are spawned on first use
+            for _ in range(settings.PARSE_WORKERS):
+                _idle_workers.put(None)
+        return _idle_workers
+
+def shutdown() -> None:
+    global _idle_workers
+    with _pool_lock:
+        idle, _idle_workers = _idle_workers, None
+    if idle is None:
+        return
+    while True:
+        try:
+            worker = idle.get_nowait()
+        except queue.Empty:
+            break
+        if worker is not None:
+            worker.stop()
+
+def _run_in_worker(message: Tuple[str, Union[str, bytes], str, Dict[str, Any]], file_name: str) -> Tuple[str, Any, List[float]]:
+    """
+    Runs one parse job. Returns ("ok", text), or ("pages", page count) for a PDF to split,
+    with the seconds of each PDF page the worker extracted.
+    """
+    idle = _get_idle_queue()
+    try:
+        worker = idle.get(timeout=settings.PARSE_TIMEOUT_SECONDS)
+    except queue.Empty:
+        raise DocumentParseBusy("All document parse workers are busy. Try again later.")
+
+    try:
+        if worker is None or not worker.process.is_alive():
+            worker = _Worker(_ctx)
+        worker.conn.send(message)
+        if not worker.conn.poll(settings.PARSE_TIMEOUT_SECONDS):
+            logger.error(f"Parsing '{file_name}' exceeded {settings.PARSE_TIMEOUT_SECONDS}s, killing worker pid {worker.process.pid}.")
+            worker.stop(kill=True)
+            worker = None
+            raise DocumentParseTimeout(f"Parsing '{file_name}' took longer than {settings.PARSE_TIMEOUT_SECONDS} seconds.")
+        try:
+            status, value, peak_rss_kb, page_seconds = worker.conn.recv()
+        except (EOFError, OSError):
+            # The worker died mid-parse, typically by hitting its memory limit
+            logger.error(f"Parse worker pid {worker.process.pid} died while parsing '{file_name}'.")
+            worker.stop(kill=True)
+            worker = None
+            raise DocumentParseLimitExceeded(f"Parsing '{file_name}' exceeded the resource limits of the parser.")
+
+        worker.jobs += 1
+        if worker.jobs >= settings.PARSE_WORKER_MAX_JOBS or peak_rss_kb > settings.PARSE_MAX_MEMORY_MB * 1024 // 2:
+            # Recycle long-lived or bloated workers before they become a problem
+            worker.stop()
+            worker = None
+
+        if status == "memory":
+            raise DocumentParseLimitExceeded(value)
+        if status == "error":
+            raise RuntimeError(value)
+        return status, value, page_seconds
+    finally:
+        idle.put(worker)
+
+def _split_workers() -> int:
+    # Workers a long PDF is split over; the pool size bounds it
+    return min(settings.PDF_PARALLEL_WORKERS, settings.PARSE_WORKERS)
+
+def _extract_page_ranges(kind: str, payload: Union[str, bytes], file_name: str, page_count: int) -> str:
+    ranges = pdf_text.page_ranges(page_count, _split_workers())
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="parse-range") as executor:
+        futures = [
+            executor.submit(_run_in_worker, (kind, payload, file_name, {"page_range": page_range}), file_name)
+            for page_range in ranges
+        ]
+        results = [future.result() for future in futures]
+    texts = []
+    for _, text, page_seconds in results:
+        texts.append(text)
+        pdf_text.record_page_timings(page_seconds) # Here, in the caller's context, not in the range threads
+    logger.info(f"Extracted {page_count} PDF pages of '{file_name}' in {len(ranges)} sandboxed ranges.")
+    return "\n".join(texts)
+
+def extract_text(source: Union[str, IO[bytes]], file_name: str) -> str:
+    """
+    Extracts text from a saved file path or an upload stream in a sandboxed worker (several, for long PDFs).
+    Raises DocumentParseTimeout, DocumentParseLimitExceeded or DocumentParseBusy.
+    """
+    if isinstance(source, str):
+        kind, payload = "path", source
+    else:
+        source.seek(0)
+        kind, payload = "bytes", source.read()
+    options = {"split_pages": settings.PDF_PARALLEL_PAGE_THRESHOLD} if _split_workers() >= 2 else {}
+    status, value, page_seconds = _run_in_worker((kind, payload, file_name, options), file_name)
+    pdf_text.record_page_timings(page_seconds)
+    if status == "pages":
+        return _extract_page_ranges(kind, payload, file_name, value)
+    return value
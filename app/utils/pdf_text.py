@@ -0,0 +1,129 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Iterator, List, NamedTuple, Optional, Tuple, Union
+import io
+import logging
+import multiprocessing
+import threading
+import time
+
+import PyPDF2
+
+from app.core.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Page-level PDF text extraction.
+# Pages are produced one at a time and joined once by the caller. Documents with at least
+# PDF_PARALLEL_PAGE_THRESHOLD pages are split into page ranges and extracted in a process pool,
+# since PyPDF2 is pure Python and holds the GIL. With the parse sandbox enabled the same split is
+# done over sandbox workers instead (see app/utils/parse_sandbox.py).
+# Per-page extraction times are observed in the page histogram at /metrics and collected for the
+# resume being processed (collect_page_timings), which stores a summary in its stage timings.
+
+class PageText(NamedTuple):
+    page_number: int # 0-based
+    text: str
+    seconds: float # Time spent extracting this page
+
+_page_timings: ContextVar[Optional[List[float]]] = ContextVar("pdf_page_timings", default=None)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn rather than fork: the API process is multi-threaded
+            _executor = ProcessPoolExecutor(max_workers=settings.PDF_PARALLEL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def iter_pdf_pages(reader: PyPDF2.PdfReader, start: int = 0, stop: Optional[int] = None) -> Iterator[PageText]:
+    """
+    Yields the text of each page in [start, stop) together with its extraction time.
+    """
+    stop = len(reader.pages) if stop is None else stop
+    for page_number in range(start, stop):
+        started_at = time.perf_counter()
+        text = reader.pages[page_number].extract_text() or ""
+        yield PageText(page_number, text, time.perf_counter() - started_at)
+
+def _extract_page_range(pdf_bytes: bytes, start: int, stop: int) -> List[PageText]:
+    # Runs in a worker process
+    return extract_page_range(io.BytesIO(pdf_bytes), start, stop)
+
+def extract_page_range(source: IO[bytes], start: int, stop: int) -> List[PageText]:
+    """Extracts pages [start, stop) of a PDF, serially. Used by the pool here and by parse sandbox workers."""
+    source.seek(0)
+    return list(iter_pdf_pages(PyPDF2.PdfReader(source), start, stop))
+
+def count_pages(source: IO[bytes]) -> int:
+    source.seek(0)
+    return len(PyPDF2.PdfReader(source).pages)
+
+def page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """[start, stop) ranges splitting `page_count` pages into at most `parts` contiguous parts."""
+    chunk_size = -(-page_count // parts) # ceil division
+    return [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+
+def extract_pdf_pages(source: Union[str, IO[bytes]], parallel: bool = True) -> List[PageText]:
+    """
+    Extracts all pages of a PDF given as a path or a file-like object, in page order.
+    Large documents are fanned out over the process pool unless `parallel` is False.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return extract_pdf_pages(io.BytesIO(f.read()), parallel=parallel)
+
+    source.seek(0)
+    reader = PyPDF2.PdfReader(source)
+    page_count = len(reader.pages)
+    workers = settings.PDF_PARALLEL_WORKERS
+    if not parallel or workers < 2 or page_count < settings.PDF_PARALLEL_PAGE_THRESHOLD:
+        return list(iter_pdf_pages(reader))
+
+    source.seek(0)
+    pdf_bytes = source.read()
+    ranges = page_ranges(page_count, workers)
+    executor = _get_executor()
+    futures = [executor.submit(_extract_page_range, pdf_bytes, start, stop) for start, stop in ranges]
+    pages: List[PageText] = []
+    for future in futures:
+        pages.extend(future.result())
+    logger.info(f"Extracted {page_count} PDF pages in {len(ranges)} parallel ranges.")
+    return pages
+
+@contextmanager
+def collect_page_timings() -> Iterator[List[float]]:
+    """Collects the seconds of every page recorded (record_page_timings) in this context, in order."""
+    collected: List[float] = []
+    token = _page_timings.set(collected)
+    try:
+        yield collected
+    finally:
+        _page_timings.reset(token)
+
+def record_page_timings(page_seconds: List[float]) -> None:
+    """Observes per-page extraction times and adds them to the active collector, if any."""
+    for seconds in page_seconds:
+        metrics.PDF_PAGE_SECONDS.observe(seconds)
+    collected = _page_timings.get()
+    if collected is not None:
+        collected.extend(page_seconds)
+
+def log_page_timings(pages: List[PageText], label: str) -> None:
+    if not pages:
+        return
+    slowest = max(pages, key=lambda page: page.seconds)
+    total_seconds = sum(page.seconds for page in pages)
+    logger.info(f"PDF page timings for {label}: {len(pages)} pages, {total_seconds:.3f}s total, slowest page {slowest.page_number + 1} ({slowest.seconds:.3f}s)")
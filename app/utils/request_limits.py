@@ -0,0 +1,41 @@
+from typing import Mapping
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Request body size limits for the upload routes, enforced before the multipart body is parsed.
+# A declared Content-Length above the limit is rejected with 413 without reading the body; a body
+# sent without one (chunked) is counted as it arrives and cut off with 413 once it exceeds the limit.
+# FastAPI passes an HTTPException raised while it reads the body through as the response.
+
+MULTIPART_OVERHEAD_BYTES = 64 * 1024 # Allowance for part headers and boundaries around a single file
+
+class RequestSizeLimitMiddleware:
+    def __init__(self, app: ASGIApp, limits: Mapping[str, int]):
+        self.app = app
+        self.limits = dict(limits) # Request path -> maximum body size in bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds the maximum size of {max_bytes} bytes."
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received_bytes = 0
+        async def limited_receive() -> Message:
+            nonlocal received_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                received_bytes += len(message.get("body", b""))
+                if received_bytes > max_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
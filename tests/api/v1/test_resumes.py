@@ -0,0 +1,134 @@
+import time
+
+from app.core.config import settings
+from app.crud import crud_resume
+from app.services import upload_jobs
+
+def test_resume_page_follows_next_cursor_without_repeats(client, db):
+    ids = [crud_resume.create_resume_entry(db, file_name=f"resume_{index}.pdf").id for index in range(3)]
+    seen, params = [], {"limit": 1}
+    for _ in range(10):
+        page = client.get("/api/v1/resumes/page", params=params).json()
+        seen.extend(item["id"] for item in page["items"])
+        if page["next_cursor"] is None:
+            break
+        params = {"limit": 1, "cursor": page["next_cursor"]}
+    assert seen == sorted(ids, reverse=True)
+
+def test_resume_page_rejects_malformed_cursor(client):
+    response = client.get("/api/v1/resumes/page", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_search_returns_ranked_summaries(client, db):
+    resume_id = crud_resume.create_resumes_bulk(db, [{"file_name": "a.pdf", "name": "Jane Roe", "summary": "Rust developer", "raw_text": "Rust and WebAssembly"}])[0]
+    crud_resume.create_resumes_bulk(db, [{"file_name": "b.pdf", "summary": "Designer", "raw_text": "Figma"}])
+    response = client.get("/api/v1/resumes/search", params={"q": "rust"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [resume_id]
+
+def test_resume_details_answer_conditional_requests(client, db):
+    resume_id = crud_resume.create_resume_entry(db, file_name="resume.pdf", raw_text="Jane Roe").id
+    response = client.get(f"/api/v1/resumes/{resume_id}")
+    assert response.status_code == 200
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    assert client.get(f"/api/v1/resumes/{resume_id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/api/v1/resumes/{resume_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    other_variant = client.get(f"/api/v1/resumes/{resume_id}", params={"exclude": "raw_text"}, headers={"If-None-Match": etag})
+    assert other_variant.status_code == 200
+
+def test_resume_update_changes_the_etag(client, db):
+    resume_id = crud_resume.create_resume_entry(db, file_name="resume.pdf").id
+    etag = client.get(f"/api/v1/resumes/{resume_id}").headers["etag"]
+    crud_resume.update_processing_state(db, resume_id, summary="Updated")
+    response = client.get(f"/api/v1/resumes/{resume_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["summary"] == "Updated"
+
+def test_background_upload_is_polled_until_completed(client, db):
+    response = client.post(
+        "/api/v1/resumes/upload", params={"background": "true"},
+        files={"file": ("resume.txt", b"Jane Roe\njane@example.com\nPython developer", "text/plain")},
+    )
+    assert response.status_code == 202
+    job_url = response.headers["location"]
+    assert job_url == f"/api/v1/resumes/jobs/{response.json()['id']}"
+    for _ in range(500):
+        job = client.get(job_url).json()
+        if job["stage"] in ("completed", "failed"):
+            break
+        time.sleep(0.02)
+    assert job["stage"] == "completed", job["error"]
+    assert job["result"]["id"] == job["resume_id"]
+    upload_jobs.shutdown_workers()
+
+def test_background_upload_is_rejected_when_the_queue_is_full(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_JOB_MAX_PENDING", 0)
+    response = client.post(
+        "/api/v1/resumes/upload", params={"background": "true"},
+        files={"file": ("resume.txt", b"Jane Roe", "text/plain")},
+    )
+    assert response.status_code == 503
+    upload_jobs.shutdown_workers()
+
+def test_unknown_job_is_not_found(client):
+    assert client.get("/api/v1/resumes/jobs/0123456789abcdef").status_code == 404
+
+def test_upload_runs_the_async_pipeline(client, db):
+    files = {"file": ("resume.txt", b"Jane Roe\njane@example.com\nPython developer", "text/plain")}
+    response = client.post("/api/v1/resumes/upload", files=files)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["duplicate_of"] is None
+    assert body["data"]["email"] == "jane@example.com"
+
+    again = client.post("/api/v1/resumes/upload", params={"on_duplicate": "existing"}, files=files).json()
+    assert (again["resume_id"], again["duplicate_of"]) == (body["resume_id"], body["resume_id"])
+
+def test_export_streams_uncompressed_csv(client, db):
+    crud_resume.create_resumes_bulk(db, [{"file_name": f"resume_{index}.pdf", "summary": "x" * 2000, "llm_analysis": {"strength_areas": ["Python"]}} for index in range(3)])
+    with client.stream("GET", "/api/v1/resumes/export", params={"format": "csv"}, headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "content-encoding" not in response.headers # Not re-buffered by the gzip middleware
+        assert response.headers["content-disposition"].startswith('attachment; filename="resumes-')
+        body = response.read().decode()
+    assert len(body.splitlines()) == 4
+
+def test_export_rejects_an_empty_date_range(client):
+    response = client.get("/api/v1/resumes/export", params={"uploaded_after": "2026-01-02T00:00:00Z", "uploaded_before": "2026-01-01T00:00:00"})
+    assert response.status_code == 400
+
+def test_batch_upload_expands_zip_archives(client, db):
+    import io
+    import zipfile
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("resumes/jane.txt", "Jane Roe\njane@example.com\nPython developer")
+        zip_file.writestr("resumes/notes.md", "Not a resume")
+    files = [
+        ("files", ("jane.txt", b"Jane Roe\njane@example.com\nPython developer", "text/plain")),
+        ("files", ("resumes.zip", archive.getvalue(), "application/zip")),
+        ("files", ("broken.zip", b"not a zip", "application/zip")),
+    ]
+    response = client.post("/api/v1/resumes/batch", files=files)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["total"], body["processed"], body["failed"]) == (3, 2, 1)
+    assert [result["file_name"] for result in body["results"]] == ["broken.zip", "jane.txt", "jane.txt"]
+
+def test_batch_upload_rejects_too_many_documents(client, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 1)
+    files = [("files", (f"resume_{index}.txt", b"Jane Roe", "text/plain")) for index in range(2)]
+    assert client.post("/api/v1/resumes/batch", files=files).status_code == 413
+
+def test_reprocess_completes_a_resume_without_analysis(client, db):
+    resume_id = crud_resume.create_resume_entry(db, file_name="resume.txt", raw_text="Jane Roe\njane@example.com\nPython developer").id
+    response = client.post(f"/api/v1/resumes/{resume_id}/reprocess")
+    assert response.status_code == 200, response.text
+    assert response.json()["message"] == "Resume reprocessed from stage 'llm_extraction'."
+    assert response.json()["data"]["processing_status"] == "completed"
+    assert client.post(f"/api/v1/resumes/{resume_id}/reprocess", params={"from_stage": "parsing"}).status_code == 422
+    assert client.post("/api/v1/resumes/0/reprocess").status_code == 404
@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+# Settings are read once, at import: point the app at a throwaway SQLite database and the local
+# stub LLM before anything from app is imported.
+_work_dir = tempfile.mkdtemp(prefix="tunecv-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_work_dir, 'test.db')}"
+os.environ["VECTOR_INDEX_DIR"] = os.path.join(_work_dir, "vector_index")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["LLM_CACHE_PERSISTENT"] = "false"
+os.environ["PARSE_SANDBOX_ENABLED"] = "false"
+os.environ["LLM_REQUESTS_PER_MINUTE"] = "6000"
+os.environ["LLM_STUB_LATENCY_SECONDS"] = "0.01"
+
+import pytest
+
+from app.db import models
+from app.db.database import SessionLocal, init_db
+from app.utils import http_cache
+
+init_db()
+
+@pytest.fixture
+def db():
+    """A session on an empty database."""
+    session = SessionLocal()
+    try:
+        for model in (models.UploadJob, models.Resume, models.ResumeStatCounter, models.LLMCacheEntry, models.BackfillRun):
+            session.execute(model.__table__.delete())
+        session.commit()
+        http_cache.clear()
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
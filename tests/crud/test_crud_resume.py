@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from app.crud import crud_resume
+from app.utils import pagination
+
+def _create_resumes(db, count):
+    # uploaded_at comes from the server default, so these usually share a timestamp
+    return [crud_resume.create_resume_entry(db, file_name=f"resume_{index}.pdf").id for index in range(count)]
+
+def _all_pages(db, descending):
+    seen, after = [], None
+    for _ in range(10):
+        rows = crud_resume.get_resume_page(db, limit=1, after=after, descending=descending)
+        if not rows:
+            return seen
+        seen.append(rows[0].id)
+        cursor = pagination.encode_cursor(rows[0].cursor_uploaded_at, rows[0].id, descending)
+        after = pagination.decode_cursor(cursor, descending)
+    raise AssertionError(f"Paging did not end: {seen}")
+
+def test_resume_page_descending_visits_each_row_once(db):
+    ids = _create_resumes(db, 3)
+    assert _all_pages(db, descending=True) == sorted(ids, reverse=True)
+
+def test_resume_page_ascending_visits_each_row_once(db):
+    ids = _create_resumes(db, 3)
+    assert _all_pages(db, descending=False) == sorted(ids)
+
+def test_date_range_includes_its_start_and_excludes_its_end(db):
+    [resume_id] = _create_resumes(db, 1)
+    stored = datetime.fromisoformat(crud_resume.get_resume_page(db, limit=1)[0].cursor_uploaded_at)
+    def page_ids(**filters):
+        return [row.id for row in crud_resume.get_resume_page(db, limit=10, **filters)]
+    assert page_ids(uploaded_after=stored) == [resume_id]
+    assert page_ids(uploaded_after=stored.replace(tzinfo=timezone.utc)) == [resume_id] # Stored as UTC
+    assert page_ids(uploaded_before=stored) == []
+    assert page_ids(uploaded_before=stored + timedelta(microseconds=1)) == [resume_id]
+    assert page_ids(uploaded_after=stored + timedelta(microseconds=1)) == []
+    exported = crud_resume.iter_resume_rows(db, ["id"], uploaded_after=stored, uploaded_before=stored + timedelta(seconds=1), processed_only=False)
+    assert [row.id for row in exported] == [resume_id]
+
+def test_prefix_filters_match_like_characters_literally(db):
+    crud_resume.create_resumes_bulk(db, [
+        {"file_name": "100%_done.pdf", "name": "Jane_Roe"},
+        {"file_name": "1000_done.pdf", "name": "JaneXRoe"},
+    ])
+    assert [row.file_name for row in crud_resume.get_resume_page(db, limit=10, file_name_prefix="100%")] == ["100%_done.pdf"]
+    assert [row.name for row in crud_resume.get_resume_page(db, limit=10, name_prefix="Jane_")] == ["Jane_Roe"]
@@ -0,0 +1,78 @@
+import asyncio
+import io
+
+from app.api.v1 import schemas
+from app.crud import crud_resume_async, crud_stats
+from app.db import database, models
+from app.services import resume_pipeline
+
+ANALYSIS = {"resume_rating": {"overall_score": 8}, "upskill_suggestions": []}
+
+def _run(coroutine_function):
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            return await coroutine_function(db)
+    return asyncio.run(run())
+
+def test_async_engine_uses_the_async_sqlite_driver():
+    assert database.async_engine.dialect.driver == "aiosqlite"
+
+def test_created_entry_loads_with_its_payload(db):
+    async def create(async_db):
+        db_resume = await crud_resume_async.create_resume_entry(async_db, file_name="resume.pdf", raw_text="Jane Roe", content_hash="a" * 64)
+        return (await crud_resume_async.get_resume_by_id(async_db, db_resume.id))
+    db_resume = _run(create)
+    assert db_resume.raw_text == "Jane Roe" # Loaded, not lazy: lazy loads fail on an AsyncSession
+    assert db_resume.processing_status == models.PROCESSING_STATUS_PROCESSING
+
+def test_update_applies_stat_deltas_and_bumps_the_version(db):
+    async def process(async_db):
+        db_resume = await crud_resume_async.create_resume_entry(async_db, file_name="resume.pdf")
+        version = db_resume.version
+        update = schemas.ResumeUpdate(file_name="resume.pdf", technical_skills=["Python"], llm_analysis=ANALYSIS)
+        db_resume = await crud_resume_async.update_resume_with_extracted_data(async_db, db_resume.id, update)
+        assert db_resume.version != version
+        update = schemas.ResumeUpdate(file_name="resume.pdf", technical_skills=["Rust"], llm_analysis=ANALYSIS)
+        return await crud_resume_async.update_resume_with_extracted_data(async_db, db_resume.id, update)
+    db_resume = _run(process)
+    assert db_resume.technical_skills == ["Rust"]
+    counters = crud_stats.get_all_counters(db)
+    assert counters[("technical_skill", "rust")] == (1, 0.0)
+    assert counters[("technical_skill", "python")] == (0, 0.0)
+    assert counters[("resumes", "processed")] == (1, 0.0)
+
+def test_duplicates_are_found_and_copied(db):
+    async def copy(async_db):
+        source = await crud_resume_async.create_resume_entry(async_db, file_name="a.pdf", raw_text="Jane Roe", content_hash="b" * 64)
+        assert await crud_resume_async.get_processed_resume_by_hash(async_db, "b" * 64) is None # Not processed yet
+        await crud_resume_async.update_resume_with_extracted_data(async_db, source.id, schemas.ResumeUpdate(file_name="a.pdf", llm_analysis=ANALYSIS))
+        source = await crud_resume_async.get_processed_resume_by_hash(async_db, "b" * 64)
+        return source, await crud_resume_async.copy_resume_entry(async_db, source, file_name="b.pdf", content_hash="b" * 64)
+    source, copied = _run(copy)
+    assert copied.id != source.id
+    assert (copied.file_name, copied.raw_text, copied.llm_analysis) == ("b.pdf", "Jane Roe", source.llm_analysis)
+    assert crud_stats.get_all_counters(db)[("resumes", "processed")] == (2, 0.0)
+
+def test_processing_state_update_reports_missing_rows(db):
+    async def update(async_db):
+        db_resume = await crud_resume_async.create_resume_entry(async_db, file_name="resume.pdf")
+        return (
+            await crud_resume_async.update_processing_state(async_db, db_resume.id, failed_stage="llm_analysis"),
+            await crud_resume_async.update_processing_state(async_db, db_resume.id + 1000, failed_stage="llm_analysis"),
+        )
+    assert _run(update) == (True, False)
+
+def test_async_pipeline_processes_and_deduplicates(db):
+    text = b"Jane Roe\njane@example.com\nPython developer"
+    async def upload(on_duplicate):
+        return await resume_pipeline.aprocess_resume_file(
+            database.AsyncSessionLocal, io.BytesIO(text), "resume.txt", content_hash="c" * 64, on_duplicate=on_duplicate,
+        )
+    first = asyncio.run(upload(resume_pipeline.DUPLICATE_REUSE))
+    assert first.duplicate_of is None
+    assert first.resume.processing_status == models.PROCESSING_STATUS_COMPLETED
+    assert first.resume.email == "jane@example.com"
+    existing = asyncio.run(upload(resume_pipeline.DUPLICATE_EXISTING))
+    assert (existing.resume.id, existing.duplicate_of) == (first.resume.id, first.resume.id)
+    reused = asyncio.run(upload(resume_pipeline.DUPLICATE_REUSE))
+    assert reused.duplicate_of == first.resume.id and reused.resume.id != first.resume.id
@@ -0,0 +1,49 @@
+from app.crud import crud_resume, crud_resume_search
+
+def _create(db, **columns):
+    return crud_resume.create_resumes_bulk(db, [{"file_name": "resume.pdf", **columns}])[0]
+
+def _search(db, **filters):
+    return [row.id for row in crud_resume_search.search_resumes(db, **filters)]
+
+def test_keywords_use_the_fts_table(db):
+    python_dev = _create(db, summary="Python developer", raw_text="Built APIs with FastAPI and PostgreSQL.")
+    designer = _create(db, summary="Designer", raw_text="Figma and Photoshop.")
+    assert _search(db, keywords="postgresql") == [python_dev]
+    assert _search(db, keywords="figma photoshop") == [designer]
+    assert _search(db, keywords="python figma") == [] # Terms are ANDed
+
+def test_keywords_with_fts_syntax_are_quoted(db):
+    resume_id = _create(db, summary="C++ developer", raw_text="Knows C++ and NEAR things")
+    assert _search(db, keywords='c++ "near') == [resume_id]
+
+def test_better_matches_rank_first(db):
+    once = _create(db, summary="Engineer", raw_text="Some Kubernetes.")
+    often = _create(db, summary="Kubernetes engineer", raw_text="Kubernetes, Kubernetes operators and Kubernetes upgrades.")
+    assert _search(db, keywords="kubernetes") == [often, once]
+
+def test_updated_and_deleted_resumes_follow_the_fts_table(db):
+    resume_id = _create(db, summary="Java developer", raw_text="Spring")
+    crud_resume.update_processing_state(db, resume_id, summary="Go developer")
+    assert _search(db, keywords="java") == []
+    assert _search(db, keywords="go") == [resume_id]
+    crud_resume.delete_resume(db, resume_id)
+    assert _search(db, keywords="go") == []
+
+def test_skill_filters_match_any_or_all(db):
+    both = _create(db, technical_skills=["Python", "SQL"], soft_skills=["Teamwork"])
+    python_only = _create(db, technical_skills=["Python"], soft_skills=[])
+    assert sorted(_search(db, technical_skills=["Python", "SQL"])) == sorted([both, python_only])
+    assert _search(db, technical_skills=["Python", "SQL"], match_all=True) == [both]
+    assert _search(db, soft_skills=["Teamwork"]) == [both]
+
+def test_certification_filter_matches_names(db):
+    certified = _create(db, certifications=[{"name": "AWS Solutions Architect"}, {"name": "CKA"}])
+    _create(db, certifications=[{"name": "PMP"}])
+    assert _search(db, certifications=["CKA"]) == [certified]
+    assert _search(db, certifications=["CKA", "PMP"], match_all=True) == []
+
+def test_keywords_and_skills_combine(db):
+    match = _create(db, summary="Data engineer", raw_text="Spark pipelines", technical_skills=["Python"])
+    _create(db, summary="Data engineer", raw_text="Spark pipelines", technical_skills=["Scala"])
+    assert _search(db, keywords="spark", technical_skills=["Python"]) == [match]
@@ -0,0 +1,78 @@
+import pytest
+
+from app import cli
+from app.api.v1 import schemas
+from app.crud import crud_resume, crud_stats
+
+ANALYSIS = {"resume_rating": {"overall_score": 7.5}, "upskill_suggestions": [{"skill_name": "Kubernetes"}]}
+
+def _rebuild_check():
+    cli.main(["rebuild-stats", "--check"]) # Exits with status 1 if any counter differs
+
+def test_contributions_normalize_and_bucket():
+    deltas = crud_stats.contributions({
+        "technical_skills": [" Python ", "python", "SQL", 3], "soft_skills": None,
+        "llm_analysis": {"resume_rating": {"overall_score": 12}, "upskill_suggestions": [{"skill_name": "Go"}, "Rust"]},
+    })
+    assert deltas == {
+        ("resumes", "processed"): (1, 0.0),
+        ("score", "overall"): (1, 12.0),
+        ("score_bucket", "10"): (1, 0.0), # Clamped to MAX_SCORE
+        ("technical_skill", "python"): (1, 0.0),
+        ("technical_skill", "sql"): (1, 0.0),
+        ("upskill", "go"): (1, 0.0),
+    }
+    assert crud_stats.contributions({"technical_skills": ["Python"], "llm_analysis": None}) == {}
+
+def test_deltas_are_added_to_the_stored_counters(db):
+    crud_stats.apply_deltas(db, {("technical_skill", "python"): (2, 0.0), ("score", "overall"): (1, 7.5)})
+    crud_stats.apply_deltas(db, {("technical_skill", "python"): (-1, 0.0), ("score", "overall"): (1, 2.5)})
+    db.commit()
+    assert crud_stats.get_all_counters(db) == {("technical_skill", "python"): (1, 0.0), ("score", "overall"): (2, 10.0)}
+    assert [counter.key for counter in crud_stats.get_counters(db, "technical_skill")] == ["python"]
+    crud_stats.apply_deltas(db, {("technical_skill", "python"): (-1, 0.0)})
+    db.commit()
+    assert crud_stats.get_counters(db, "technical_skill") == [] # Zero counters are not listed
+
+def test_diff_skips_unchanged_counters():
+    old = {("technical_skill", "python"): (1, 0.0), ("technical_skill", "sql"): (1, 0.0)}
+    new = {("technical_skill", "python"): (1, 0.0), ("technical_skill", "rust"): (1, 0.0)}
+    assert crud_stats.diff(old, new) == {("technical_skill", "sql"): (-1, 0.0), ("technical_skill", "rust"): (1, 0.0)}
+
+def test_resume_writes_keep_the_counters_in_step_with_a_rebuild(db):
+    [first, second] = crud_resume.create_resumes_bulk(db, [
+        {"file_name": "a.pdf", "technical_skills": ["Python", "SQL"], "llm_analysis": ANALYSIS},
+        {"file_name": "b.pdf", "technical_skills": ["python"], "llm_analysis": ANALYSIS},
+    ])
+    _rebuild_check()
+    assert crud_stats.get_counter(db, "technical_skill", "python").count == 2
+
+    crud_resume.update_resume_with_extracted_data(db, first, schemas.ResumeUpdate(
+        file_name="a.pdf", technical_skills=["Rust"], llm_analysis={"resume_rating": {"overall_score": 3}},
+    ))
+    _rebuild_check()
+    crud_resume.copy_resume_entry(db, crud_resume.get_resume_by_id(db, second), file_name="copy.pdf")
+    _rebuild_check()
+    crud_resume.delete_resume(db, second)
+    _rebuild_check()
+    unprocessed = crud_resume.create_resume_entry(db, file_name="c.pdf").id
+    crud_resume.update_processing_state(db, unprocessed, technical_skills=["Go"])
+    _rebuild_check()
+
+    db.expire_all()
+    assert crud_stats.get_counter(db, "resumes", "processed").count == 2
+    assert crud_stats.get_counter(db, "technical_skill", "python").count == 1
+    assert crud_stats.get_counter(db, "score", "overall").total == pytest.approx(10.5)
+
+def test_rebuild_check_fails_on_drift_and_rebuild_repairs_it(db):
+    crud_resume.create_resumes_bulk(db, [{"file_name": "a.pdf", "technical_skills": ["Python"], "llm_analysis": ANALYSIS}])
+    crud_stats.apply_deltas(db, {("technical_skill", "python"): (5, 0.0), ("technical_skill", "cobol"): (1, 0.0)})
+    db.commit()
+    with pytest.raises(SystemExit) as exit_info:
+        _rebuild_check()
+    assert exit_info.value.code == 1
+    cli.main(["rebuild-stats"])
+    _rebuild_check()
+    db.expire_all()
+    assert crud_stats.get_counter(db, "technical_skill", "python").count == 1
+    assert crud_stats.get_counter(db, "technical_skill", "cobol") is None
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from app import cli
+from app.core.config import settings
+from app.crud import crud_backfill, crud_resume
+from app.db import database, models
+from app.services import backfill, llm_service, resume_pipeline
+
+from tests.services.test_pre_extractor import RESUME
+
+ANALYSIS_ONLY = backfill.BackfillOptions(stage=resume_pipeline.STAGE_LLM_ANALYSIS)
+
+@pytest.fixture
+def processed_ids(monkeypatch):
+    # Resume IDs sent to the LLM stages (concurrently within a batch, so in no particular order)
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "two_step")
+    ids = []
+    process = backfill._process
+    def recorded(work):
+        ids.append(work.resume_id)
+        return process(work)
+    monkeypatch.setattr(backfill, "_process", recorded)
+    return ids
+
+def _stored(db, count, analysis_version="old"):
+    return crud_resume.create_resumes_bulk(db, [
+        {"file_name": f"resume_{index}.txt", "raw_text": RESUME, "extracted_data": {"name": "Jane Roe"},
+         "llm_analysis": {"strength_areas": ["Old"]}, "analysis_version": analysis_version}
+        for index in range(count)
+    ])
+
+def _run(name, options=ANALYSIS_ONLY, batch_size=2, stop=None):
+    return backfill.run(database.SessionLocal, name, options, concurrency=2, batch_size=batch_size, stop=stop)
+
+def test_only_resumes_with_old_results_are_processed(db, processed_ids):
+    stale = _stored(db, 3)
+    current = _stored(db, 1, analysis_version=llm_service.ANALYSIS_RESULT_VERSION)
+    report = _run("analysis")
+    assert (report.status, report.succeeded, report.failed) == (crud_backfill.RUN_STATUS_COMPLETED, 3, 0)
+    assert sorted(processed_ids) == stale
+    db.expire_all()
+    db_resume = db.get(models.Resume, stale[0])
+    assert db_resume.analysis_version == llm_service.ANALYSIS_RESULT_VERSION
+    assert db_resume.llm_analysis != {"strength_areas": ["Old"]}
+    assert db_resume.extracted_data == {"name": "Jane Roe"} # The stored extraction is reused
+
+    _run("forced", ANALYSIS_ONLY._replace(force=True))
+    assert sorted(processed_ids) == sorted(stale + stale + current)
+
+def test_resume_changed_during_its_batch_is_left_alone(db, processed_ids, monkeypatch):
+    [edited, other] = _stored(db, 2)
+    process = backfill._process
+    def edit_then_process(work):
+        if work.resume_id == edited:
+            with database.SessionLocal() as edit_db:
+                crud_resume.update_processing_state(edit_db, edited, summary="Edited meanwhile")
+        return process(work)
+    monkeypatch.setattr(backfill, "_process", edit_then_process)
+    report = _run("conflict")
+    assert (report.succeeded, report.skipped) == (1, 1)
+    db.expire_all()
+    assert db.get(models.Resume, edited).analysis_version == "old"
+    assert db.get(models.Resume, edited).summary == "Edited meanwhile"
+    assert db.get(models.Resume, other).analysis_version == llm_service.ANALYSIS_RESULT_VERSION
+
+def test_stopped_run_continues_after_its_last_stored_batch(db, processed_ids, monkeypatch):
+    ids = _stored(db, 5)
+    stop = threading.Event()
+    process = backfill._process
+    def stop_during_first_batch(work):
+        stop.set()
+        return process(work)
+    monkeypatch.setattr(backfill, "_process", stop_during_first_batch)
+    report = _run("resumable", stop=stop)
+    assert (report.status, report.last_resume_id) == (crud_backfill.RUN_STATUS_STOPPED, ids[1])
+    assert sorted(processed_ids) == ids[:2]
+
+    monkeypatch.setattr(backfill, "_process", process)
+    report = _run("resumable", ANALYSIS_ONLY._replace(force=True)) # A continued run keeps its original options
+    assert (report.status, report.succeeded, report.last_resume_id) == (crud_backfill.RUN_STATUS_COMPLETED, 3, ids[-1])
+    assert sorted(processed_ids) == ids
+    db_run = crud_backfill.get_run(db, "resumable")
+    assert (db_run.succeeded, db_run.failed, db_run.options["force"]) == (5, 0, False)
+    assert _run("resumable").succeeded == 5 # Completed runs are not repeated
+    assert sorted(processed_ids) == ids
+
+def test_batch_where_everything_failed_stops_without_advancing(db, processed_ids, monkeypatch):
+    ids = _stored(db, 3)
+    monkeypatch.setattr(llm_service, "analyze_resume_content", lambda *args, **kwargs: {"error": "Model unavailable"})
+    report = _run("outage")
+    assert (report.status, report.last_resume_id) == (crud_backfill.RUN_STATUS_STOPPED, 0)
+    assert sorted(processed_ids) == ids[:2]
+
+def test_partly_failed_batch_records_its_failures(db, processed_ids, monkeypatch):
+    [failing, working] = _stored(db, 2)
+    process = backfill._process
+    def fail_one(work):
+        return (RuntimeError("Invalid JSON"), 0.0) if work.resume_id == failing else process(work)
+    monkeypatch.setattr(backfill, "_process", fail_one)
+    report = _run("partial")
+    assert (report.status, report.succeeded, report.failed) == (crud_backfill.RUN_STATUS_COMPLETED, 1, 1)
+    db_run = crud_backfill.get_run(db, "partial")
+    assert (db_run.last_resume_id, db_run.failed_resume_ids) == (working, [failing])
+
+def test_dry_run_estimates_without_processing(db, processed_ids, caplog):
+    _stored(db, 4)
+    _stored(db, 1, analysis_version=llm_service.ANALYSIS_RESULT_VERSION)
+    assert backfill.estimate(database.SessionLocal, ANALYSIS_ONLY) == {"candidates": 4, "resumes": 4, "llm_calls": 4}
+    assert backfill.estimate(database.SessionLocal, ANALYSIS_ONLY._replace(limit=3)) == {"candidates": 4, "resumes": 3, "llm_calls": 3}
+    extraction = backfill.BackfillOptions(stage=resume_pipeline.STAGE_LLM_EXTRACTION)
+    assert backfill.estimate(database.SessionLocal, extraction)["llm_calls"] == 2 * 5 # No extraction_version stored
+    with caplog.at_level("INFO"):
+        cli.main(["backfill", "--stage", "llm_analysis", "--dry-run"])
+    assert "Dry run: 4 of 4 candidate resumes" in caplog.text
+    assert processed_ids == []
+    assert crud_backfill.get_runs(db) == []
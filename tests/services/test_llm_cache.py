@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.db import models
+from app.services import llm_cache
+
+@pytest.fixture
+def cache(db, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_CACHE_PERSISTENT", True)
+    llm_cache.clear_memory()
+    yield
+    llm_cache.clear_memory()
+
+def _key(text):
+    return llm_cache.make_key("extraction", "v1", "model", text)
+
+def test_keys_ignore_whitespace_but_not_version_or_model():
+    assert _key("Jane  Roe\n") == _key("Jane Roe")
+    assert llm_cache.make_key("extraction", "v2", "model", "Jane Roe") != _key("Jane Roe")
+    assert llm_cache.make_key("extraction", "v1", "other", "Jane Roe") != _key("Jane Roe")
+
+def test_hit_returns_a_copy_of_the_stored_value(cache):
+    llm_cache.put(_key("Jane Roe"), "extraction", {"skills": ["Python"]}, llm_seconds=2.0)
+    value = llm_cache.get(_key("Jane Roe"))
+    assert value == {"skills": ["Python"]}
+    value["skills"].append("SQL")
+    assert llm_cache.get(_key("Jane Roe")) == {"skills": ["Python"]}
+    assert llm_cache.get(_key("John Doe")) is None
+
+def test_database_tier_serves_after_the_memory_tier_is_cleared(cache, db):
+    llm_cache.put(_key("Jane Roe"), "extraction", {"name": "Jane Roe"}, llm_seconds=1.5)
+    llm_cache.clear_memory()
+    before = llm_cache.stats()
+    assert llm_cache.get(_key("Jane Roe")) == {"name": "Jane Roe"}
+    after = llm_cache.stats()
+    assert after["db_hits"] == before["db_hits"] + 1
+    assert after["saved_llm_seconds"] == pytest.approx(before["saved_llm_seconds"] + 1.5)
+    assert db.get(models.LLMCacheEntry, _key("Jane Roe")).hit_count == 1
+    assert llm_cache.get(_key("Jane Roe")) == {"name": "Jane Roe"} # Now back in memory
+    assert llm_cache.stats()["memory_hits"] == after["memory_hits"] + 1
+
+def test_expired_entries_are_misses_in_both_tiers(cache, db, monkeypatch):
+    llm_cache.put(_key("Jane Roe"), "extraction", {"name": "Jane Roe"})
+    monkeypatch.setattr(settings, "LLM_CACHE_TTL_SECONDS", -1)
+    assert llm_cache.get(_key("Jane Roe")) is None
+    assert llm_cache.evict_persistent(db) == 1
+    assert db.get(models.LLMCacheEntry, _key("Jane Roe")) is None
+
+def test_memory_tier_keeps_the_most_recently_used_entries(cache, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_PERSISTENT", False)
+    monkeypatch.setattr(settings, "LLM_CACHE_MEMORY_ENTRIES", 2)
+    for text in ("a", "b"):
+        llm_cache.put(_key(text), "extraction", {"text": text})
+    llm_cache.get(_key("a"))
+    llm_cache.put(_key("c"), "extraction", {"text": "c"})
+    assert [llm_cache.get(_key(text)) is not None for text in ("a", "b", "c")] == [True, False, True]
+
+def test_eviction_removes_least_recently_used_rows_over_the_size_budget(cache, db, monkeypatch):
+    for text in ("a", "b", "c"):
+        llm_cache.put(_key(text), "extraction", {"text": text * 100})
+    started = datetime.now(timezone.utc) - timedelta(hours=1)
+    for offset, text in enumerate(("b", "a", "c")): # b is the least recently used, c the most
+        db.get(models.LLMCacheEntry, _key(text)).last_accessed_at = started + timedelta(minutes=offset)
+    db.commit()
+    entry_bytes = db.get(models.LLMCacheEntry, _key("a")).size_bytes
+    monkeypatch.setattr(settings, "LLM_CACHE_MAX_DB_BYTES", 2 * entry_bytes)
+    assert llm_cache.evict_persistent(db) == 1
+    db.expire_all()
+    assert [db.get(models.LLMCacheEntry, _key(text)) is not None for text in ("a", "b", "c")] == [True, False, True]
+
+def test_eviction_runs_every_interval_of_writes(cache, db, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_EVICTION_INTERVAL", 1)
+    monkeypatch.setattr(settings, "LLM_CACHE_MAX_DB_BYTES", 0)
+    llm_cache.put(_key("a"), "extraction", {"text": "a"})
+    assert db.query(models.LLMCacheEntry).count() == 0
+
+def test_disabled_cache_stores_nothing(cache, db, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    llm_cache.put(_key("a"), "extraction", {"text": "a"})
+    assert llm_cache.get(_key("a")) is None
+    assert db.query(models.LLMCacheEntry).count() == 0
@@ -0,0 +1,97 @@
+from app.core.config import settings
+from app.services import llm_cache, llm_output, llm_providers, llm_service
+
+def test_answer_from_fallback_model_is_cached(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FALLBACK_MODEL", "stub")
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+    llm_cache.clear_memory()
+
+    def failing_primary(operation, primary, params):
+        raise RuntimeError("primary model unavailable")
+
+    monkeypatch.setattr(llm_service, "_call_primary", failing_primary)
+    fallback = llm_providers.get_model(llm_providers.fallback_spec())
+    calls = fallback.stats()["calls"]
+
+    text = "Jane Roe\njane@example.com\n\nExperience\nBackend engineer at Acme, 2019 - 2024"
+    first = llm_service.extract_resume_data_from_text(text)
+    second = llm_service.extract_resume_data_from_text(text)
+
+    assert "error" not in first
+    assert second == first
+    assert fallback.stats()["calls"] == calls + 1
+
+RESUME = """Jane Roe
+jane@example.com
+
+Summary
+Backend engineer who likes databases.
+
+Experience
+Acme Ltd, Backend Engineer, 2019 - 2024
+Built the billing system.
+"""
+
+def test_truncated_section_is_requested_again_with_its_context_only(monkeypatch):
+    import json
+
+    from langchain_core.language_models import FakeMessagesListChatModel
+    from langchain_core.messages import AIMessage
+
+    from app.services import fake_llm
+
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    # Every section present, with the summary written last and cut off
+    first_answer = {path: None for path in llm_output.section_paths(llm_service.EXTRACTION_SECTIONS)}
+    first_answer.update(fake_llm.fake_extraction(RESUME))
+    del first_answer["summary"]
+    first_answer["summary"] = "Backend engineer who likes databases."
+    truncated = json.dumps(first_answer)[:-20] # Cut inside the summary
+    model = FakeMessagesListChatModel(responses=[
+        AIMessage(content=truncated),
+        AIMessage(content='{"summary": "Backend engineer who likes databases."}'),
+    ])
+    monkeypatch.setattr(llm_service, "llm", model)
+    requests = []
+    invoke = llm_service._invoke
+
+    def recording_invoke(operation, primary, params):
+        requests.append((operation, params))
+        return invoke(operation, primary, params)
+
+    monkeypatch.setattr(llm_service, "_invoke", recording_invoke)
+    result = llm_service.extract_resume_data_from_text(RESUME)
+
+    assert result["summary"] == "Backend engineer who likes databases."
+    assert result["email"] == "jane@example.com"
+    followup_operation, followup_params = requests[1]
+    assert followup_operation.name == "extraction_followup"
+    assert followup_params["fields"] == "summary"
+    assert "Backend engineer who likes databases." in followup_params["context"]
+    assert "Acme Ltd" not in followup_params["context"]
+    assert "work_experience" not in followup_params["section_schemas"]
+
+def test_pipeline_mode_follows_the_setting(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "two_step")
+    assert llm_service.select_pipeline_mode(RESUME) == llm_service.PIPELINE_MODE_TWO_STEP
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "combined")
+    assert llm_service.select_pipeline_mode(RESUME) == llm_service.PIPELINE_MODE_COMBINED
+
+def test_split_mode_sends_the_same_text_to_the_same_arm(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "split")
+    texts = [f"{RESUME}\nReference {index}" for index in range(200)]
+    monkeypatch.setattr(settings, "LLM_COMBINED_SPLIT_PERCENT", 50)
+    modes = [llm_service.select_pipeline_mode(text) for text in texts]
+    assert modes == [llm_service.select_pipeline_mode(text) for text in texts]
+    assert 50 < modes.count(llm_service.PIPELINE_MODE_COMBINED) < 150
+    for percent, mode in ((0, llm_service.PIPELINE_MODE_TWO_STEP), (100, llm_service.PIPELINE_MODE_COMBINED)):
+        monkeypatch.setattr(settings, "LLM_COMBINED_SPLIT_PERCENT", percent)
+        assert {llm_service.select_pipeline_mode(text) for text in texts} == {mode}
+
+def test_combined_call_returns_the_extraction_and_the_analysis(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    result = llm_service.extract_and_analyze_resume(RESUME)
+    assert "error" not in result
+    assert result["extracted_data"]["email"] == "jane@example.com"
+    assert "resume_rating" in result["analysis"]
+    assert result["extracted_data"] == llm_service.extract_resume_data_from_text(RESUME)
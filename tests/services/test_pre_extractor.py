@@ -0,0 +1,99 @@
+import pytest
+
+from app.services import pre_extractor
+
+RESUME = """Jane Roe
+jane.roe@example.com | +44 20 7946 0958
+linkedin.com/in/jane-roe | github.com/janeroe | https://janeroe.dev
+
+Summary
+Backend engineer.
+
+Experience
+Acme Ltd, 2019 - 2021
+
+Awards
+- Best paper award, 2021
+  ICML workshop
+- Dean's list
+
+References
+John Smith, john.smith@example.com, +44 20 7946 0000
+"""
+
+def test_contact_fields_come_from_the_header():
+    result = pre_extractor.pre_extract(RESUME)
+    assert result.fields["email"] == "jane.roe@example.com"
+    assert result.fields["phone"] == "+44 20 7946 0958"
+    assert result.fields["linkedin_url"] == "https://linkedin.com/in/jane-roe"
+    assert result.fields["github_url"] == "https://github.com/janeroe"
+    assert result.fields["portfolio_url"] == "https://janeroe.dev"
+
+def test_llm_text_keeps_sections_that_need_the_llm():
+    result = pre_extractor.pre_extract(RESUME)
+    assert result.sections == ("summary", "experience", "awards", "references")
+    assert "Jane Roe" in result.llm_text
+    assert "Acme Ltd, 2019 - 2021" in result.llm_text
+    for removed in ("jane.roe@example.com", "github.com", "Best paper", "John Smith"):
+        assert removed not in result.llm_text
+
+def test_list_sections_and_references_are_read_locally():
+    result = pre_extractor.pre_extract(RESUME)
+    assert result.fields["awards_honors"] == ["Best paper award, 2021 ICML workshop", "Dean's list"]
+    assert result.fields["references_available"] is True
+
+def test_labelled_phone_is_preferred_over_other_numbers():
+    result = pre_extractor.pre_extract("Jane Roe\nID: 2020 1234 5678\nPhone 0044 20 7946 0958")
+    assert result.fields["phone"] == "0044 20 7946 0958"
+    assert "ID: 2020 1234 5678" in result.llm_text
+
+@pytest.mark.parametrize("text", ["Jane Roe\nID: 2020 1234 5678", "Jane Roe\nStudent 2019 - 2023"])
+def test_unformatted_numbers_are_not_phones(text):
+    assert "phone" not in pre_extractor.pre_extract(text).fields
+
+@pytest.mark.parametrize("phone", ["+1 (555) 010-0000", "555-010-0000", "(020) 7946 0958", "07700 900123"])
+def test_formatted_numbers_are_phones(phone):
+    assert pre_extractor.pre_extract(f"Jane Roe\n{phone}").fields["phone"] == phone
+
+def test_rejected_email_stays_in_the_llm_text():
+    result = pre_extractor.pre_extract("Jane Roe\nEmail: jane@example.invalid\n\nExperience\nAcme")
+    assert "email" not in result.fields
+    assert "Email: jane@example.invalid" in result.llm_text
+
+def test_referee_details_below_a_heading_are_ignored():
+    result = pre_extractor.pre_extract("Jane Roe\n\nExperience\nAcme\n\nReferences\nJohn Smith, john@example.com")
+    assert "email" not in result.fields
+
+def test_contact_section_is_searched():
+    result = pre_extractor.pre_extract("Jane Roe\n\nContact Information\nE-mail: jane@example.com\n\nSkills\nPython")
+    assert result.fields["email"] == "jane@example.com"
+    assert result.sections == ("contact", "skills")
+    assert "Contact Information" not in result.llm_text
+
+@pytest.mark.parametrize("heading, section", [
+    ("WORK EXPERIENCE", "experience"), ("Skills & Abilities", "skills"), ("Education:", "education"),
+    ("Honors and Awards", "awards"), ("Hobbies", "interests"),
+])
+def test_section_headings(heading, section):
+    assert pre_extractor.pre_extract(f"Jane Roe\n{heading}\nsomething").sections == (section,)
+
+def test_long_lines_are_not_headings():
+    assert pre_extractor.pre_extract("Jane Roe\nExperience with Python, SQL and several cloud providers").sections == ()
+
+def test_llm_values_win_over_local_ones():
+    result = pre_extractor.pre_extract("Jane Roe\njane@example.com\n+44 20 7946 0958")
+    merged = result.apply({"email": "jane.roe@work.example.com", "phone": None, "name": "Jane Roe"})
+    assert merged == {"email": "jane.roe@work.example.com", "phone": "+44 20 7946 0958", "name": "Jane Roe"}
+
+def test_text_with_only_contact_details_is_sent_whole():
+    text = "jane@example.com\n+44 20 7946 0958"
+    assert pre_extractor.pre_extract(text).llm_text == text
+
+def test_excerpt_has_the_header_and_the_fields_sections():
+    text = pre_extractor.excerpt(RESUME, ["work_experience", "email"])
+    assert text.startswith("Jane Roe")
+    assert "Acme Ltd" in text
+    assert "Backend engineer." not in text
+
+def test_excerpt_of_a_field_without_its_section_is_the_whole_text():
+    assert pre_extractor.excerpt(RESUME, ["projects"]) == RESUME
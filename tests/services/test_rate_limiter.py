@@ -0,0 +1,76 @@
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.services import rate_limiter
+
+def _limiter(**overrides):
+    options = dict(requests_per_minute=6000, tokens_per_minute=10_000_000, max_concurrency=4, min_rate_factor=0.1, recovery_step=0.25)
+    options.update(overrides)
+    return rate_limiter.AdaptiveRateLimiter(**options)
+
+def _throttle(limiter, message="quota exceeded, retry in 0s"):
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        with limiter.slot(1):
+            raise google_exceptions.ResourceExhausted(message)
+
+def test_throttling_halves_the_rate_factor_down_to_the_floor():
+    limiter = _limiter()
+    _throttle(limiter)
+    assert limiter.stats()["rate_factor"] == 0.5
+    for _ in range(5):
+        _throttle(limiter)
+    assert limiter.stats()["rate_factor"] == 0.1
+    assert limiter.stats()["throttled"] == 6
+
+def test_success_raises_the_rate_factor_additively():
+    limiter = _limiter()
+    _throttle(limiter)
+    _throttle(limiter)
+    with limiter.slot(1):
+        pass
+    assert limiter.stats()["rate_factor"] == 0.5
+    for _ in range(3):
+        with limiter.slot(1):
+            pass
+    assert limiter.stats()["rate_factor"] == 1.0
+
+def test_other_errors_leave_the_rate_alone():
+    limiter = _limiter()
+    with pytest.raises(ValueError):
+        with limiter.slot(1):
+            raise ValueError("bad output")
+    assert limiter.stats()["rate_factor"] == 1.0
+    assert limiter.stats()["in_flight"] == 0
+
+def test_throttling_pauses_callers_for_the_retry_hint():
+    limiter = _limiter()
+    _throttle(limiter, "quota exceeded, retry in 30s")
+    assert 29 < limiter.stats()["paused_for_seconds"] <= 30
+    assert limiter._try_acquire(1) > 29
+
+def test_concurrency_limit():
+    limiter = _limiter(max_concurrency=1)
+    with limiter.slot(1):
+        assert limiter._try_acquire(1) == rate_limiter._POLL_SECONDS
+    assert limiter._try_acquire(1) == 0.0
+
+def test_request_budget_empties_after_the_burst():
+    limiter = _limiter(requests_per_minute=60) # A burst of 10 requests, then one per second
+    for _ in range(10):
+        with limiter.slot(1):
+            pass
+    assert limiter._try_acquire(1) > 0.5
+
+@pytest.mark.parametrize("error, throttling, transient", [
+    (google_exceptions.ResourceExhausted("quota"), True, True),
+    (google_exceptions.ServiceUnavailable("down"), False, True),
+    (google_exceptions.InvalidArgument("bad request"), False, False),
+    (TimeoutError(), False, True),
+])
+def test_error_classification(error, throttling, transient):
+    assert rate_limiter.is_throttling_error(error) is throttling
+    assert rate_limiter.is_transient_error(error) is transient
+
+def test_retry_hint_from_the_error_message():
+    assert rate_limiter.retry_after_seconds(RuntimeError("429 quota exceeded, retry in 12.5s")) == 12.5
+    assert rate_limiter.retry_after_seconds(RuntimeError("boom")) is None
@@ -0,0 +1,79 @@
+import hashlib
+import io
+
+import pytest
+
+from app.core.config import settings
+from app.crud import crud_resume
+from app.db import database, models
+from app.services import llm_service, resume_batch, resume_pipeline
+from app.utils import file_helpers
+
+from tests.services.test_pre_extractor import RESUME
+
+@pytest.fixture
+def extraction_calls(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "two_step")
+    calls = []
+    extract = llm_service.extract_resume_data_from_text
+    def counted(resume_text):
+        calls.append(resume_text)
+        return extract(resume_text)
+    monkeypatch.setattr(llm_service, "extract_resume_data_from_text", counted)
+    return calls
+
+@pytest.fixture
+def bulk_inserts(monkeypatch):
+    inserts = []
+    create_resumes_bulk = crud_resume.create_resumes_bulk
+    def counted(db, rows):
+        inserts.append(len(rows))
+        return create_resumes_bulk(db, rows)
+    monkeypatch.setattr(crud_resume, "create_resumes_bulk", counted)
+    return inserts
+
+def _item(file_name, content):
+    data = content.encode()
+    return file_helpers.IngestedUpload(file_name=file_name, buffer=io.BytesIO(data), content_hash=hashlib.sha256(data).hexdigest(), size_bytes=len(data))
+
+def _process(items, on_duplicate=resume_pipeline.DUPLICATE_REUSE):
+    return resume_batch.process_batch(database.SessionLocal, items, on_duplicate)
+
+def test_identical_files_in_a_batch_are_analyzed_once(db, extraction_calls, bulk_inserts):
+    results = _process([_item("a.txt", RESUME), _item("b.txt", RESUME), _item("c.txt", RESUME + "\nReferences on request")])
+    assert [result.status for result in results] == [resume_batch.BATCH_STATUS_PROCESSED] * 3
+    assert len(extraction_calls) == 2
+    assert bulk_inserts == [3]
+    stored = {db_resume.file_name: db_resume for db_resume in db.query(models.Resume)}
+    assert [result.resume_id for result in results] == [stored[name].id for name in ("a.txt", "b.txt", "c.txt")]
+    assert stored["a.txt"].content_hash == stored["b.txt"].content_hash != stored["c.txt"].content_hash
+    assert stored["b.txt"].llm_analysis == stored["a.txt"].llm_analysis
+    assert stored["a.txt"].processing_status == models.PROCESSING_STATUS_COMPLETED
+
+def test_stored_content_follows_on_duplicate(db, extraction_calls, bulk_inserts):
+    [first] = _process([_item("a.txt", RESUME)])
+    reused = _process([_item("copy.txt", RESUME)])
+    assert (reused[0].status, reused[0].duplicate_of) == (resume_batch.BATCH_STATUS_DUPLICATE, first.resume_id)
+    assert reused[0].resume_id != first.resume_id
+    existing = _process([_item("copy.txt", RESUME)], on_duplicate=resume_pipeline.DUPLICATE_EXISTING)
+    assert (existing[0].resume_id, existing[0].duplicate_of) == (reused[0].resume_id, reused[0].resume_id) # The most recent match
+    assert len(extraction_calls) == 1
+    assert bulk_inserts == [1, 1]
+    reprocessed = _process([_item("again.txt", RESUME)], on_duplicate=resume_pipeline.DUPLICATE_REPROCESS)
+    assert reprocessed[0].status == resume_batch.BATCH_STATUS_PROCESSED
+    assert len(extraction_calls) == 2
+
+def test_failed_file_does_not_fail_the_batch(db, extraction_calls, bulk_inserts):
+    results = _process([_item("empty.txt", ""), _item("a.txt", RESUME)])
+    assert [result.status for result in results] == [resume_batch.BATCH_STATUS_FAILED, resume_batch.BATCH_STATUS_PROCESSED]
+    assert results[0].error
+    assert bulk_inserts == [1]
+
+def test_failed_bulk_insert_fails_each_of_its_files(db, extraction_calls, monkeypatch):
+    def failing_insert(db, rows):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(crud_resume, "create_resumes_bulk", failing_insert)
+    results = _process([_item("a.txt", RESUME), _item("b.txt", RESUME)])
+    assert [result.status for result in results] == [resume_batch.BATCH_STATUS_FAILED] * 2
+    assert db.query(models.Resume).count() == 0
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+
+from app.core.config import settings
+from app.crud import crud_resume
+from app.services import resume_export
+
+ANALYSIS = {"resume_rating": {"overall_score": 8.5, "comments": "Clear"}, "strength_areas": ["Python"]}
+
+def _processed(db, count=1, **columns):
+    return crud_resume.create_resumes_bulk(db, [
+        {"file_name": f"resume_{index}.pdf", "name": f"Jane {index}", "raw_text": "Jane Roe", "llm_analysis": ANALYSIS,
+         "technical_skills": ["Python", "SQL"], "work_experience": [{"company": "Acme"}], "stage_timings": {"total": 1.0}, **columns}
+        for index in range(count)
+    ])
+
+def test_columns_are_the_resume_details_without_diagnostics():
+    columns = resume_export.export_columns()
+    assert {"id", "name", "technical_skills", "llm_analysis", "processing_status"} <= set(columns)
+    for internal in ("raw_text", "stage_timings", "processing_error", "extraction_version", "analysis_version", "extracted_data", "content_hash"):
+        assert internal not in columns
+    assert "raw_text" in resume_export.export_columns(include_raw_text=True)
+
+def test_ndjson_export_has_one_object_per_processed_resume(db):
+    ids = _processed(db, 2)
+    crud_resume.create_resume_entry(db, file_name="unprocessed.pdf")
+    rows = [json.loads(line) for line in "".join(resume_export.stream_export(resume_export.FORMAT_NDJSON)).splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert rows[0]["llm_analysis"] == ANALYSIS
+    assert rows[0]["work_experience"] == [{"company": "Acme"}]
+    assert "stage_timings" not in rows[0]
+
+def test_csv_export_flattens_the_analysis_and_joins_plain_lists(db):
+    [resume_id] = _processed(db)
+    rows = list(csv.DictReader(io.StringIO("".join(resume_export.stream_export(resume_export.FORMAT_CSV)))))
+    assert len(rows) == 1
+    assert rows[0]["id"] == str(resume_id)
+    assert rows[0]["llm_analysis.resume_rating.overall_score"] == "8.5"
+    assert rows[0]["llm_analysis.strength_areas"] == "Python"
+    assert rows[0]["llm_analysis.improvement_areas.content_suggestions"] == ""
+    assert rows[0]["technical_skills"] == "Python; SQL"
+    assert json.loads(rows[0]["work_experience"]) == [{"company": "Acme"}]
+
+def test_export_is_written_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_BYTES", 100)
+    _processed(db, 5)
+    chunks = list(resume_export.stream_export(resume_export.FORMAT_NDJSON))
+    assert len(chunks) > 1
+    assert len("".join(chunks).splitlines()) == 5
@@ -0,0 +1,178 @@
+import asyncio
+import io
+
+import pytest
+
+from app.core.config import settings
+from app.crud import crud_resume
+from app.db import database, models
+from app.services import llm_service, resume_pipeline
+
+from tests.services.test_pre_extractor import RESUME
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = {}
+    def extract(resume_text):
+        calls["extraction"] = resume_text
+        return {"name": "Jane Roe"}
+    def analyze(extracted_data_dict, raw_resume_text=None):
+        calls["analysis"] = raw_resume_text
+        return {"overall_score": 7}
+    def combined(resume_text):
+        calls["combined"] = resume_text
+        return {"extracted_data": {"name": "Jane Roe"}, "analysis": {"overall_score": 7}}
+    async def aextract(resume_text):
+        return extract(resume_text)
+    async def aanalyze(extracted_data_dict, raw_resume_text=None):
+        return analyze(extracted_data_dict, raw_resume_text)
+    async def acombined(resume_text):
+        return combined(resume_text)
+    for name, function in (("extract_resume_data_from_text", extract), ("analyze_resume_content", analyze), ("extract_and_analyze_resume", combined),
+                           ("aextract_resume_data_from_text", aextract), ("aanalyze_resume_content", aanalyze), ("aextract_and_analyze_resume", acombined)):
+        monkeypatch.setattr(llm_service, name, function)
+    return calls
+
+def test_only_the_extraction_gets_the_pre_extracted_text(llm_calls):
+    extracted, _ = resume_pipeline.run_llm_stages(RESUME, "test")
+    assert "John Smith" not in llm_calls["extraction"]
+    assert llm_calls["analysis"] == RESUME
+    assert extracted["email"] == "jane.roe@example.com" # Filled in locally
+
+def test_async_analysis_gets_the_full_text(llm_calls):
+    asyncio.run(resume_pipeline.arun_llm_stages(RESUME, "test"))
+    assert "John Smith" not in llm_calls["extraction"]
+    assert llm_calls["analysis"] == RESUME
+
+def test_combined_call_gets_the_full_text(llm_calls, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "combined")
+    extracted, _ = resume_pipeline.run_llm_stages(RESUME, "test")
+    assert llm_calls["combined"] == RESUME
+    assert extracted["email"] == "jane.roe@example.com"
+
+def test_stored_extraction_is_only_analyzed(llm_calls):
+    extracted, analysis = resume_pipeline.run_llm_stages(RESUME, "test", extracted_data_dict={"name": "Stored"})
+    assert extracted == {"name": "Stored"}
+    assert analysis == {"overall_score": 7}
+    assert "extraction" not in llm_calls
+    assert llm_calls["analysis"] == RESUME
+
+@pytest.fixture
+def counted_llm_calls(monkeypatch):
+    # The stub LLM, counting calls; results are not cached, so every run reaches the model
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    calls = []
+    for name in ("extract_resume_data_from_text", "analyze_resume_content", "extract_and_analyze_resume"):
+        def counted(*args, _call=getattr(llm_service, name), _name=name, **kwargs):
+            calls.append(_name)
+            return _call(*args, **kwargs)
+        monkeypatch.setattr(llm_service, name, counted)
+    return calls
+
+def _upload(content_hash, on_duplicate=resume_pipeline.DUPLICATE_REUSE, file_name="resume.txt"):
+    return resume_pipeline.process_resume_file(
+        database.SessionLocal, io.BytesIO(RESUME.encode()), file_name, content_hash=content_hash, on_duplicate=on_duplicate,
+    )
+
+def test_duplicate_upload_reuses_the_stored_results(db, counted_llm_calls):
+    first = _upload("a" * 64)
+    llm_calls = len(counted_llm_calls)
+    second = _upload("a" * 64, file_name="copy.txt")
+    assert len(counted_llm_calls) == llm_calls
+    assert second.duplicate_of == first.resume.id
+    assert second.resume.id != first.resume.id
+    assert (second.resume.file_name, second.resume.content_hash) == ("copy.txt", "a" * 64)
+    assert second.resume.llm_analysis == first.resume.llm_analysis
+    assert db.query(models.Resume).count() == 2
+
+def test_duplicate_upload_can_return_the_stored_entry(db, counted_llm_calls):
+    first = _upload("a" * 64)
+    again = _upload("a" * 64, on_duplicate=resume_pipeline.DUPLICATE_EXISTING)
+    assert (again.resume.id, again.duplicate_of) == (first.resume.id, first.resume.id)
+    assert db.query(models.Resume).count() == 1
+
+def test_duplicate_upload_can_be_reprocessed(db, counted_llm_calls):
+    first = _upload("a" * 64)
+    llm_calls = len(counted_llm_calls)
+    again = _upload("a" * 64, on_duplicate=resume_pipeline.DUPLICATE_REPROCESS)
+    assert len(counted_llm_calls) > llm_calls
+    assert again.duplicate_of is None
+    assert again.resume.id != first.resume.id
+
+def test_unprocessed_or_different_content_is_not_a_duplicate(db, counted_llm_calls):
+    crud_resume.create_resume_entry(db, file_name="failed.txt", content_hash="a" * 64) # No analysis stored
+    assert _upload("a" * 64).duplicate_of is None
+    assert _upload("b" * 64).duplicate_of is None
+
+def test_async_duplicate_upload_reuses_the_stored_results(db, counted_llm_calls):
+    first = _upload("a" * 64)
+    again = asyncio.run(resume_pipeline.aprocess_resume_file(database.AsyncSessionLocal, io.BytesIO(RESUME.encode()), "copy.txt", content_hash="a" * 64))
+    assert again.duplicate_of == first.resume.id
+    assert again.resume.id != first.resume.id
+
+def test_combined_mode_runs_one_llm_stage(db, counted_llm_calls, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "combined")
+    timings = resume_pipeline.StageTimings()
+    result = resume_pipeline.process_resume_file(database.SessionLocal, io.BytesIO(RESUME.encode()), "resume.txt", timings=timings)
+    assert counted_llm_calls == ["extract_and_analyze_resume"]
+    assert resume_pipeline.STAGE_LLM_COMBINED in timings.seconds
+    assert resume_pipeline.STAGE_LLM_EXTRACTION not in timings.seconds
+    db_resume = db.get(models.Resume, result.resume.id)
+    assert db_resume.email == "jane.roe@example.com"
+    assert db_resume.llm_analysis is not None
+    assert db_resume.extraction_version == db_resume.analysis_version == llm_service.COMBINED_RESULT_VERSION
+
+def test_failed_combined_call_fails_the_combined_stage(llm_calls, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "combined")
+    monkeypatch.setattr(llm_service, "extract_and_analyze_resume", lambda resume_text: {"error": "Invalid JSON"})
+    with pytest.raises(resume_pipeline.PipelineError) as error:
+        resume_pipeline.run_llm_stages(RESUME, "test")
+    assert error.value.stage == resume_pipeline.STAGE_LLM_COMBINED
+
+def _failed_analysis(monkeypatch):
+    # Uploads the resume with a failing analysis
+    monkeypatch.setattr(settings, "LLM_PIPELINE_MODE", "two_step")
+    analyze = llm_service.analyze_resume_content
+    monkeypatch.setattr(llm_service, "analyze_resume_content", lambda *args, **kwargs: {"error": "Model overloaded"})
+    with pytest.raises(resume_pipeline.PipelineError) as error:
+        _upload("a" * 64)
+    monkeypatch.setattr(llm_service, "analyze_resume_content", analyze)
+    assert error.value.stage == resume_pipeline.STAGE_LLM_ANALYSIS
+
+def test_failed_analysis_is_recorded_with_the_extraction_checkpoint(db, counted_llm_calls, monkeypatch):
+    _failed_analysis(monkeypatch)
+    [db_resume] = db.query(models.Resume).all()
+    assert (db_resume.processing_status, db_resume.failed_stage) == (models.PROCESSING_STATUS_FAILED, resume_pipeline.STAGE_LLM_ANALYSIS)
+    assert "Model overloaded" in db_resume.processing_error
+    assert db_resume.extracted_data["email"] == "jane.roe@example.com"
+    assert resume_pipeline.first_incomplete_stage(db_resume) == resume_pipeline.STAGE_LLM_ANALYSIS
+
+def test_reprocess_runs_only_the_failed_stage(db, counted_llm_calls, monkeypatch):
+    _failed_analysis(monkeypatch)
+    resume_id = db.query(models.Resume.id).scalar()
+    counted_llm_calls.clear()
+    result = resume_pipeline.reprocess_resume(database.SessionLocal, resume_id)
+    assert result.from_stage == resume_pipeline.STAGE_LLM_ANALYSIS
+    assert counted_llm_calls == ["analyze_resume_content"]
+    assert (result.resume.processing_status, result.resume.failed_stage) == (models.PROCESSING_STATUS_COMPLETED, None)
+    assert result.resume.email == "jane.roe@example.com"
+    assert result.resume.llm_analysis is not None
+
+    again = resume_pipeline.reprocess_resume(database.SessionLocal, resume_id) # Nothing left to do
+    assert again.from_stage is None
+    assert counted_llm_calls == ["analyze_resume_content"]
+    resume_pipeline.reprocess_resume(database.SessionLocal, resume_id, from_stage=resume_pipeline.STAGE_LLM_EXTRACTION)
+    assert counted_llm_calls == ["analyze_resume_content", "extract_resume_data_from_text", "analyze_resume_content"]
+
+def test_reprocess_refuses_stages_without_their_inputs(db, counted_llm_calls):
+    extracted = crud_resume.create_resume_entry(db, file_name="resume.txt", raw_text=RESUME).id
+    no_text = crud_resume.create_resume_entry(db, file_name="scan.pdf", raw_text="").id
+    for resume_id, from_stage, status_code in (
+        (extracted, resume_pipeline.STAGE_LLM_ANALYSIS, 409), # Extraction has not completed
+        (no_text, None, 409),
+        (0, None, 404),
+    ):
+        with pytest.raises(resume_pipeline.PipelineError) as error:
+            resume_pipeline.reprocess_resume(database.SessionLocal, resume_id, from_stage=from_stage)
+        assert error.value.status_code == status_code
+    assert counted_llm_calls == []
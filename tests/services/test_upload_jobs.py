@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.crud import crud_job
+from app.services import resume_pipeline, upload_jobs
+
+TERMINAL = resume_pipeline.TERMINAL_STAGES
+
+@pytest.fixture
+def workers():
+    yield
+    upload_jobs.shutdown_workers()
+
+def _saved_file(tmp_path, name="resume.txt"):
+    path = tmp_path / name
+    path.write_text("Jane Roe\njane@example.com\nPython developer with ten years of experience.")
+    return str(path)
+
+def _wait_until_finished(db, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.expire_all()
+        db_job = crud_job.get_upload_job(db, job_id)
+        if db_job.stage in TERMINAL and db_job.file_path is None: # The saved file is removed after the last stage
+            return db_job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} still at stage {db_job.stage}")
+
+def _job(db, tmp_path, locked_by=None, lease_seconds=None, file_path=None):
+    now = datetime.now(timezone.utc)
+    return crud_job.create_upload_job(
+        db, file_name="resume.txt", file_path=file_path or _saved_file(tmp_path),
+        locked_by=locked_by, locked_until=None if lease_seconds is None else now + timedelta(seconds=lease_seconds),
+    )
+
+def test_enqueued_job_runs_to_completion(db, tmp_path, workers):
+    file_path = _saved_file(tmp_path)
+    db_job = upload_jobs.enqueue_upload(db, file_name="resume.txt", file_path=file_path)
+    assert db_job.stage == resume_pipeline.STAGE_QUEUED
+    assert db_job.locked_by == upload_jobs._owner
+
+    db_job = _wait_until_finished(db, db_job.id)
+    assert db_job.stage == resume_pipeline.STAGE_COMPLETED, db_job.error
+    assert db_job.resume_id is not None
+    assert db_job.attempts == 1
+    assert db_job.file_path is None
+
+def test_full_queue_rejects_new_jobs(db, tmp_path, workers, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_JOB_MAX_PENDING", 0)
+    with pytest.raises(upload_jobs.JobQueueFullError):
+        upload_jobs.enqueue_upload(db, file_name="resume.txt", file_path=_saved_file(tmp_path))
+    [db_job] = crud_job.get_unfinished_jobs(db, ()) # Every job, terminal ones included
+    assert db_job.stage == resume_pipeline.STAGE_FAILED
+    assert db_job.file_path is None
+
+def test_claims_are_exclusive_until_the_lease_expires(db, tmp_path):
+    db_job = _job(db, tmp_path)
+    now = datetime.now(timezone.utc)
+    assert crud_job.claim_job(db, db_job.id, "a", now, now + timedelta(seconds=60), TERMINAL)
+    assert crud_job.claim_job(db, db_job.id, "a", now, now + timedelta(seconds=60), TERMINAL) # Renewal by the holder
+    assert not crud_job.claim_job(db, db_job.id, "b", now, now + timedelta(seconds=60), TERMINAL)
+    later = now + timedelta(seconds=61)
+    assert crud_job.claim_job(db, db_job.id, "b", later, later + timedelta(seconds=60), TERMINAL)
+
+    crud_job.update_job(db, db_job, stage=resume_pipeline.STAGE_COMPLETED)
+    later += timedelta(seconds=120)
+    assert not crud_job.claim_job(db, db_job.id, "a", later, later + timedelta(seconds=60), TERMINAL)
+
+def test_recovery_only_takes_over_expired_leases(db, tmp_path, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(upload_jobs, "_submit", lambda job_id, enforce_limit=True: submitted.append(job_id))
+    running_elsewhere = _job(db, tmp_path, locked_by="other", lease_seconds=60)
+    abandoned = _job(db, tmp_path, locked_by="other", lease_seconds=-1)
+    unleased = _job(db, tmp_path)
+    lost_file = _job(db, tmp_path, locked_by="other", lease_seconds=-1, file_path=str(tmp_path / "missing.txt"))
+    in_own_pool = _job(db, tmp_path, locked_by=upload_jobs._owner, lease_seconds=-1)
+
+    assert upload_jobs.recover_unfinished_jobs() == 2
+    assert sorted(submitted) == sorted([abandoned.id, unleased.id])
+    db.expire_all()
+    assert crud_job.get_upload_job(db, running_elsewhere.id).locked_by == "other"
+    assert crud_job.get_upload_job(db, abandoned.id).locked_by == upload_jobs._owner
+    assert crud_job.get_upload_job(db, lost_file.id).stage == resume_pipeline.STAGE_FAILED
+    assert crud_job.get_upload_job(db, in_own_pool.id).stage == resume_pipeline.STAGE_QUEUED
+
+def test_worker_skips_jobs_leased_to_another_process(db, tmp_path):
+    db_job = _job(db, tmp_path, locked_by="other", lease_seconds=60)
+    upload_jobs._process_job(db_job.id)
+    db.expire_all()
+    db_job = crud_job.get_upload_job(db, db_job.id)
+    assert db_job.stage == resume_pipeline.STAGE_QUEUED
+    assert db_job.attempts == 0
+
+def test_shutdown_releases_leases_of_queued_jobs(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_jobs, "_process_job", lambda job_id: time.sleep(0.2))
+    monkeypatch.setattr(settings, "UPLOAD_JOB_WORKERS", 1)
+    jobs = [upload_jobs.enqueue_upload(db, file_name="resume.txt", file_path=_saved_file(tmp_path, f"resume_{index}.txt")) for index in range(3)]
+    upload_jobs.shutdown_workers()
+    db.expire_all()
+    assert [crud_job.get_upload_job(db, db_job.id).locked_by for db_job in jobs] == [None, None, None]
+    assert upload_jobs._pending_jobs == 0 # The cancelled jobs' slots are freed
@@ -0,0 +1,97 @@
+import multiprocessing
+
+import numpy as np
+
+from app.services import vector_index
+
+DIM = 16
+
+def _unit(*values):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector / np.linalg.norm(vector)
+
+def _ids(index):
+    query = np.ones((1, index.dim), dtype=np.float32)
+    return {resume_id for resume_id, _ in index.top_k(query, max(len(index), 1))[0]}
+
+def test_upsert_adds_and_replaces(tmp_path):
+    index = vector_index.VectorIndex(str(tmp_path), DIM)
+    index.upsert([(1, _unit(1)), (2, _unit(0, 1))])
+    index.upsert([(1, _unit(0, 0, 1))])
+    assert len(index) == 2
+    assert index.top_k(_unit(0, 0, 1)[None, :], 1) == [[(1, 1.0)]]
+
+def test_remove_moves_the_last_row_into_the_gap(tmp_path):
+    index = vector_index.VectorIndex(str(tmp_path), DIM)
+    index.upsert([(1, _unit(1)), (2, _unit(0, 1)), (3, _unit(0, 0, 1))])
+    assert index.remove(1)
+    assert not index.remove(1)
+    assert len(index) == 2
+    assert index.top_k(_unit(0, 0, 1)[None, :], 1) == [[(3, 1.0)]]
+    index.upsert([(3, _unit(1))]) # Updates the moved row in place
+    assert len(index) == 2
+    assert index.top_k(_unit(1)[None, :], 1) == [[(3, 1.0)]]
+
+def test_top_k_orders_by_score_per_query(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "_QUERY_CHUNK_ROWS", 2) # Merge candidates across chunks
+    index = vector_index.VectorIndex(str(tmp_path), DIM)
+    index.upsert([(resume_id, _unit(1, resume_id)) for resume_id in range(1, 8)])
+    results = index.top_k(np.stack([_unit(1), _unit(0, 1)]), 3)
+    assert [resume_id for resume_id, _ in results[0]] == [1, 2, 3]
+    assert [resume_id for resume_id, _ in results[1]] == [7, 6, 5]
+    assert results[0][0][1] > results[0][1][1] > results[0][2][1]
+    assert len(index.top_k(_unit(1)[None, :], 50)[0]) == 7
+
+def test_top_k_on_an_empty_index(tmp_path):
+    index = vector_index.VectorIndex(str(tmp_path), DIM)
+    assert index.top_k(np.stack([_unit(1), _unit(0, 1)]), 5) == [[], []]
+
+def test_index_grows_and_reopens(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "_MIN_CAPACITY", 4)
+    index = vector_index.VectorIndex(str(tmp_path), DIM)
+    index.upsert([(resume_id, _unit(1, resume_id)) for resume_id in range(1, 11)])
+    reopened = vector_index.VectorIndex(str(tmp_path), DIM)
+    assert len(reopened) == 10
+    assert _ids(reopened) == set(range(1, 11))
+
+def test_changes_by_another_process_are_read(tmp_path):
+    server = vector_index.VectorIndex(str(tmp_path), DIM)
+    server.upsert([(1, _unit(1)), (2, _unit(0, 1))])
+    assert len(server) == 2
+
+    cli = vector_index.VectorIndex(str(tmp_path), DIM) # e.g. rebuild-vector-index
+    cli.reset()
+    cli.upsert([(3, _unit(1)), (4, _unit(0, 1)), (5, _unit(0, 0, 1))])
+    assert _ids(server) == {3, 4, 5}
+
+    # Writers append after each other's rows instead of over them
+    server.upsert([(6, _unit(1, 1))])
+    cli.upsert([(7, _unit(1, 2))])
+    cli.remove(3)
+    server.upsert([(8, _unit(1, 3))])
+    for index in (server, cli, vector_index.VectorIndex(str(tmp_path), DIM)):
+        assert _ids(index) == {4, 5, 6, 7, 8}
+
+def test_dimension_change_starts_empty(tmp_path):
+    vector_index.VectorIndex(str(tmp_path), DIM).upsert([(1, _unit(1))])
+    index = vector_index.VectorIndex(str(tmp_path), 2 * DIM)
+    assert len(index) == 0
+    index.upsert([(2, np.ones(2 * DIM, dtype=np.float32) / np.sqrt(2 * DIM))])
+    assert _ids(index) == {2}
+
+def _write_ids(directory, first_id, count):
+    index = vector_index.VectorIndex(directory, DIM)
+    for resume_id in range(first_id, first_id + count):
+        index.upsert([(resume_id, _unit(1, resume_id))])
+
+def test_concurrent_writer_processes_keep_every_row(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_write_ids, args=(str(tmp_path), first_id, 100)) for first_id in (1, 1001, 2001)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    index = vector_index.VectorIndex(str(tmp_path), DIM)
+    assert _ids(index) == set(range(1, 101)) | set(range(1001, 1101)) | set(range(2001, 2101))
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from app.utils import file_helpers, pdf_text
+
+def test_pdf_memory_error_is_not_swallowed(monkeypatch):
+    def exhaust_memory(*args, **kwargs):
+        raise MemoryError()
+
+    monkeypatch.setattr(pdf_text, "extract_pdf_pages", exhaust_memory)
+    with pytest.raises(MemoryError):
+        file_helpers.extract_text_from_pdf(io.BytesIO(b"%PDF-1.4"))
+
+def test_malformed_pdf_gives_no_text():
+    assert file_helpers.extract_text_from_pdf(io.BytesIO(b"not a pdf")) == ""
+
+def _upload(content: bytes):
+    from fastapi import UploadFile
+
+    return UploadFile(file=io.BytesIO(content), filename="resume.txt")
+
+def test_ingest_upload_hashes_and_counts():
+    import hashlib
+
+    ingested = file_helpers.ingest_upload(_upload(b"x" * 100), max_bytes=1000)
+    try:
+        assert ingested.size_bytes == 100
+        assert ingested.content_hash == hashlib.sha256(b"x" * 100).hexdigest()
+        assert ingested.buffer.read() == b"x" * 100
+    finally:
+        ingested.buffer.close()
+
+def test_ingest_upload_enforces_max_size():
+    with pytest.raises(file_helpers.UploadTooLargeError):
+        file_helpers.ingest_upload(_upload(b"x" * 100), max_bytes=99)
+
+def test_ingest_upload_reads_the_upload_in_place():
+    upload = _upload(b"x" * 100)
+    upload.file.read(10) # Ingested from the start whatever was read before
+    ingested = file_helpers.ingest_upload(upload)
+    assert ingested.buffer is upload.file
+    assert ingested.buffer.read() == b"x" * 100
@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from app.utils import http_cache
+
+LAST_MODIFIED = datetime(2024, 5, 1, 10, 0, 0, 500000) # Naive UTC, as SQLite returns it
+ETAG = http_cache.make_etag(1, 3, "00000000")
+
+def test_validator_headers():
+    headers = http_cache.validator_headers(ETAG, LAST_MODIFIED)
+    assert headers["ETag"] == 'W/"1-3-00000000"'
+    assert headers["Last-Modified"] == "Wed, 01 May 2024 10:00:00 GMT"
+
+def test_if_none_match():
+    assert http_cache.is_not_modified({"if-none-match": ETAG}, ETAG, LAST_MODIFIED)
+    assert http_cache.is_not_modified({"if-none-match": '"1-3-00000000"'}, ETAG, LAST_MODIFIED) # Weak comparison
+    assert http_cache.is_not_modified({"if-none-match": 'W/"other", ' + ETAG}, ETAG, LAST_MODIFIED)
+    assert http_cache.is_not_modified({"if-none-match": "*"}, ETAG, LAST_MODIFIED)
+    assert not http_cache.is_not_modified({"if-none-match": 'W/"1-2-00000000"'}, ETAG, LAST_MODIFIED)
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = {"if-none-match": 'W/"1-2-00000000"', "if-modified-since": "Wed, 01 May 2024 11:00:00 GMT"}
+    assert not http_cache.is_not_modified(headers, ETAG, LAST_MODIFIED)
+
+def test_if_modified_since():
+    assert http_cache.is_not_modified({"if-modified-since": "Wed, 01 May 2024 10:00:00 GMT"}, ETAG, LAST_MODIFIED)
+    assert not http_cache.is_not_modified({"if-modified-since": "Wed, 01 May 2024 09:59:59 GMT"}, ETAG, LAST_MODIFIED)
+    assert not http_cache.is_not_modified({"if-modified-since": "yesterday"}, ETAG, LAST_MODIFIED)
+    aware = LAST_MODIFIED.replace(tzinfo=timezone.utc)
+    assert http_cache.is_not_modified({"if-modified-since": "Wed, 01 May 2024 10:00:00 GMT"}, ETAG, aware)
+
+def test_negotiate_encoding():
+    available = {http_cache.ENCODING_IDENTITY: b"{}", http_cache.ENCODING_GZIP: b"gz"}
+    assert http_cache.negotiate_encoding("gzip, deflate", available) == http_cache.ENCODING_GZIP
+    assert http_cache.negotiate_encoding("gzip;q=0", available) == http_cache.ENCODING_IDENTITY
+    assert http_cache.negotiate_encoding(None, available) == http_cache.ENCODING_IDENTITY
@@ -0,0 +1,61 @@
+import pytest
+
+from app.utils import json_repair
+
+def test_valid_object_in_markdown_fence_needs_no_repair():
+    parsed = json_repair.parse_object('Here you go:\n```json\n{"a": 1}\n```')
+    assert parsed == json_repair.ParsedObject({"a": 1}, ())
+
+def test_trailing_commas():
+    parsed = json_repair.parse_object('{"a": [1, 2,], "b": {"c": 3,},}')
+    assert parsed.value == {"a": [1, 2], "b": {"c": 3}}
+    assert parsed.repairs == (json_repair.REPAIR_TRAILING_COMMA,)
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": "say "ok", now", "b": 1}', {"a": 'say "ok", now', "b": 1}),
+    ('{"a": "he said "hi""}', {"a": 'he said "hi"'}),
+    ('{"a": ["a "b", c", "d"]}', {"a": ['a "b", c', "d"]}),
+    ('{"a": "the "best" one", "b": 2}', {"a": 'the "best" one', "b": 2}),
+])
+def test_unescaped_inner_quotes(text, expected):
+    parsed = json_repair.parse_object(text)
+    assert parsed.value == expected
+    assert json_repair.REPAIR_UNESCAPED_QUOTE in parsed.repairs
+
+def test_raw_control_characters():
+    parsed = json_repair.parse_object('{"a": "line\nbreak\tand tab"}')
+    assert parsed.value == {"a": "line\nbreak\tand tab"}
+    assert parsed.repairs == (json_repair.REPAIR_CONTROL_CHARACTER,)
+
+def test_mismatched_bracket():
+    parsed = json_repair.parse_object('{"a": [1, 2}, "b": 3}')
+    assert parsed.value == {"a": [1, 2], "b": 3}
+    assert json_repair.REPAIR_MISMATCHED_BRACKET in parsed.repairs
+
+def test_truncated_string_is_reported():
+    parsed = json_repair.parse_object('{"name": "Jane", "summary": "Backend engin')
+    assert parsed.truncated
+    assert parsed.value == {"name": "Jane", "summary": "Backend engin"}
+    assert parsed.truncated_path == ("summary",)
+
+def test_truncated_nested_value_is_reported_by_path():
+    parsed = json_repair.parse_object('{"analysis": {"resume_rating": {"overall_score": 8.')
+    assert parsed.value == {"analysis": {"resume_rating": {}}}
+    assert parsed.truncated_path == ("analysis", "resume_rating", "overall_score")
+
+def test_truncated_list_drops_incomplete_item():
+    parsed = json_repair.parse_object('{"skills": ["Python", "SQL"], "jobs": [{"title": "A"}, {"title": "B", "company": tru')
+    assert parsed.value["skills"] == ["Python", "SQL"]
+    assert parsed.value["jobs"][0] == {"title": "A"}
+    assert parsed.truncated_path == ("jobs",)
+
+def test_truncation_after_a_complete_member_reports_nothing():
+    parsed = json_repair.parse_object('{"a": 1, "b": [1, 2]')
+    assert parsed.value == {"a": 1, "b": [1, 2]}
+    assert parsed.truncated
+    assert parsed.truncated_path == ()
+
+@pytest.mark.parametrize("text", ["no json here", '{"a": ]]]'])
+def test_unrepairable_output(text):
+    with pytest.raises(ValueError):
+        json_repair.parse_object(text)
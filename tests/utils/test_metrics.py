@@ -0,0 +1,73 @@
+import re
+
+import pytest
+
+from app.core.config import settings
+from app.utils import metrics
+
+# One sample line of the text exposition format: name, optional labels, value
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"(,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*\})? (-?[0-9.e+-]+|[+-]Inf|NaN)$')
+
+@pytest.fixture
+def registered():
+    # Metrics created by a test are removed from the registry afterwards
+    before = list(metrics._metrics)
+    yield
+    metrics._metrics[:] = before
+
+def test_counter_renders_help_type_and_escaped_labels(registered):
+    counter = metrics.Counter("test_events_total", "Events seen.", ("kind",))
+    counter.inc(kind='quote " and \\ backslash\nnewline')
+    counter.inc(2, kind="plain")
+    counter.inc(0.5, kind="plain")
+    assert counter.render() == [
+        "# HELP test_events_total Events seen.",
+        "# TYPE test_events_total counter",
+        'test_events_total{kind="plain"} 2.5',
+        'test_events_total{kind="quote \\" and \\\\ backslash\\nnewline"} 1',
+    ]
+
+def test_histogram_buckets_are_cumulative_and_end_at_inf(registered):
+    histogram = metrics.Histogram("test_seconds", "Durations.", ("stage",), (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, stage="parse")
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{stage="parse",le="0.1"} 2',
+        'test_seconds_bucket{stage="parse",le="1"} 3',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'test_seconds_sum{stage="parse"} 3.65',
+        'test_seconds_count{stage="parse"} 4',
+    ]
+
+def test_unlabelled_histogram_has_only_the_le_label(registered):
+    histogram = metrics.Histogram("test_page_seconds", "Pages.", (), (1,))
+    histogram.observe(0.5)
+    assert histogram.render()[2:] == [
+        'test_page_seconds_bucket{le="1"} 1',
+        'test_page_seconds_bucket{le="+Inf"} 1',
+        "test_page_seconds_sum 0.5",
+        "test_page_seconds_count 1",
+    ]
+
+def test_observing_with_the_wrong_labels_raises(registered):
+    counter = metrics.Counter("test_labelled_total", "Labelled.", ("operation",))
+    with pytest.raises(ValueError):
+        counter.inc(reason="timeout")
+
+def test_metrics_endpoint_serves_the_text_format(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    client.get("/api/v1/resumes/0")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    lines = response.text.splitlines()
+    assert response.text.endswith("\n")
+    for line in lines:
+        assert line.startswith(("# HELP ", "# TYPE ")) or SAMPLE_LINE.match(line), line
+    assert "# TYPE tunecv_http_request_seconds histogram" in lines
+    assert any(line.startswith('tunecv_http_request_seconds_count{method="GET",route="/api/v1/resumes/{resume_id}",status="404"}') for line in lines)
+    assert "# TYPE tunecv_pdf_page_seconds histogram" in lines
+
+def test_metrics_endpoint_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+
+from app.utils import pagination
+
+def test_cursor_round_trip_keeps_stored_text():
+    cursor = pagination.encode_cursor("2024-05-01 10:00:00", 42, descending=True)
+    assert pagination.decode_cursor(cursor, descending=True) == ("2024-05-01 10:00:00", 42)
+
+def test_cursor_round_trip_of_datetime():
+    uploaded_at = datetime(2024, 5, 1, 10, 0, 0, 123456)
+    cursor = pagination.encode_cursor(uploaded_at, 7, descending=False)
+    assert pagination.decode_cursor(cursor, descending=False) == (uploaded_at.isoformat(), 7)
+
+def test_cursor_for_other_direction_is_rejected():
+    cursor = pagination.encode_cursor("2024-05-01 10:00:00", 42, descending=True)
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor(cursor, descending=False)
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", pagination.encode_cursor("yesterday", 1, True)])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor(cursor, descending=True)
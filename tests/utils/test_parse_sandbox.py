@@ -0,0 +1,34 @@
+import io
+import logging
+
+import pytest
+
+from app.benchmark import synthetic_pdf
+from app.core.config import settings
+from app.utils import file_helpers, parse_sandbox, pdf_text
+
+@pytest.fixture
+def sandbox(monkeypatch):
+    monkeypatch.setattr(settings, "PARSE_WORKERS", 2)
+    monkeypatch.setattr(settings, "PDF_PARALLEL_WORKERS", 2)
+    monkeypatch.setattr(settings, "PDF_PARALLEL_PAGE_THRESHOLD", 4)
+    yield
+    parse_sandbox.shutdown()
+    pdf_text.shutdown_executor()
+
+def test_long_pdf_is_split_over_workers(sandbox, caplog):
+    document = synthetic_pdf(9, lines_per_page=5)
+    expected = file_helpers.get_text_from_stream(io.BytesIO(document), "long.pdf")
+    with caplog.at_level(logging.INFO, logger=parse_sandbox.__name__):
+        assert parse_sandbox.extract_text(io.BytesIO(document), "long.pdf") == expected
+    assert "in 2 sandboxed ranges" in caplog.text
+
+def test_short_pdf_is_parsed_by_one_worker(sandbox):
+    document = synthetic_pdf(2, lines_per_page=5)
+    expected = file_helpers.get_text_from_stream(io.BytesIO(document), "short.pdf")
+    assert parse_sandbox.extract_text(io.BytesIO(document), "short.pdf") == expected
+
+def test_page_timings_come_back_from_the_workers(sandbox):
+    with pdf_text.collect_page_timings() as page_seconds:
+        parse_sandbox.extract_text(io.BytesIO(synthetic_pdf(9, lines_per_page=5)), "long.pdf")
+    assert len(page_seconds) == 9
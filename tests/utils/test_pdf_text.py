@@ -0,0 +1,39 @@
+import io
+import logging
+
+import pytest
+
+from app.benchmark import synthetic_pdf
+from app.core.config import settings
+from app.services import resume_pipeline
+from app.utils import pdf_text
+
+@pytest.fixture
+def parallel(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PARALLEL_WORKERS", 3)
+    monkeypatch.setattr(settings, "PDF_PARALLEL_PAGE_THRESHOLD", 4)
+    yield
+    pdf_text.shutdown_executor()
+
+def test_page_ranges_cover_every_page_once():
+    assert pdf_text.page_ranges(10, 3) == [(0, 4), (4, 8), (8, 10)]
+    assert pdf_text.page_ranges(2, 4) == [(0, 1), (1, 2)]
+
+def test_parallel_ranges_give_the_serial_pages_in_order(parallel, caplog):
+    document = synthetic_pdf(10, lines_per_page=5)
+    serial = pdf_text.extract_pdf_pages(io.BytesIO(document), parallel=False)
+    with caplog.at_level(logging.INFO, logger=pdf_text.__name__):
+        parallel_pages = pdf_text.extract_pdf_pages(io.BytesIO(document))
+    assert "in 3 parallel ranges" in caplog.text
+    assert [(page.page_number, page.text) for page in parallel_pages] == [(page.page_number, page.text) for page in serial]
+    assert [page.page_number for page in serial] == list(range(10))
+
+def test_page_timings_reach_the_stage_timings():
+    timings = resume_pipeline.StageTimings()
+    resume_pipeline.extract_text(io.BytesIO(synthetic_pdf(3, lines_per_page=5)), "resume.pdf", timings)
+    assert timings.seconds[resume_pipeline.TIMING_PDF_PAGE_MAX] >= timings.seconds[resume_pipeline.TIMING_PDF_PAGE_MEAN] > 0
+
+def test_text_documents_record_no_page_timings():
+    timings = resume_pipeline.StageTimings()
+    resume_pipeline.extract_text(io.BytesIO(b"Jane Roe"), "resume.txt", timings)
+    assert resume_pipeline.TIMING_PDF_PAGE_MAX not in timings.seconds
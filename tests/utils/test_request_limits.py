@@ -0,0 +1,34 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils import request_limits
+
+def _client(max_bytes):
+    app = FastAPI()
+    app.add_middleware(request_limits.RequestSizeLimitMiddleware, limits={"/upload": max_bytes})
+
+    @app.post("/upload")
+    def upload(file: UploadFile = File(...)):
+        return {"size": len(file.file.read())}
+
+    @app.post("/other")
+    def other(file: UploadFile = File(...)):
+        return {"size": len(file.file.read())}
+
+    return TestClient(app)
+
+def test_declared_oversized_body_is_rejected():
+    response = _client(1000).post("/upload", files={"file": ("resume.txt", b"x" * 2000)})
+    assert response.status_code == 413
+
+def test_undeclared_oversized_body_is_cut_off():
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 500
+    response = _client(1000).post("/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=abc"})
+    assert response.status_code == 413
+
+def test_bodies_within_the_limit_and_other_routes_pass():
+    client = _client(1000)
+    assert client.post("/upload", files={"file": ("resume.txt", b"x" * 500)}).json() == {"size": 500}
+    assert client.post("/other", files={"file": ("resume.txt", b"x" * 2000)}).json() == {"size": 2000}